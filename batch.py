@@ -0,0 +1,78 @@
+"""
+Ejecuta un programa Dale++ con muchos conjuntos de valores de entrada: el programa se compila una sola vez y las
+ejecuciones se reparten en un pool de procesos (ver vm/batch.py). La VM se configura con common/vm_options.py.
+
+Uso: python batch.py programa entradas [resultados] [procesos]
+    entradas:   Directorio con un archivo por ejecución (un valor por línea, en el orden de sus nombres), o archivo
+                con un conjunto de entrada por línea como lista JSON (por ejemplo ["7", "3"]).
+    resultados: Archivo donde se guarda un resultado por línea en formato JSON, en el orden de las entradas
+                (por default batch_results.jsonl).
+"""
+import json
+import os
+import sys
+from compiler.lexer import CompLexer
+from compiler.parser import CompParser
+from vm.batch import run_batch
+from vm.vm import VM, DispatchMode
+from vm.memory import MemoryBackend
+from vm.threaded import ThreadedVM
+from vm.register import RegisterVM
+from vm.limits import ExecutionLimits
+from common.vm_options import VM_BACKEND, VM_MEMORY, VM_MAX_INSTRUCTIONS, VM_MAX_CALL_DEPTH, VM_MAX_SECONDS, \
+    VM_MEMO_SIZE
+
+
+def load_input_sets(path):
+    """
+    Lee los conjuntos de entrada de un directorio o de un archivo JSON lines.
+
+    :param path: Ruta del directorio o del archivo.
+    :return: Lista de listas de valores.
+    """
+    if os.path.isdir(path):
+        input_sets = []
+        for name in sorted(os.listdir(path)):
+            with open(os.path.join(path, name), 'r') as input_file:
+                input_sets.append(input_file.read().splitlines())
+        return input_sets
+    with open(path, 'r') as input_file:
+        return [[str(value) for value in json.loads(line)] for line in input_file if line.strip()]
+
+
+def main():
+    if len(sys.argv) < 3:
+        print(__doc__, file=sys.stderr)
+        sys.exit(1)
+    results_path = sys.argv[3] if len(sys.argv) > 3 else 'batch_results.jsonl'
+    workers = int(sys.argv[4]) if len(sys.argv) > 4 else None
+
+    with open(sys.argv[1], 'r') as input_file:
+        code = input_file.read()
+    compiler_output = CompParser().parse(CompLexer().tokenize(code))
+    input_sets = load_input_sets(sys.argv[2])
+
+    limits = None
+    if VM_MAX_INSTRUCTIONS is not None or VM_MAX_CALL_DEPTH is not None or VM_MAX_SECONDS is not None:
+        limits = ExecutionLimits(max_instructions=VM_MAX_INSTRUCTIONS,
+                                 max_call_depth=VM_MAX_CALL_DEPTH,
+                                 max_seconds=VM_MAX_SECONDS)
+    vm_options = dict(memory_backend=MemoryBackend(VM_MEMORY), memo_size=VM_MEMO_SIZE)
+    if VM_BACKEND == 'threaded':
+        vm_class = ThreadedVM
+    elif VM_BACKEND == 'register':
+        vm_class = RegisterVM
+    else:
+        vm_class = VM
+        vm_options['dispatch_mode'] = DispatchMode(VM_BACKEND)
+
+    results, stats = run_batch(compiler_output, input_sets, workers=workers, limits=limits, vm_class=vm_class,
+                               **vm_options)
+    with open(results_path, 'w') as results_file:
+        for result in results:
+            results_file.write(json.dumps(result.as_dict()) + '\n')
+    print(stats.format_text())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""
+Benchmark de AsyncVM: mide el rendimiento de cientos de sesiones interactivas intercaladas en un solo proceso,
+comparado con ejecutarlas una despues de otra con la VM sincrona. La equidad del reparto de porciones entre las
+sesiones se verifica por separado en benchmarks/check_async.py.
+
+Uso: python -m benchmarks.bench_async [sesiones] [repeticiones]
+"""
+import asyncio
+import sys
+import time
+from vm.cooperative import AsyncVM
+from vm.streams import AsyncQueueSource, AsyncQueueSink, IteratorSource, ListSink
+from benchmarks.utils import EXAMPLES, compile_code, compile_file, make_vm, count_instructions, best_time
+
+"""
+Programa que solo calcula, sin READ: cada sesión necesita muchas porciones para terminar.
+"""
+BUSY_LOOP = '''
+program busy_loop
+
+main() {
+    var i: int
+    var total: int
+    total = 0
+    for i = 0 to 20000 {
+        total = total + i
+    }
+    write(total)
+}
+'''
+
+SLICE_SIZES = (100, 1000, 10000)
+
+
+async def run_interactive(compiler_output, input_sets, slice_size):
+    """
+    Ejecuta una sesión por conjunto de entrada. Cada sesión recibe sus valores por una cola, que un cliente
+    llena un valor a la vez despues de ceder el event loop, como lo haría un usuario de la interfaz.
+
+    :return: Lista con la salida de cada sesión.
+    """
+    async def client(source, values):
+        for value in values:
+            await asyncio.sleep(0)
+            source.queue.put_nowait(value)
+
+    vms = []
+    tasks = []
+    for inputs in input_sets:
+        source = AsyncQueueSource()
+        vm = make_vm(compiler_output, AsyncVM, slice_size=slice_size, input_source=source, output=AsyncQueueSink())
+        vms.append(vm)
+        tasks.append(vm.run_async())
+        tasks.append(client(source, inputs))
+    await asyncio.gather(*tasks)
+    outputs = []
+    for vm in vms:
+        chunks = []
+        while not vm.output.queue.empty():
+            chunks.append(vm.output.queue.get_nowait())
+        outputs.append(''.join(chunks))
+    return outputs
+
+
+def run_sequential(compiler_output, input_sets):
+    """
+    Ejecuta las sesiones una despues de otra con la VM sincrona.
+
+    :return: Lista con la salida de cada sesión.
+    """
+    outputs = []
+    for inputs in input_sets:
+        output = ListSink()
+        make_vm(compiler_output, output=output, input_source=IteratorSource(inputs)).run()
+        outputs.append(output.getvalue())
+    return outputs
+
+
+def main():
+    sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    print(f'{"programa":<22}{"modo":<24}{"sesiones/s":>14}')
+    for name in ('binary_search', 'fibonacci_iterative', 'factorial_recursive'):
+        path, inputs = EXAMPLES[name]
+        compiler_output = compile_file(path)
+        input_sets = [list(inputs) for _ in range(sessions)]
+        expected = run_sequential(compiler_output, input_sets)
+        elapsed = best_time(lambda: run_sequential(compiler_output, input_sets), repeat)
+        print(f'{name:<22}{"VM secuencial":<24}{sessions / elapsed:>14.1f}')
+        for slice_size in SLICE_SIZES:
+            outputs = asyncio.run(run_interactive(compiler_output, input_sets, slice_size))
+            if outputs != expected:
+                raise AssertionError(f'{name}: the async sessions differ from the sequential execution')
+            start = time.perf_counter()
+            for _ in range(repeat):
+                asyncio.run(run_interactive(compiler_output, input_sets, slice_size))
+            elapsed = (time.perf_counter() - start) / repeat
+            label = f'AsyncVM porción {slice_size}'
+            print(f'{name:<22}{label:<24}{sessions / elapsed:>14.1f}')
+
+    print(f'\n{"una sesión":<46}{"q/s":>14}')
+    busy = compile_code(BUSY_LOOP)
+    executed = count_instructions(busy, [])
+    elapsed = best_time(lambda vm: vm.run(), repeat, lambda: make_vm(busy, output=ListSink()))
+    print(f'{"VM.run":<46}{executed / elapsed:>14,.0f}')
+    for slice_size in SLICE_SIZES:
+        elapsed = best_time(lambda vm: asyncio.run(vm.run_async()), repeat,
+                            lambda: make_vm(busy, AsyncVM, slice_size=slice_size, output=ListSink()))
+        label = f'AsyncVM.run_async porción {slice_size}'
+        print(f'{label:<46}{executed / elapsed:>14,.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""
+Benchmark de la ejecución por lotes: ejecuta un ejemplo con muchos conjuntos de entrada compilando el programa en
+cada ejecución (como main.py), compilandolo una sola vez en el mismo proceso y con run_batch en pools de distintos
+tamaños. Verifica que las salidas de run_batch lleguen en orden y sean iguales a las de la ejecución en serie.
+
+Uso: python -m benchmarks.bench_batch [ejecuciones] [procesos]
+"""
+import os
+import sys
+import time
+from vm.batch import run_batch
+from vm.streams import IteratorSource, ListSink
+from benchmarks.utils import compile_file, make_vm
+
+"""
+Ejemplo y generador de su conjunto de entrada para cada ejecución.
+"""
+PROGRAMS = {
+    'binary_search': ('examples/binary_search.txt', lambda i: [str(i % 12)]),
+    'fibonacci_iterative': ('examples/fibonacci_iterative.txt', lambda i: [str(i % 90)]),
+}
+
+
+def run_serial(path, input_sets, recompile):
+    """
+    Ejecuta el programa con cada conjunto de entrada en el proceso actual.
+
+    :param recompile: Si es verdadero, compila el programa antes de cada ejecución.
+    :return: Lista con la salida de cada ejecución.
+    """
+    outputs = []
+    compiler_output = compile_file(path)
+    for inputs in input_sets:
+        if recompile:
+            compiler_output = compile_file(path)
+        output = ListSink()
+        make_vm(compiler_output, output=output, input_source=IteratorSource(inputs)).run()
+        outputs.append(output.getvalue())
+    return outputs
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    max_workers = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count() or 1
+    print(f'{"programa":<22}{"modo":<26}{"s":>9}{"ejecuciones/s":>16}')
+    for name, (path, make_inputs) in PROGRAMS.items():
+        input_sets = [make_inputs(i) for i in range(runs)]
+        expected = None
+        for label, recompile in (('compilar cada vez', True), ('compilar una vez', False)):
+            start = time.perf_counter()
+            expected = run_serial(path, input_sets, recompile)
+            elapsed = time.perf_counter() - start
+            print(f'{name:<22}{label:<26}{elapsed:>9.3f}{runs / elapsed:>16.1f}')
+        compiler_output = compile_file(path)
+        workers = 1
+        while workers <= max_workers:
+            results, stats = run_batch(compiler_output, input_sets, workers=workers)
+            if [result.output for result in results] != expected or stats.failures:
+                raise AssertionError(f'{name}: the batch results differ from the serial execution')
+            label = f'run_batch ({workers} procesos)'
+            print(f'{name:<22}{label:<26}{stats.wall_time:>9.3f}{stats.throughput:>16.1f}')
+            workers *= 2
+
+
+if __name__ == '__main__':
+    main()
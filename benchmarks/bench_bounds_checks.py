@@ -0,0 +1,51 @@
+"""
+Benchmark de la eliminación de VERIFY: reporta por programa cuantos VERIFY elimino el compilador, cuantos se
+ejecutaron con y sin la optimización, y las instrucciones por segundo de la tabla de despacho en ambos casos.
+
+Uso: python -m benchmarks.bench_bounds_checks [repeticiones]
+"""
+import sys
+from compiler.quadruple import Operator
+from vm.vm import DispatchMode
+from benchmarks.utils import EXAMPLES, compile_file, make_vm, silenced, count_instructions, best_time
+
+
+def count_verifies(compiler_output, inputs):
+    """
+    Cuenta los VERIFY que ejecuta un programa utilizando el interprete de referencia.
+
+    :param compiler_output: Instancia de CompilerOutput.
+    :param inputs: Lista de valores para las instrucciones READ.
+    :return: Número de VERIFY ejecutados.
+    """
+    vm = make_vm(compiler_output, dispatch_mode=DispatchMode.IF_CHAIN)
+    verifies = 0
+    with silenced(inputs):
+        while vm.get_current_frame().IP < len(vm.quad_list):
+            verifies += vm.quad_list[vm.get_current_frame().IP].operator == Operator.VERIFY
+            vm.next_instruction()
+    return verifies
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    print(f'{"programa":<26}{"eliminados":>11}{"VERIFY sin":>12}{"VERIFY con":>12}'
+          f'{"sin q/s":>14}{"con q/s":>14}{"speedup":>9}')
+    for name, (path, inputs) in EXAMPLES.items():
+        outputs = [compile_file(path, bounds_checks=bounds_checks) for bounds_checks in (False, True)]
+        verifies = [count_verifies(compiler_output, inputs) for compiler_output in outputs]
+        executed = count_instructions(outputs[0], inputs)
+
+        rates = []
+        for compiler_output in outputs:
+            def run(vm):
+                with silenced(inputs):
+                    vm.run()
+            # Se divide entre las instrucciones del programa sin optimizar, para comparar el mismo trabajo.
+            rates.append(executed / best_time(run, repeat, lambda: make_vm(compiler_output)))
+        print(f'{name:<26}{outputs[1].optimization_stats["bounds_checks_removed"]:>11}{verifies[0]:>12}'
+              f'{verifies[1]:>12}{rates[0]:>14,.0f}{rates[1]:>14,.0f}{rates[1] / rates[0]:>8.2f}x')
+
+
+if __name__ == '__main__':
+    main()
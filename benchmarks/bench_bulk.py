@@ -0,0 +1,81 @@
+"""
+Benchmark de las escrituras de bloques (instrucciones FILL y COPYBLOCK): ejecuta un programa que inicializa y
+copia arreglos de una y dos dimensiones varias veces, compilado con y sin FILL/COPYBLOCK, con cada tipo de
+memoria. Antes de medir verifica que ambas versiones produzcan la misma salida.
+
+Uso: python -m benchmarks.bench_bulk [repeticiones]
+"""
+import sys
+from vm.memory import MemoryBackend
+from vm.threaded import ThreadedVM
+from vm.streams import IteratorSource, ListSink
+from benchmarks.utils import compile_code, make_vm, best_time
+
+"""
+Programa de prueba. Cada partición de un scope tiene 1500 direcciones, así que los arreglos se reparten entre el
+scope global y el de main.
+"""
+PROGRAM = '''
+program bulk
+var v[1400]: int
+var m[30][40]: float
+
+main() {
+    var w[1400]: int
+    var c[30][40]: float
+    var i: int
+    var j: int
+    var r: int
+    for r = 0 to 20 {
+        for i = 0 to 1400 {
+            v[i] = r
+        }
+        for i = 0 to 30 {
+            for j = 0 to 40 {
+                m[i][j] = 1.5
+            }
+        }
+        for i = 0 to 1400 {
+            w[i] = v[i]
+        }
+        for i = 0 to 30 {
+            for j = 0 to 40 {
+                c[i][j] = m[i][j]
+            }
+        }
+    }
+    write(w[1399])
+    write(c[29][39])
+}
+'''
+
+CONFIGS = {
+    'list': dict(),
+    'typed': dict(memory_backend=MemoryBackend.TYPED),
+    'numpy': dict(memory_backend=MemoryBackend.NUMPY),
+    'list (closures)': dict(vm_class=ThreadedVM),
+}
+
+
+def run_output(compiler_output, **kwargs):
+    output = ListSink()
+    make_vm(compiler_output, output=output, input_source=IteratorSource([]), **kwargs).run()
+    return output.getvalue()
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    lowered = compile_code(PROGRAM)
+    loops = compile_code(PROGRAM, bulk_stores=False)
+    print(f'ciclos reemplazados: {lowered.optimization_stats["bulk_stores"]}')
+    print(f'{"memoria":<18}{"ciclos ms":>12}{"bloques ms":>12}{"aceleración":>13}')
+    for label, config in CONFIGS.items():
+        if run_output(lowered, **config) != run_output(loops, **config):
+            raise AssertionError(f'{label}: FILL/COPYBLOCK output differs from the loops')
+        times = [best_time(lambda vm: vm.run(), repeat, lambda: make_vm(compiler_output, output=ListSink(), **config))
+                 for compiler_output in (loops, lowered)]
+        print(f'{label:<18}{times[0] * 1000:>12.2f}{times[1] * 1000:>12.2f}{times[0] / times[1]:>12.1f}x')
+
+
+if __name__ == '__main__':
+    main()
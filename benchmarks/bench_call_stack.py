@@ -0,0 +1,83 @@
+"""
+Benchmark del stack de ejecución: compara los frames con bloques de memoria propios (listas o arreglos tipados)
+contra el stack contiguo de MemoryBackend.WINDOW en un programa con recursión profunda.
+Reporta las llamadas por segundo y el pico de memoria durante la ejecución.
+
+Uso: python -m benchmarks.bench_call_stack [repeticiones]
+"""
+import sys
+import tracemalloc
+from vm.memory import MemoryBackend
+from vm.threaded import ThreadedVM
+from benchmarks.utils import EXAMPLES, compile_code, compile_file, make_vm, silenced, best_time
+
+"""
+Programa que se llama a si mismo n veces antes de regresar, por lo que mantiene n + 1 frames activos.
+"""
+DEEP_RECURSION = '''
+program deep_recursion
+
+fun down(n: int): int {
+    var r: int
+    if (n == 0) {
+        r = 0
+    } else {
+        r = down(n - 1) + 1
+    }
+    return (r)
+}
+
+main() {
+    var n: int
+    read(n)
+    write(down(n))
+}
+'''
+
+CONFIGURATIONS = {
+    'list': dict(memory_backend=MemoryBackend.LIST),
+    'typed': dict(memory_backend=MemoryBackend.TYPED),
+    'window': dict(memory_backend=MemoryBackend.WINDOW),
+    'window (closures)': dict(memory_backend=MemoryBackend.WINDOW, vm_class=ThreadedVM),
+}
+
+
+def fibonacci_calls(n):
+    """
+    Número de llamadas que hace fibonacci_recursive para calcular fib(n).
+    """
+    a, b = 1, 1
+    for _ in range(n):
+        a, b = b, a + b + 1
+    return a
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    deep = compile_code(DEEP_RECURSION)
+    fibonacci_path, fibonacci_inputs = EXAMPLES['fibonacci_recursive']
+    programs = [(f'deep_recursion({depth})', deep, [str(depth)], depth + 1) for depth in (10000, 100000)]
+    programs.append((f'fibonacci_recursive({fibonacci_inputs[0]})', compile_file(fibonacci_path), fibonacci_inputs,
+                     fibonacci_calls(int(fibonacci_inputs[0]))))
+
+    print(f'{"programa":<28}{"memoria":<20}{"llamadas/s":>14}{"KiB pico":>12}')
+    for name, compiler_output, inputs, calls in programs:
+        for label, config in CONFIGURATIONS.items():
+            def setup():
+                return make_vm(compiler_output, **config)
+
+            def run(vm):
+                with silenced(inputs):
+                    vm.run()
+            elapsed = best_time(run, repeat, setup)
+
+            vm = setup()
+            tracemalloc.start()
+            run(vm)
+            peak = tracemalloc.get_traced_memory()[1] / 1024
+            tracemalloc.stop()
+            print(f'{name:<28}{label:<20}{calls / elapsed:>14.0f}{peak:>12.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+"""
+Benchmark del perfilador de llamadas: compara el tiempo de VM.run sin perfilador, con CallProfiler y con Profiler
+en los ejemplos que llaman funciones, verifica que la salida no cambie y muestra el reporte por función de
+fibonacci_recursive.
+
+Uso: python -m benchmarks.bench_calls [repeticiones]
+"""
+import sys
+from vm.profiler import Profiler, CallProfiler
+from benchmarks.utils import EXAMPLES, compile_file, make_vm, silenced, best_time
+
+PROGRAMS = ('factorial_recursive', 'fibonacci_recursive', 'fun_declaration_and_call')
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    print(f'{"programa":<26}{"run ms":>10}{"llamadas ms":>14}{"instrucciones ms":>18}')
+    for name in PROGRAMS:
+        path, inputs = EXAMPLES[name]
+        compiler_output = compile_file(path)
+        outputs = []
+        times = []
+        for make_profiler in (lambda: None, CallProfiler, Profiler):
+            with silenced(inputs) as output:
+                make_vm(compiler_output).run(make_profiler())
+            outputs.append(output.getvalue())
+
+            def run(vm):
+                with silenced(inputs):
+                    vm.run(make_profiler())
+            times.append(best_time(run, repeat, lambda: make_vm(compiler_output)))
+        if len(set(outputs)) != 1:
+            raise AssertionError(f'{name}: profiling changed the output')
+        print(f'{name:<26}{times[0] * 1000:>10.2f}{times[1] * 1000:>14.2f}{times[2] * 1000:>18.2f}')
+
+    path, inputs = EXAMPLES['fibonacci_recursive']
+    profiler = CallProfiler()
+    with silenced(inputs):
+        make_vm(compile_file(path)).run(profiler)
+    print('\nfibonacci_recursive:')
+    print(profiler.format_text())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""
+Benchmark del pool de constantes: compara VM.read volviendo a convertir la constante (const.name) en cada lectura,
+como se hacia antes, contra la lectura indexada del ConstantPool materializado al cargar el programa.
+Se usa el interprete de referencia (DispatchMode.IF_CHAIN), que lee todos los operandos a traves de VM.read.
+
+Uso: python -m benchmarks.bench_constants [repeticiones]
+"""
+import sys
+from common.scope_size import CONST_ADDRESS_RANGE
+from compiler.symbol_table import VarType
+from vm.vm import VM, DispatchMode
+from benchmarks.utils import EXAMPLES, compile_file, make_vm, silenced, count_instructions, best_time
+
+
+class ParsingConstVM(VM):
+    """
+    VM que convierte la constante desde la tabla de constantes en cada lectura.
+    """
+    def __init__(self, quad_list, const_table, fun_dir, **kwargs):
+        super().__init__(quad_list, const_table, fun_dir, **kwargs)
+        self.const_memory = dict(map(lambda c: (c[1].address, c[1]), const_table.items()))
+
+    def read(self, addr):
+        if CONST_ADDRESS_RANGE[0] <= addr < CONST_ADDRESS_RANGE[1]:
+            const = self.const_memory[addr]
+            if const.type == VarType.INT:
+                return int(const.name)
+            elif const.type == VarType.FLOAT:
+                return float(const.name)
+            else:
+                return const.name
+        return super().read(addr)
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    print(f'{"programa":<24}{"quads":>8}{"operandos const":>16}{"parseo q/s":>14}{"pool q/s":>14}{"speedup":>10}')
+    for name in ('bubble_sort', 'matrix_multiplication', 'fibonacci_iterative', 'factorial_iterative',
+                 'fibonacci_recursive'):
+        path, inputs = EXAMPLES[name]
+        compiler_output = compile_file(path)
+        executed = count_instructions(compiler_output, inputs)
+
+        const_operands = 0
+        vm = make_vm(compiler_output, dispatch_mode=DispatchMode.IF_CHAIN)
+        for quad in vm.quad_list:
+            for operand in (quad.left_operand, quad.right_operand, quad.result):
+                if isinstance(operand, int) and CONST_ADDRESS_RANGE[0] <= operand < CONST_ADDRESS_RANGE[1]:
+                    const_operands += 1
+
+        rates = []
+        for vm_class in (ParsingConstVM, VM):
+            def run():
+                vm = vm_class(compiler_output.quadruples, compiler_output.constants,
+                              compiler_output.functions_directory, dispatch_mode=DispatchMode.IF_CHAIN,
+                              global_partition_sizes=compiler_output.global_partition_sizes,
+                              pointer_partition_sizes=compiler_output.pointer_partition_sizes)
+                with silenced(inputs):
+                    vm.run()
+            rates.append(executed / best_time(run, repeat))
+        print(f'{name:<24}{executed:>8}{const_operands:>16}{rates[0]:>14,.0f}{rates[1]:>14,.0f}'
+              f'{rates[1] / rates[0]:>9.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,34 @@
+"""
+Benchmark de despacho de instrucciones: compara la cadena de if/elif de VM.next_instruction, la tabla de
+despacho indexada por opcode y la ejecución de bloques compilados a closures (ThreadedVM).
+Solo se mide VM.run; la carga del programa (decodificación, compilación de bloques) queda fuera de la medición.
+
+Uso: python -m benchmarks.bench_dispatch [repeticiones]
+"""
+import sys
+from vm.vm import VM, DispatchMode
+from vm.threaded import ThreadedVM
+from benchmarks.utils import EXAMPLES, compile_file, make_vm, silenced, count_instructions, best_time
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    print(f'{"programa":<26}{"quads":>10}{"if/elif q/s":>16}{"tabla q/s":>16}{"closures q/s":>16}'
+          f'{"speedup":>10}')
+    for name, (path, inputs) in EXAMPLES.items():
+        compiler_output = compile_file(path)
+        executed = count_instructions(compiler_output, inputs)
+        rates = []
+        for vm_class, kwargs in ((VM, dict(dispatch_mode=DispatchMode.IF_CHAIN)),
+                                 (VM, dict(dispatch_mode=DispatchMode.TABLE)),
+                                 (ThreadedVM, dict())):
+            def run(vm):
+                with silenced(inputs):
+                    vm.run()
+            rates.append(executed / best_time(run, repeat, lambda: make_vm(compiler_output, vm_class, **kwargs)))
+        print(f'{name:<26}{executed:>10}{rates[0]:>16,.0f}{rates[1]:>16,.0f}{rates[2]:>16,.0f}'
+              f'{max(rates[1:]) / rates[0]:>9.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+"""
+Benchmark del perfilador por línea: compara el tiempo de VM.run sin perfilador y con LineProfiler (midiendo todas
+las instrucciones y una de cada 10) en los ejemplos, verifica que la salida no cambie y muestra el listado de
+bubble_sort con las líneas más costosas marcadas.
+
+Uso: python -m benchmarks.bench_lines [repeticiones]
+"""
+import sys
+from vm.profiler import LineProfiler
+from benchmarks.utils import EXAMPLES, compile_file, make_vm, silenced, best_time
+
+PROGRAMS = ('bubble_sort', 'factorial_iterative', 'fibonacci_recursive', 'matrix_multiplication')
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    print(f'{"programa":<26}{"run ms":>10}{"líneas ms":>12}{"líneas 1/10 ms":>16}')
+    for name in PROGRAMS:
+        path, inputs = EXAMPLES[name]
+        compiler_output = compile_file(path)
+        outputs = []
+        times = []
+        for make_profiler in (lambda: None, LineProfiler, lambda: LineProfiler(sample_every=10)):
+            with silenced(inputs) as output:
+                make_vm(compiler_output).run(make_profiler())
+            outputs.append(output.getvalue())
+
+            def run(vm):
+                with silenced(inputs):
+                    vm.run(make_profiler())
+            times.append(best_time(run, repeat, lambda: make_vm(compiler_output)))
+        if len(set(outputs)) != 1:
+            raise AssertionError(f'{name}: profiling changed the output')
+        print(f'{name:<26}{times[0] * 1000:>10.2f}{times[1] * 1000:>12.2f}{times[2] * 1000:>16.2f}')
+
+    path, inputs = EXAMPLES['bubble_sort']
+    profiler = LineProfiler()
+    vm = make_vm(compile_file(path))
+    with silenced(inputs):
+        vm.run(profiler)
+    with open(path, 'r') as source_file:
+        source = source_file.read()
+    print('\nbubble_sort:')
+    print(profiler.format_listing(vm, source))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""
+Benchmark de las multiplicaciones de matrices reconocidas por el compilador (instrucciones MATMUL): compara los
+ciclos interpretados (compilados sin MATMUL) con el kernel de Python de la memoria tipada y con el kernel de NumPy,
+para matrices cuadradas de varios tamaños. Antes de medir verifica que todas las configuraciones produzcan la
+misma salida que los ciclos interpretados.
+
+Uso: python -m benchmarks.bench_matmul [tamaños separados por comas] [repeticiones]
+"""
+import sys
+from vm.memory import MemoryBackend, numpy
+from vm.threaded import ThreadedVM
+from vm.streams import IteratorSource, ListSink
+from benchmarks.utils import compile_code, make_vm, best_time
+
+"""
+Programas de prueba; SIZE se reemplaza por el tamaño de las matrices. Cada partición de un scope tiene 1500
+direcciones, pero el compilador solo verifica que la primera dirección de un arreglo este dentro de su partición,
+así que una matriz de 100 x 100 cabe si es la última variable de su tipo en su scope. Por eso cada matriz se declara
+en una partición distinta (global o local, int o float) y p siempre es float: con tres matrices int no habría
+particiones suficientes para N = 100.
+"""
+PROGRAMS = {
+    'int x float': '''
+program matmul_float
+var a[SIZE][SIZE]: int
+var b[SIZE][SIZE]: float
+
+main() {
+    var i: int
+    var j: int
+    var k: int
+    var p[SIZE][SIZE]: float
+    for i = 0 to SIZE {
+        for j = 0 to SIZE {
+            a[i][j] = i - 2 * j
+            b[i][j] = (i + j) / 7
+            p[i][j] = 0.5
+        }
+    }
+    for i = 0 to SIZE {
+        for j = 0 to SIZE {
+            for k = 0 to SIZE {
+                p[i][j] = p[i][j] + a[i][k] * b[k][j]
+            }
+        }
+    }
+    write(p[0][0])
+    write(p[SIZE - 1][SIZE - 1])
+}
+''',
+    'int x int': '''
+program matmul_int
+var a[SIZE][SIZE]: int
+
+main() {
+    var i: int
+    var j: int
+    var k: int
+    var b[SIZE][SIZE]: int
+    var p[SIZE][SIZE]: float
+    for i = 0 to SIZE {
+        for j = 0 to SIZE {
+            a[i][j] = i - 2 * j
+            b[i][j] = i * j + 1
+        }
+    }
+    for i = 0 to SIZE {
+        for j = 0 to SIZE {
+            for k = 0 to SIZE {
+                p[i][j] = p[i][j] + a[i][k] * b[k][j]
+            }
+        }
+    }
+    write(p[0][0])
+    write(p[SIZE - 1][SIZE - 1])
+}
+''',
+}
+
+CONFIGS = {
+    'ciclos': dict(memory_backend=MemoryBackend.TYPED),
+    'kernel Python': dict(memory_backend=MemoryBackend.TYPED),
+    'kernel NumPy': dict(memory_backend=MemoryBackend.NUMPY),
+    'NumPy (closures)': dict(memory_backend=MemoryBackend.NUMPY, vm_class=ThreadedVM),
+}
+
+
+def run_output(compiler_output, **kwargs):
+    output = ListSink()
+    make_vm(compiler_output, output=output, input_source=IteratorSource([]), **kwargs).run()
+    return output.getvalue()
+
+
+def main():
+    sizes = [int(size) for size in sys.argv[1].split(',')] if len(sys.argv) > 1 else [3, 30, 100]
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    if numpy is None:
+        print('NumPy no esta instalado: la memoria numpy utiliza los arreglos tipados y el kernel de Python.')
+    print(f'{"programa":<13}{"N":>5}  {"configuración":<20}{"ms":>10}{"vs ciclos":>11}')
+    for name, code in PROGRAMS.items():
+        for size in sizes:
+            source = code.replace('SIZE', str(size))
+            compiled = {True: compile_code(source), False: compile_code(source, matmul=False)}
+            if compiled[True].optimization_stats['matmul_loops'] != 1:
+                raise AssertionError(f'{name}: the matrix multiplication was not recognized')
+            expected = run_output(compiled[False], memory_backend=MemoryBackend.TYPED)
+            baseline = None
+            for label, config in CONFIGS.items():
+                compiler_output = compiled[label != 'ciclos']
+                if run_output(compiler_output, **config) != expected:
+                    raise AssertionError(f'{name} {size}: {label} output differs from the interpreted loops')
+                elapsed = best_time(lambda vm: vm.run(), repeat,
+                                    lambda: make_vm(compiler_output, output=ListSink(), **config))
+                baseline = baseline or elapsed
+                print(f'{name:<13}{size:>5}  {label:<20}{elapsed * 1000:>10.2f}{baseline / elapsed:>10.1f}x')
+
+
+if __name__ == '__main__':
+    main()
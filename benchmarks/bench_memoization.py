@@ -0,0 +1,62 @@
+"""
+Benchmark de la memoización de funciones puras: ejecuta los ejemplos recursivos sin memoización y con caches LRU
+de distintos tamaños. Reporta el tiempo, las llamadas que se ejecutaron y las que se resolvieron con la cache.
+
+Uso: python -m benchmarks.bench_memoization [repeticiones]
+"""
+import sys
+from vm.memory import MemoryBackend
+from vm.threaded import ThreadedVM
+from benchmarks.utils import compile_file, make_vm, silenced, best_time
+
+"""
+Ejemplos recursivos con los valores para sus instrucciones READ.
+"""
+PROGRAMS = {
+    'fibonacci_recursive': ('examples/fibonacci_recursive.txt', ['22']),
+    'factorial_recursive': ('examples/factorial_recursive.txt', ['20']),
+}
+
+CONFIGURATIONS = {
+    'table': dict(),
+    'window': dict(memory_backend=MemoryBackend.WINDOW),
+    'closures': dict(vm_class=ThreadedVM),
+}
+
+"""
+Tamaños de la cache de cada función (None = sin memoización).
+"""
+MEMO_SIZES = (None, 2, 64)
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    print(f'{"programa":<22}{"vm":<10}{"cache":>7}{"ms":>10}{"aceleración":>13}{"ejecutadas":>12}{"cache":>8}')
+    for name, (path, inputs) in PROGRAMS.items():
+        compiler_output = compile_file(path)
+        pure = [fun for fun, item in compiler_output.functions_directory.items() if item.pure]
+        print(f'{name}: funciones puras {pure}')
+        for label, config in CONFIGURATIONS.items():
+            baseline = None
+            for memo_size in MEMO_SIZES:
+                def setup():
+                    return make_vm(compiler_output, memo_size=memo_size, **config)
+
+                def run(vm):
+                    with silenced(inputs):
+                        vm.run()
+                elapsed = best_time(run, repeat, setup)
+                baseline = baseline or elapsed
+
+                vm = setup()
+                run(vm)
+                stats = vm.memo_stats().values()
+                executed = sum(fun_stats['misses'] for fun_stats in stats) if memo_size else '-'
+                hits = sum(fun_stats['hits'] for fun_stats in stats) if memo_size else '-'
+                size = memo_size if memo_size is not None else '-'
+                print(f'{"":<22}{label:<10}{size:>7}{elapsed * 1000:>10.2f}{baseline / elapsed:>12.1f}x'
+                      f'{executed:>12}{hits:>8}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""
+Benchmark de los bloques de memoria de la VM: compara las listas con el tamaño por default, las listas con el
+tamaño calculado por el compilador y los arreglos tipados (TypedAddressBlock).
+Mide la memoria reservada al crear la VM, el tiempo para crear frames (ERA) y el tiempo total de ejecución.
+
+Uso: python -m benchmarks.bench_memory [repeticiones]
+"""
+import sys
+import time
+import tracemalloc
+from dataclasses import replace
+from compiler.symbol_table import ReturnType
+from vm.memory import MemoryBackend
+from benchmarks.utils import EXAMPLES, compile_file, make_vm, silenced, best_time
+
+CONFIGURATIONS = {
+    'list (default)': dict(memory_backend=MemoryBackend.LIST, sized=False),
+    'list (sized)': dict(memory_backend=MemoryBackend.LIST, sized=True),
+    'typed (sized)': dict(memory_backend=MemoryBackend.TYPED, sized=True),
+}
+
+
+def build_vm(compiler_output, memory_backend, sized):
+    if not sized:
+        fun_dir = dict(compiler_output.functions_directory)
+        if 'main' in fun_dir:
+            fun_dir['main'] = replace(fun_dir['main'], local_partition_sizes=None, temp_partition_sizes=None)
+        compiler_output = replace(compiler_output, functions_directory=fun_dir,
+                                  global_partition_sizes=None, pointer_partition_sizes=None)
+    return make_vm(compiler_output, memory_backend=memory_backend)
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    frames = 20000
+    print(f'{"programa":<24}{"memoria":<16}{"KiB al crear VM":>16}{"us por ERA":>12}{"ms ejecución":>14}')
+    for name in ('fibonacci_recursive', 'matrix_multiplication', 'bubble_sort'):
+        path, inputs = EXAMPLES[name]
+        compiler_output = compile_file(path)
+        fun = next((f for f in compiler_output.functions_directory.values()
+                    if f.name != 'main' and f.return_type != ReturnType.VOID), None)
+        for label, config in CONFIGURATIONS.items():
+            tracemalloc.start()
+            vm = build_vm(compiler_output, **config)
+            allocated = tracemalloc.get_traced_memory()[0] / 1024
+            tracemalloc.stop()
+
+            era = '-'
+            if fun is not None:
+                start = time.perf_counter()
+                for _ in range(frames):
+                    vm.start_new_frame(fun.start_addr, fun.local_partition_sizes, fun.temp_partition_sizes)
+                era = f'{(time.perf_counter() - start) / frames * 1e6:.2f}'
+
+            def run():
+                with silenced(inputs):
+                    build_vm(compiler_output, **config).run()
+            elapsed = best_time(run, repeat) * 1000
+            print(f'{name:<24}{label:<16}{allocated:>16.1f}{era:>12}{elapsed:>14.2f}')
+
+
+if __name__ == '__main__':
+    main()
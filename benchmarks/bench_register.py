@@ -0,0 +1,41 @@
+"""
+Benchmark de la VM de registros: compara VM (tabla de despacho con superinstrucciones), ThreadedVM y RegisterVM
+en todos los ejemplos. Antes de medir verifica que RegisterVM produzca exactamente la misma salida que VM.
+Solo se mide VM.run; la traducción del programa queda fuera de la medición.
+
+Uso: python -m benchmarks.bench_register [repeticiones]
+"""
+import sys
+from vm.vm import VM
+from vm.threaded import ThreadedVM
+from vm.register import RegisterVM
+from benchmarks.utils import EXAMPLES, compile_file, make_vm, silenced, count_instructions, best_time
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    print(f'{"programa":<26}{"quads":>10}{"tabla q/s":>16}{"closures q/s":>16}{"registros q/s":>16}'
+          f'{"vs tabla":>10}')
+    for name, (path, inputs) in EXAMPLES.items():
+        compiler_output = compile_file(path)
+        executed = count_instructions(compiler_output, inputs)
+        outputs = []
+        for vm_class in (VM, RegisterVM):
+            with silenced(inputs) as output:
+                make_vm(compiler_output, vm_class).run()
+            outputs.append(output.getvalue())
+        if outputs[0] != outputs[1]:
+            raise AssertionError(f'{name}: RegisterVM output differs from VM\n{outputs[0]!r}\n{outputs[1]!r}')
+
+        rates = []
+        for vm_class in (VM, ThreadedVM, RegisterVM):
+            def run(vm):
+                with silenced(inputs):
+                    vm.run()
+            rates.append(executed / best_time(run, repeat, lambda: make_vm(compiler_output, vm_class)))
+        print(f'{name:<26}{executed:>10}{rates[0]:>16,.0f}{rates[1]:>16,.0f}{rates[2]:>16,.0f}'
+              f'{rates[2] / rates[0]:>9.2f}x')
+
+
+if __name__ == '__main__':
+    main()
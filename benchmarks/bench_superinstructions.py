@@ -0,0 +1,56 @@
+"""
+Benchmark de superinstrucciones: reporta por programa cuantas secuencias se fusionaron, cuantos despachos se
+ejecutaron con y sin superinstrucciones, y las instrucciones por segundo de la tabla de despacho en ambos casos.
+
+Uso: python -m benchmarks.bench_superinstructions [repeticiones]
+"""
+import sys
+from benchmarks.utils import EXAMPLES, compile_file, make_vm, silenced, count_instructions, best_time
+
+
+def count_dispatches(vm, inputs):
+    """
+    Ejecuta el programa de la VM con el mismo ciclo que VM.run_table, contando los despachos.
+
+    :param vm: Instancia de VM con la tabla de despacho.
+    :param inputs: Lista de valores para las instrucciones READ.
+    :return: Número de despachos ejecutados.
+    """
+    table = vm.dispatch_table
+    program = vm.program
+    end = len(program)
+    IP = vm.get_current_frame().IP
+    dispatches = 0
+    with silenced(inputs):
+        while IP < end:
+            opcode, A, B, C = program[IP]
+            IP = table[opcode](A, B, C, IP)
+            dispatches += 1
+    return dispatches
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    print(f'{"programa":<26}{"fusiones":>9}{"despachos":>11}{"fusionado":>11}{"ahorrados":>11}'
+          f'{"sin q/s":>14}{"con q/s":>14}{"speedup":>9}')
+    for name, (path, inputs) in EXAMPLES.items():
+        compiler_output = compile_file(path)
+        executed = count_instructions(compiler_output, inputs)
+        fused_vm = make_vm(compiler_output, superinstructions=True)
+        fusions = sum(fused_vm.fusion_stats.values())
+        dispatches = count_dispatches(fused_vm, inputs)
+
+        rates = []
+        for superinstructions in (False, True):
+            def run(vm):
+                with silenced(inputs):
+                    vm.run()
+            elapsed = best_time(run, repeat, lambda: make_vm(compiler_output, superinstructions=superinstructions))
+            rates.append(executed / elapsed)
+        saved = executed - dispatches
+        print(f'{name:<26}{fusions:>9}{executed:>11}{dispatches:>11}{saved:>11}'
+              f'{rates[0]:>14,.0f}{rates[1]:>14,.0f}{rates[1] / rates[0]:>8.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+"""
+Benchmark de la eliminación de llamadas en posición de cola: ejecuta una función recursiva de cola con cientos de
+miles de llamadas anidadas, compilada con y sin la optimización. Reporta las llamadas por segundo, la
+profundidad máxima del stack de ejecución y el pico de memoria durante la ejecución. Antes verifica que la
+optimización no cambie el resultado de una función que lee una variable local que no escribe en cada llamada.
+
+Uso: python -m benchmarks.bench_tail_calls [repeticiones] [profundidad]
+"""
+import sys
+import tracemalloc
+from vm.memory import MemoryBackend
+from vm.threaded import ThreadedVM
+from benchmarks.utils import compile_code, make_vm, silenced, best_time
+
+"""
+Suma de 1 a n con un acumulador: la llamada recursiva es lo último que hace la función.
+"""
+TAIL_RECURSION = '''
+program tail_recursion
+
+fun sum_to(n: int, acc: int): int {
+    var r: int
+    r = acc
+    if (n > 0) {
+        r = sum_to(n - 1, acc + n)
+    }
+    return (r)
+}
+
+main() {
+    var n: int
+    read(n)
+    write(sum_to(n, 0))
+}
+'''
+
+"""
+La llamada de cola de swap no se puede reemplazar por un salto: en el caso base lee t, que solo se escribe antes
+de la llamada, así que reutilizar el frame le daría el valor de la llamada anterior en lugar de uno nuevo. La de
+acc sí se reemplaza.
+"""
+FRESH_LOCALS = '''
+program fresh_locals
+
+fun acc(n: int, a: int): int {
+    var val: int
+    if (n == 0) {
+        val = a
+    } else {
+        val = acc(n - 1, a + n)
+    }
+    return (val)
+}
+
+fun swap(x: int, y: int, n: int): int {
+    var val: int
+    var t: int
+    if (n == 0) {
+        val = x * 10 + y + t
+    } else {
+        t = 100
+        val = swap(y, x, n - 1)
+    }
+    return (val)
+}
+
+main() {
+    write(acc(100, 0))
+    write(" ")
+    write(swap(1, 2, 3))
+}
+'''
+
+CONFIGURATIONS = {
+    'list': dict(memory_backend=MemoryBackend.LIST),
+    'window': dict(memory_backend=MemoryBackend.WINDOW),
+    'window (closures)': dict(memory_backend=MemoryBackend.WINDOW, vm_class=ThreadedVM),
+}
+
+
+def max_call_depth(compiler_output, inputs):
+    """
+    Ejecuta el programa registrando la profundidad máxima del stack de ejecución.
+
+    :return: Número máximo de frames en el stack de ejecución.
+    """
+    vm = make_vm(compiler_output, memory_backend=MemoryBackend.WINDOW)
+    depth = len(vm.execution_stack)
+    switch_to_new_frame = vm.switch_to_new_frame
+
+    def counted_switch():
+        nonlocal depth
+        switch_to_new_frame()
+        depth = max(depth, len(vm.execution_stack))
+    vm.switch_to_new_frame = counted_switch
+    with silenced(inputs):
+        vm.run()
+    return depth
+
+
+def check_fresh_locals():
+    """
+    Ejecuta FRESH_LOCALS compilado con y sin la optimización en cada configuración de memoria y verifica que el
+    resultado (o el error, con las listas, que no inicializan sus valores) sea el mismo.
+    """
+    optimized = compile_code(FRESH_LOCALS, tail_calls=True)
+    if optimized.optimization_stats['tail_calls'] != 1:
+        raise AssertionError('Expected only the tail call of acc to be replaced, got '
+                             + str(optimized.optimization_stats['tail_calls']))
+    results = []
+    for compiler_output in (compile_code(FRESH_LOCALS, tail_calls=False), optimized):
+        result = []
+        for config in (dict(memory_backend=MemoryBackend.TYPED), *CONFIGURATIONS.values()):
+            try:
+                with silenced([]) as output:
+                    make_vm(compiler_output, **config).run()
+                result.append(output.getvalue())
+            except Exception as error:
+                result.append(type(error).__name__)
+        results.append(result)
+    if results[0] != results[1]:
+        raise AssertionError(f'Tail calls changed the result of fresh_locals: {results[0]} != {results[1]}')
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    depth = int(sys.argv[2]) if len(sys.argv) > 2 else 300000
+    inputs = [str(depth)]
+    check_fresh_locals()
+    print(f'{"compilación":<16}{"memoria":<20}{"llamadas/s":>14}{"frames":>10}{"KiB pico":>12}')
+    for label, tail_calls in (('sin optimizar', False), ('cola', True)):
+        compiler_output = compile_code(TAIL_RECURSION, tail_calls=tail_calls)
+        frames = max_call_depth(compiler_output, inputs)
+        for memory, config in CONFIGURATIONS.items():
+            if not tail_calls and config['memory_backend'] == MemoryBackend.LIST and depth > 100000:
+                # Cada frame con listas propias ocupa varios KiB; con esta profundidad no cabe en memoria.
+                continue
+
+            def setup():
+                return make_vm(compiler_output, **config)
+
+            def run(vm):
+                with silenced(inputs):
+                    vm.run()
+            elapsed = best_time(run, repeat, setup)
+
+            vm = setup()
+            tracemalloc.start()
+            run(vm)
+            peak = tracemalloc.get_traced_memory()[1] / 1024
+            tracemalloc.stop()
+            print(f'{label:<16}{memory:<20}{depth / elapsed:>14.0f}{frames:>10}{peak:>12.1f}')
+
+
+if __name__ == '__main__':
+    main()
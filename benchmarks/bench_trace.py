@@ -0,0 +1,42 @@
+"""
+Benchmark del trace de ejecución: compara el tiempo de VM.run sin trace con el de la ejecución que guarda las
+últimas instrucciones en un TraceBuffer, registrando todas las instrucciones o una de cada N. Antes de medir
+verifica que el trace no cambie la salida.
+
+Uso: python -m benchmarks.bench_trace [repeticiones]
+"""
+import sys
+from vm.trace import TraceBuffer
+from benchmarks.utils import EXAMPLES, compile_file, make_vm, silenced, best_time
+
+PROGRAMS = ('bubble_sort', 'fibonacci_recursive', 'matrix_multiplication')
+SAMPLES = (1, 10, 100)
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    print(f'{"programa":<24}{"run ms":>10}' + ''.join(f'{f"1 de {sample} ms":>16}' for sample in SAMPLES))
+    for name in PROGRAMS:
+        path, inputs = EXAMPLES[name]
+        compiler_output = compile_file(path)
+        with silenced(inputs) as output:
+            make_vm(compiler_output).run()
+        expected = output.getvalue()
+        times = []
+        for sample in (None, *SAMPLES):
+            def make_trace():
+                return None if sample is None else TraceBuffer(sample_every=sample)
+            with silenced(inputs) as output:
+                make_vm(compiler_output).run(trace=make_trace())
+            if output.getvalue() != expected:
+                raise AssertionError(f'{name}: tracing changed the output')
+
+            def run(vm):
+                with silenced(inputs):
+                    vm.run(trace=make_trace())
+            times.append(best_time(run, repeat, lambda: make_vm(compiler_output)))
+        print(f'{name:<24}{times[0] * 1000:>10.2f}' + ''.join(f'{elapsed * 1000:>16.2f}' for elapsed in times[1:]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""
+Benchmark de los ciclos vectorizados: ejecuta programas con ciclos for de aritmetica elemento por elemento sobre
+arreglos con la memoria tipada (que ejecuta el ciclo escalar) y con la memoria de NumPy (que ejecuta las
+instrucciones VECTOR), con la tabla de despacho y con ThreadedVM. Antes de medir verifica que todas las
+configuraciones produzcan la misma salida que el programa compilado sin vectorizar.
+
+Uso: python -m benchmarks.bench_vectorize [tamaño] [repeticiones]
+"""
+import sys
+from vm.memory import MemoryBackend, numpy
+from vm.threaded import ThreadedVM
+from vm.streams import IteratorSource, ListSink
+from benchmarks.utils import compile_code, make_vm, best_time
+
+"""
+Programas de prueba; SIZE se reemplaza por el tamaño de los arreglos. Cada partición de un scope tiene 1500
+direcciones, así que los arreglos se reparten entre el scope global y el de main.
+"""
+PROGRAMS = {
+    'saxpy': '''
+program saxpy
+var a[SIZE]: float
+var b[SIZE]: float
+
+main() {
+    var c[SIZE]: float
+    var i: int
+    var k: float
+    var r: int
+    k = 2.5
+    for i = 0 to SIZE {
+        a[i] = i * 0.5
+        b[i] = SIZE - i
+    }
+    for r = 0 to 20 {
+        for i = 0 to SIZE {
+            c[i] = a[i] + b[i] * k
+        }
+    }
+    write(c[0])
+    write(c[SIZE - 1])
+}
+''',
+    'int_update': '''
+program int_update
+var b[SIZE]: int
+
+main() {
+    var a[SIZE]: int
+    var i: int
+    var r: int
+    for i = 0 to SIZE {
+        b[i] = i * 3 - 7
+    }
+    for r = 0 to 20 {
+        for i = 0 to SIZE {
+            a[i] = a[i] + b[i] * r - i
+        }
+    }
+    write(a[0])
+    write(a[SIZE - 1])
+}
+''',
+}
+
+CONFIGS = {
+    'typed (escalar)': dict(memory_backend=MemoryBackend.TYPED),
+    'numpy': dict(memory_backend=MemoryBackend.NUMPY),
+    'numpy (closures)': dict(memory_backend=MemoryBackend.NUMPY, vm_class=ThreadedVM),
+}
+
+
+def run_output(compiler_output, **kwargs):
+    output = ListSink()
+    make_vm(compiler_output, output=output, input_source=IteratorSource([]), **kwargs).run()
+    return output.getvalue()
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 700
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    if numpy is None:
+        print('NumPy no esta instalado: la memoria numpy utiliza los arreglos tipados y no se vectoriza.')
+    print(f'{"programa":<14}{"configuración":<20}{"ms":>10}{"vs escalar":>12}')
+    for name, code in PROGRAMS.items():
+        code = code.replace('SIZE', str(size))
+        compiler_output = compile_code(code)
+        expected = run_output(compile_code(code, vectorize=False), memory_backend=MemoryBackend.TYPED)
+        baseline = None
+        for label, config in CONFIGS.items():
+            if run_output(compiler_output, **config) != expected:
+                raise AssertionError(f'{name}: {label} output differs from the scalar execution')
+            elapsed = best_time(lambda vm: vm.run(), repeat,
+                                lambda: make_vm(compiler_output, output=ListSink(), **config))
+            baseline = baseline or elapsed
+            print(f'{name:<14}{label:<20}{elapsed * 1000:>10.2f}{baseline / elapsed:>11.1f}x')
+        print(f'{"":<14}ciclos vectorizados: {compiler_output.optimization_stats["vectorized_loops"]}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""
+Verificación de AsyncVM: comprueba que el event loop reparta las porciones de ejecución de forma equitativa entre
+las sesiones y que una sesión esperando su entrada en AsyncQueueSource.read no detenga a las demás. A diferencia
+de bench_async no mide tiempos; termina con código de salida 1 si alguna verificación falla.
+
+Uso: python -m benchmarks.check_async [sesiones]
+"""
+import asyncio
+import sys
+from vm.cooperative import AsyncVM
+from vm.streams import AsyncQueueSource, ListSink
+from benchmarks.utils import compile_code, make_vm
+
+"""
+Programa que solo calcula, sin READ: cada sesión necesita muchas porciones para terminar.
+"""
+BUSY_LOOP = '''
+program busy_loop
+
+main() {
+    var i: int
+    var total: int
+    total = 0
+    for i = 0 to 20000 {
+        total = total + i
+    }
+    write(total)
+}
+'''
+
+"""
+Programa que espera un valor con READ antes de escribir su doble.
+"""
+READ_ECHO = '''
+program read_echo
+
+main() {
+    var n: int
+    var twice: int
+    read(n)
+    twice = n * 2
+    write(twice)
+}
+'''
+
+SLICE_SIZES = (100, 1000, 10000)
+
+
+async def check_fairness(compiler_output, sessions, slice_size):
+    """
+    Ejecuta varias sesiones que solo calculan y, cada vez que una tarea monitor recupera el event loop, compara
+    las porciones ejecutadas por las sesiones que no han terminado. Con un reparto equitativo ninguna sesión
+    puede llevar más de una porción de ventaja sobre otra.
+
+    :return: Lista de errores encontrados (vacia si la verificación pasa).
+    """
+    vms = [make_vm(compiler_output, AsyncVM, slice_size=slice_size, output=ListSink()) for _ in range(sessions)]
+    tasks = [asyncio.create_task(vm.run_async()) for vm in vms]
+    spread = 0
+    while not all(task.done() for task in tasks):
+        running = [vm.slices for vm, task in zip(vms, tasks) if not task.done()]
+        spread = max(spread, max(running) - min(running))
+        await asyncio.sleep(0)
+    await asyncio.gather(*tasks)
+    errors = []
+    if spread > 1:
+        errors.append(f'unfair scheduling: a session got {spread} slices ahead of another')
+    outputs = {vm.output.getvalue() for vm in vms}
+    if len(outputs) != 1:
+        errors.append('the sessions produced different outputs: ' + str(outputs))
+    return errors
+
+
+async def check_blocked_read(busy, echo, sessions, slice_size):
+    """
+    Ejecuta una sesión que espera su entrada en AsyncQueueSource.read junto con varias sesiones que solo
+    calculan. Las sesiones que calculan deben terminar (repartiendose el event loop de forma equitativa) mientras
+    la sesión bloqueada sigue esperando; al recibir su valor, la sesión bloqueada debe terminar con la salida
+    esperada.
+
+    :return: Lista de errores encontrados (vacia si la verificación pasa).
+    """
+    source = AsyncQueueSource()
+    blocked_vm = make_vm(echo, AsyncVM, slice_size=slice_size, input_source=source, output=ListSink())
+    blocked = asyncio.create_task(blocked_vm.run_async())
+    vms = [make_vm(busy, AsyncVM, slice_size=slice_size, output=ListSink()) for _ in range(sessions)]
+    tasks = [asyncio.create_task(vm.run_async()) for vm in vms]
+    errors = []
+    spread = 0
+    while not all(task.done() for task in tasks):
+        if blocked.done():
+            error = blocked.exception()
+            errors.append('the blocked session finished before receiving its input'
+                          + ('' if error is None else f' ({type(error).__name__})'))
+            break
+        running = [vm.slices for vm, task in zip(vms, tasks) if not task.done()]
+        spread = max(spread, max(running) - min(running))
+        await asyncio.sleep(0)
+    await asyncio.gather(*tasks)
+    if spread > 1:
+        errors.append(f'unfair scheduling while a session waits for input: spread of {spread} slices')
+    if blocked.done():
+        return errors
+    source.queue.put_nowait('21')
+    try:
+        await asyncio.wait_for(blocked, timeout=5)
+    except asyncio.TimeoutError:
+        errors.append('the blocked session did not resume after receiving its input')
+        return errors
+    if blocked_vm.output.getvalue() != '42':
+        errors.append('the blocked session wrote ' + repr(blocked_vm.output.getvalue()) + " instead of '42'")
+    return errors
+
+
+def main():
+    sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    busy = compile_code(BUSY_LOOP)
+    echo = compile_code(READ_ECHO)
+    failures = 0
+    for slice_size in SLICE_SIZES:
+        for label, check in (('equidad', check_fairness(busy, sessions, slice_size)),
+                             ('READ bloqueado', check_blocked_read(busy, echo, sessions, slice_size))):
+            errors = asyncio.run(check)
+            print(f'{label:<16}porción {slice_size:>6}: {"OK" if not errors else "FALLA"}')
+            for error in errors:
+                print('    ' + error)
+            failures += len(errors)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
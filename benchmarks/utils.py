@@ -0,0 +1,121 @@
+"""
+Funciones auxiliares para los benchmarks de la maquina virtual.
+Los benchmarks se ejecutan desde la raiz del proyecto, por ejemplo: python -m benchmarks.bench_dispatch
+"""
+import builtins
+import contextlib
+import io
+import time
+from compiler.lexer import CompLexer
+from compiler.parser import CompParser
+from vm.vm import VM
+
+"""
+Ejemplos incluidos en el proyecto que compilan, junto con los valores que se le dan a sus instrucciones READ.
+"""
+EXAMPLES = {
+    'binary_search': ('examples/binary_search.txt', ['7']),
+    'bubble_sort': ('examples/bubble_sort.txt', []),
+    'factorial_iterative': ('examples/factorial_iterative.txt', ['20']),
+    'factorial_recursive': ('examples/factorial_recursive.txt', ['20']),
+    'fibonacci_iterative': ('examples/fibonacci_iterative.txt', ['60']),
+    'fibonacci_recursive': ('examples/fibonacci_recursive.txt', ['16']),
+    'fun_declaration_and_call': ('examples/fun_declaration_and_call', []),
+    'matrix_multiplication': ('examples/matrix_multiplication.txt', []),
+    'test_success2': ('examples/test_success2.txt', []),
+    'test_success3': ('examples/test_success3.txt', ['5']),
+}
+
+
+def compile_code(code, **optimizations):
+    """
+    Compila el código de un programa Dale++.
+
+    :param code: Código fuente.
+    :param optimizations: Opciones de compiler.optimizer.optimize (por default las de common/compiler_options.py).
+    :return: Instancia de CompilerOutput.
+    """
+    return CompParser(**optimizations).parse(CompLexer().tokenize(code))
+
+
+def compile_file(path, **optimizations):
+    """
+    Compila un archivo con un programa Dale++.
+
+    :param path: Ruta del archivo.
+    :param optimizations: Opciones de compiler.optimizer.optimize.
+    :return: Instancia de CompilerOutput.
+    """
+    with open(path, 'r') as input_file:
+        return compile_code(input_file.read(), **optimizations)
+
+
+def make_vm(compiler_output, vm_class=VM, **kwargs):
+    """
+    Crea una VM para ejecutar el resultado de la compilación.
+
+    :param compiler_output: Instancia de CompilerOutput.
+    :param vm_class: Clase de la maquina virtual (VM o alguna de sus subclases).
+    :param kwargs: Argumentos adicionales para la VM.
+    :return: Instancia de vm_class.
+    """
+    return vm_class(quad_list=compiler_output.quadruples,
+              const_table=compiler_output.constants,
+              fun_dir=compiler_output.functions_directory,
+              global_partition_sizes=compiler_output.global_partition_sizes,
+              pointer_partition_sizes=compiler_output.pointer_partition_sizes,
+              **kwargs)
+
+
+@contextlib.contextmanager
+def silenced(inputs):
+    """
+    Contexto que alimenta las instrucciones READ con la lista de valores "inputs" y captura la salida estandar.
+
+    :param inputs: Lista de valores (str) para las instrucciones READ.
+    :return: El buffer donde se captura la salida.
+    """
+    values = iter(inputs)
+    original_input = builtins.input
+    builtins.input = lambda prompt='': next(values)
+    output = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(output):
+            yield output
+    finally:
+        builtins.input = original_input
+
+
+def count_instructions(compiler_output, inputs):
+    """
+    Cuenta las instrucciones que ejecuta un programa utilizando el interprete de referencia.
+
+    :param compiler_output: Instancia de CompilerOutput.
+    :param inputs: Lista de valores para las instrucciones READ.
+    :return: Número de cuadruplos ejecutados.
+    """
+    vm = make_vm(compiler_output)
+    executed = 0
+    with silenced(inputs):
+        while vm.get_current_frame().IP < len(vm.quad_list):
+            vm.next_instruction()
+            executed += 1
+    return executed
+
+
+def best_time(run, repeat, setup=None):
+    """
+    Ejecuta "run" varias veces y regresa el mejor tiempo en segundos.
+
+    :param run: Función a medir. Si se da "setup", recibe su resultado como argumento.
+    :param repeat: Número de repeticiones.
+    :param setup: Función sin argumentos que se ejecuta antes de cada repetición, fuera de la medición.
+    :return: El menor tiempo medido.
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        args = () if setup is None else (setup(),)
+        start = time.perf_counter()
+        run(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
@@ -0,0 +1,20 @@
+"""
+Se definen como constantes las opciones de optimización del compilador.
+"""
+# Elimina los cuadruplos VERIFY de los accesos a arreglos cuyo indice esta demostrado dentro de los limites del
+# arreglo (variables de control de ciclos for con limites constantes).
+OPTIMIZE_BOUNDS_CHECKS = True
+# Reemplaza las llamadas recursivas en posición de cola (la función solo regresa el valor de la llamada) por un
+# salto al inicio de la función que reutiliza su frame.
+OPTIMIZE_TAIL_CALLS = True
+
+# Agrega instrucciones VECTOR a los ciclos for cuyo cuerpo es aritmetica elemento por elemento sobre arreglos
+# indexados por la variable de control. La VM solo las ejecuta con la memoria 'numpy'; con cualquier otra memoria
+# ejecuta el ciclo normal.
+OPTIMIZE_VECTORIZE = True
+# Agrega instrucciones MATMUL a los tres ciclos for anidados que calculan p[i][j] = p[i][j] + a[i][k] * b[k][j].
+# La VM calcula el producto con un kernel (de NumPy con la memoria 'numpy') en vez de interpretar los ciclos.
+OPTIMIZE_MATMUL = True
+# Agrega instrucciones FILL y COPYBLOCK a los ciclos for (de una o dos dimensiones) que llenan un arreglo con un
+# valor o lo copian de otro arreglo del mismo tipo. La VM escribe todo el rango con asignaciones de slices.
+OPTIMIZE_BULK_STORES = True
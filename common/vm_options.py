@@ -0,0 +1,54 @@
+"""
+Se definen como constantes las opciones de ejecución de la maquina virtual.
+"""
+# Motor de ejecución: 'if_chain' (interprete de referencia), 'table' (tabla de despacho), 'threaded' (closures) o
+# 'register' (programa traducido a registros por frame).
+VM_BACKEND = 'table'
+# Memoria de la VM: 'list' (listas de Python), 'typed' (arreglos tipados por frame), 'window' (stack contiguo de
+# arreglos tipados, solo con 'table' y 'threaded') o 'numpy' (arreglos de NumPy por frame; ejecuta los ciclos
+# vectorizados por el compilador, requiere NumPy). 'typed', 'window' y 'numpy' limitan los enteros a 64 bits.
+VM_MEMORY = 'list'
+# Perfilador de la VM: si es verdadero, al terminar la ejecución se imprime el reporte de las instrucciones
+# ejecutadas y se guarda en formato JSON en VM_PROFILE_JSON. Se mide el tiempo de 1 de cada VM_PROFILE_SAMPLE
+# instrucciones.
+VM_PROFILE = False
+VM_PROFILE_SAMPLE = 1
+VM_PROFILE_JSON = 'vm_profile.json'
+# Perfilador de llamadas: si es verdadero (y VM_PROFILE es falso), al terminar la ejecución se imprime el reporte
+# de cada función (llamadas, instrucciones y tiempo inclusivos y exclusivos, profundidad máxima de recursión),
+# ordenado por tiempo exclusivo, y se guarda en formato JSON en VM_CALL_PROFILE_JSON.
+VM_CALL_PROFILE = False
+VM_CALL_PROFILE_JSON = 'vm_calls.json'
+# Perfilador por línea: si es verdadero (y VM_PROFILE es falso), al terminar la ejecución se imprime el listado del
+# programa con las instrucciones ejecutadas y el tiempo estimado de cada línea, marcando las más costosas, y se
+# guarda el reporte en formato JSON en VM_LINE_PROFILE_JSON. Utiliza VM_PROFILE_SAMPLE.
+VM_LINE_PROFILE = False
+VM_LINE_PROFILE_JSON = 'vm_lines.json'
+# Trace de ejecución: si VM_TRACE es verdadero, la VM guarda las últimas VM_TRACE_SIZE instrucciones ejecutadas (una
+# de cada VM_TRACE_SAMPLE) con los valores de sus operandos, y las imprime si la ejecución termina con un error. Con
+# DEBUG_VM (common/debug_flags.py) el trace se imprime tambien al terminar la ejecución.
+VM_TRACE = False
+VM_TRACE_SIZE = 1000
+VM_TRACE_SAMPLE = 1
+# Número de caracteres que acumula la salida de la VM antes de escribirlos en pantalla. La salida también se
+# escribe antes de cada READ y al terminar la ejecución.
+VM_OUTPUT_BUFFER = 8192
+# Entrada de la instrucción READ: None (se le pide cada valor al usuario), 'stdin' (se lee toda la entrada estandar
+# de una sola vez) o la ruta de un archivo; en los dos ultimos casos cada línea es un valor.
+VM_INPUT = None
+# Si no es None, los valores que consume READ se guardan en este archivo para repetir la ejecución con VM_INPUT.
+VM_INPUT_RECORD = None
+# Limites de ejecución para programas que pueden no terminar (None = sin limite): instrucciones ejecutadas,
+# frames en el stack de ejecución y segundos de ejecución.
+VM_MAX_INSTRUCTIONS = None
+VM_MAX_CALL_DEPTH = None
+VM_MAX_SECONDS = None
+# Snapshots del estado de la VM: si VM_SNAPSHOT_LOAD no es None, la ejecución continua desde el estado guardado en
+# ese archivo; si VM_SNAPSHOT_SAVE no es None, el estado se guarda en ese archivo al terminar o al detenerse por un
+# limite de ejecución.
+VM_SNAPSHOT_LOAD = None
+VM_SNAPSHOT_SAVE = None
+# Memoización de las funciones puras que detecta el compilador: si no es None, la VM guarda los valores de regreso
+# de hasta VM_MEMO_SIZE combinaciones de argumentos por función, descartando las menos usadas. Solo con los motores
+# 'table' y 'threaded'.
+VM_MEMO_SIZE = None
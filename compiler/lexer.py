@@ -60,7 +60,8 @@ class CompLexer(SlyLexer):
 
     @_(r'\".+\"')
     def CTE_S(self, t):
-        t.value = t.value[1:-1]
+        # Las secuencias de escape se resuelven al compilar, la VM escribe las cadenas tal cual.
+        t.value = t.value[1:-1].replace('\\n', '\n')
         return t
 
     # Line number tracking
@@ -0,0 +1,1031 @@
+from dataclasses import dataclass
+from compiler.quadruple import Operator, Quadruple
+from compiler.symbol_table import VarType, ReturnType
+from common.scope_size import GLOBAL_ADDRESS_RANGE, LOCAL_ADDRESS_RANGE, CONST_ADDRESS_RANGE, TEMP_ADDRESS_RANGE
+from common.compiler_options import OPTIMIZE_BOUNDS_CHECKS, OPTIMIZE_TAIL_CALLS, OPTIMIZE_VECTORIZE, \
+    OPTIMIZE_MATMUL, OPTIMIZE_BULK_STORES
+
+"""
+Pasadas de optimización sobre la lista de cuadruplos generada por las acciones semanticas. Cada pasada modifica la
+lista (y el directorio de funciones) en su lugar y regresa cuantas veces se aplico.
+"""
+
+"""
+Operadores de salto dentro de una función, y todos los operadores cuyo resultado (C) es un indice de cuadruplo.
+"""
+BRANCH_OPERATORS = {Operator.GOTO, Operator.GOTOF, Operator.GOTOT}
+JUMP_OPERATORS = BRANCH_OPERATORS | {Operator.GOSUB, Operator.VECTOR, Operator.MATMUL, Operator.FILL,
+                                      Operator.COPYBLOCK}
+
+"""
+Operadores que escriben un valor en la dirección C.
+"""
+SCALAR_WRITES = {Operator.PLUS, Operator.MINUS, Operator.TIMES, Operator.DIVIDE, Operator.AND, Operator.OR,
+                 Operator.LESSTHAN, Operator.GREATERTHAN, Operator.LESSTHANOREQ, Operator.GREATERTHANOREQ,
+                 Operator.EQUAL, Operator.NOTEQUAL, Operator.ASSIGN, Operator.READ, Operator.LOADIDX}
+
+"""
+Operadores aritmeticos que un ciclo vectorizado aplica elemento por elemento.
+"""
+VECTOR_ARITHMETIC = {Operator.PLUS, Operator.MINUS, Operator.TIMES, Operator.DIVIDE}
+
+
+def replace_quads(quad_list, fun_dir, replacements):
+    """
+    Reemplaza cuadruplos de la lista por secuencias de cuadruplos (posiblemente vacias) y reasigna los destinos de
+    los saltos, los GOSUB y el inicio de cada función. Un salto a un cuadruplo reemplazado continua en el primer
+    cuadruplo de su reemplazo, o en el siguiente cuadruplo si el reemplazo es vacio. Los saltos de los cuadruplos
+    nuevos también se expresan con los indices originales, y los que no tienen línea del código fuente toman la del
+    cuadruplo que reemplazan.
+
+    :param quad_list: Lista de cuadruplos, se modifica en su lugar.
+    :param fun_dir: Directorio de funciones.
+    :param replacements: Diccionario que asocia el indice de cada cuadruplo a reemplazar con su lista de reemplazo.
+    :return: Lista que asocia cada indice original (incluyendo el final de la lista) con su nuevo indice.
+    """
+    index_map = []
+    new_list = []
+    for i, quad in enumerate(quad_list):
+        index_map.append(len(new_list))
+        replacement = replacements.get(i, [quad])
+        for new_quad in replacement:
+            if new_quad.line is None:
+                new_quad.line = quad.line
+        new_list.extend(replacement)
+    index_map.append(len(new_list))
+
+    quad_list[:] = new_list
+    for quad in quad_list:
+        if quad.operator in JUMP_OPERATORS and quad.result is not None:
+            quad.result = index_map[quad.result]
+    for fun in fun_dir.values():
+        if fun.start_addr is not None:
+            fun.start_addr = index_map[fun.start_addr]
+    return index_map
+
+
+def remove_quads(quad_list, fun_dir, removed):
+    """
+    Elimina cuadruplos de la lista y reasigna los saltos (ver replace_quads).
+
+    :param quad_list: Lista de cuadruplos, se modifica en su lugar.
+    :param fun_dir: Directorio de funciones.
+    :param removed: Conjunto con los indices de los cuadruplos a eliminar.
+    :return: Lista que asocia cada indice original (incluyendo el final de la lista) con su nuevo indice.
+    """
+    return replace_quads(quad_list, fun_dir, {i: [] for i in removed})
+
+
+def find_regions(quad_list, fun_dir):
+    """
+    Encuentra el rango de cuadruplos de cada función y de main. Las funciones terminan en su ENDFUN; main empieza
+    en el destino del GOTO inicial y termina al final de la lista.
+
+    :return: Diccionario que asocia el nombre de cada función con una tupla (inicio, fin), con el fin exclusivo.
+    """
+    regions = dict()
+    for fun in fun_dir.values():
+        if fun.start_addr is None:
+            continue
+        end = fun.start_addr
+        while end < len(quad_list) and quad_list[end].operator != Operator.ENDFUN:
+            end += 1
+        regions[fun.name] = (fun.start_addr, min(end + 1, len(quad_list)))
+    if quad_list and quad_list[0].operator == Operator.GOTO and quad_list[0].result is not None:
+        regions['main'] = (quad_list[0].result, len(quad_list))
+    return regions
+
+
+@dataclass
+class CountedLoop:
+    """
+    Ciclo for generado por las acciones semanticas:
+
+        init:           C = inicio
+                        F = final
+        condition:      T = C < F
+                        GOTOF T fin
+        body_start:     ...
+        body_end:       T2 = C + 1
+                        C = T2
+                        GOTO condition
+        fin:
+
+    Atributos:
+        control:        Dirección de la variable de control.
+        init:           Indice del ASSIGN que inicializa la variable de control.
+        condition:      Indice de la comparación de la variable de control con el valor final.
+        body_start:     Indice del primer cuadruplo del cuerpo.
+        body_end:       Indice del incremento de la variable de control (fin exclusivo del cuerpo).
+    """
+    control: int
+    init: int
+    condition: int
+    body_start: int
+    body_end: int
+
+
+def is_local(addr):
+    return type(addr) == int and LOCAL_ADDRESS_RANGE[0] <= addr < LOCAL_ADDRESS_RANGE[1]
+
+
+def is_temp(addr):
+    return type(addr) == int and TEMP_ADDRESS_RANGE[0] <= addr < TEMP_ADDRESS_RANGE[1]
+
+
+def partition_of(addr):
+    """
+    :param addr: Dirección (absoluta).
+    :return: Indice de la partición por tipo de dato (int, float, char, bool) de la dirección.
+    """
+    for start_addr, end_addr in (GLOBAL_ADDRESS_RANGE, LOCAL_ADDRESS_RANGE, CONST_ADDRESS_RANGE, TEMP_ADDRESS_RANGE):
+        if start_addr <= addr < end_addr:
+            return (addr - start_addr) // ((end_addr - start_addr + 1) // 4)
+    raise MemoryError('Address out of bounds')
+
+
+class RangeAnalysis:
+    """
+    Analisis de los valores enteros que puede tomar una dirección en una función. Solo conoce los valores de las
+    constantes, de los temporales (que se escriben una sola vez), de las variables locales que se asignan una sola
+    vez antes de cualquier salto y de las variables de control de los ciclos for que no se modifican en su cuerpo.
+    Las variables globales se consideran desconocidas, ya que cualquier función las puede modificar.
+
+    Atributos:
+        quad_list:      Lista de cuadruplos.
+        start:          Indice del primer cuadruplo de la función.
+        end:            Fin (exclusivo) de la función.
+        constants:      Diccionario que asocia la dirección de cada constante entera con su valor.
+        writes:         Diccionario que asocia cada dirección local o temporal con los indices que la escriben.
+        first_jump:     Indice del primer salto de la función.
+        loops:          Ciclos for de la función, instancias de CountedLoop.
+    """
+
+    def __init__(self, quad_list, start, end, constants):
+        self.quad_list = quad_list
+        self.start = start
+        self.end = end
+        self.constants = constants
+        self.writes = dict()
+        self.first_jump = end
+        for i in range(start, end):
+            quad = quad_list[i]
+            if quad.operator in SCALAR_WRITES and (is_local(quad.result) or is_temp(quad.result)):
+                self.writes.setdefault(quad.result, []).append(i)
+            elif quad.operator in BRANCH_OPERATORS:
+                self.first_jump = min(self.first_jump, i)
+        self.loops = self.find_counted_loops()
+
+    def find_counted_loops(self):
+        """
+        Encuentra los ciclos for cuya variable de control es local y solo se escribe en su inicialización y en su
+        incremento.
+
+        :return: Lista de instancias de CountedLoop.
+        """
+        quads = self.quad_list
+        loops = []
+        for q in range(self.start, self.end - 1):
+            condition, gotof = quads[q], quads[q + 1]
+            if condition.operator != Operator.LESSTHAN or gotof.operator != Operator.GOTOF \
+                    or gotof.left_operand != condition.result or not is_local(condition.left_operand):
+                continue
+            exit_index = gotof.result
+            if exit_index is None or not q + 5 <= exit_index <= self.end:
+                continue
+            control = condition.left_operand
+            goto, assign, increment = quads[exit_index - 1], quads[exit_index - 2], quads[exit_index - 3]
+            if goto.operator != Operator.GOTO or goto.result != q or assign.operator != Operator.ASSIGN \
+                    or assign.result != control or increment.operator != Operator.PLUS \
+                    or increment.left_operand != control or increment.result != assign.left_operand \
+                    or self.constants.get(increment.right_operand) != 1:
+                continue
+            writes = self.writes.get(control, [])
+            init = max((i for i in writes if i < q), default=None)
+            if init is None or quads[init].operator != Operator.ASSIGN \
+                    or any(i not in (init, exit_index - 2) and init < i < exit_index for i in writes) \
+                    or any(quads[i].operator in BRANCH_OPERATORS for i in range(init, q)):
+                continue
+            loops.append(CountedLoop(control=control, init=init, condition=q, body_start=q + 2,
+                                     body_end=exit_index - 3))
+        return loops
+
+    def value_range(self, addr, index, depth=0):
+        """
+        Calcula los valores que puede tener una dirección al ejecutar el cuadruplo "index".
+
+        :param addr: Dirección a analizar.
+        :param index: Indice del cuadruplo donde se lee la dirección.
+        :return: Tupla (minimo, maximo) inclusiva, o None si los valores son desconocidos.
+        """
+        if addr in self.constants:
+            value = self.constants[addr]
+            return value, value
+        if depth > 32:
+            return None
+        if is_local(addr):
+            for loop in self.loops:
+                if loop.control == addr and loop.body_start <= index < loop.body_end:
+                    return self.loop_range(loop, depth)
+            writes = self.writes.get(addr, [])
+            if len(writes) == 1 and writes[0] < index and writes[0] < self.first_jump:
+                return self.defined_range(writes[0], depth)
+            return None
+        if is_temp(addr):
+            writes = self.writes.get(addr, [])
+            if len(writes) == 1 and writes[0] < index:
+                return self.defined_range(writes[0], depth)
+        return None
+
+    def defined_range(self, index, depth):
+        """
+        Calcula los valores que escribe el cuadruplo "index".
+
+        :return: Tupla (minimo, maximo) inclusiva, o None si los valores son desconocidos.
+        """
+        quad = self.quad_list[index]
+        if quad.operator == Operator.ASSIGN:
+            return self.value_range(quad.left_operand, index, depth + 1)
+        if quad.operator not in (Operator.PLUS, Operator.MINUS, Operator.TIMES):
+            return None
+        left = self.value_range(quad.left_operand, index, depth + 1)
+        right = self.value_range(quad.right_operand, index, depth + 1)
+        if left is None or right is None:
+            return None
+        if quad.operator == Operator.PLUS:
+            return left[0] + right[0], left[1] + right[1]
+        if quad.operator == Operator.MINUS:
+            return left[0] - right[1], left[1] - right[0]
+        products = [a * b for a in left for b in right]
+        return min(products), max(products)
+
+    def loop_range(self, loop, depth):
+        """
+        Calcula los valores de la variable de control en el cuerpo de un ciclo: desde el valor inicial hasta el
+        valor final menos uno.
+
+        :return: Tupla (minimo, maximo) inclusiva, o None si los valores son desconocidos.
+        """
+        init = self.defined_range(loop.init, depth + 1)
+        final = self.value_range(self.quad_list[loop.condition].right_operand, loop.condition, depth + 1)
+        if init is None or final is None:
+            return None
+        return init[0], final[1] - 1
+
+
+def integer_constants(const_table):
+    """
+    :param const_table: Tabla de constantes del compilador.
+    :return: Diccionario que asocia la dirección de cada constante entera con su valor.
+    """
+    return {const.address: int(const.name) for const in const_table.values() if const.type == VarType.INT}
+
+
+def eliminate_bounds_checks(quad_list, fun_dir, const_table):
+    """
+    Elimina los VERIFY cuyo indice esta demostrado dentro de los limites del arreglo en cada función, por ejemplo
+    "for i = 0 to 10" sobre un arreglo de 10 elementos. Los VERIFY con indices desconocidos se conservan.
+
+    :param quad_list: Lista de cuadruplos, se modifica en su lugar.
+    :param fun_dir: Directorio de funciones.
+    :param const_table: Tabla de constantes.
+    :return: Número de VERIFY eliminados.
+    """
+    constants = integer_constants(const_table)
+    removed = set()
+    for start, end in find_regions(quad_list, fun_dir).values():
+        analysis = None
+        for i in range(start, end):
+            quad = quad_list[i]
+            if quad.operator != Operator.VERIFY:
+                continue
+            low, high = constants.get(quad.right_operand), constants.get(quad.result)
+            if low is None or high is None:
+                continue
+            analysis = analysis or RangeAnalysis(quad_list, start, end, constants)
+            index_range = analysis.value_range(quad.left_operand, i)
+            if index_range is not None and low <= index_range[0] and index_range[1] < high:
+                removed.add(i)
+    if removed:
+        remove_quads(quad_list, fun_dir, removed)
+    return len(removed)
+
+
+def allocate_temp(fun, partition):
+    """
+    Reserva un temporal nuevo en el frame de una función, despues de los temporales asignados por el compilador.
+
+    :param fun: Instancia de FunctionsDirectoryItem.
+    :param partition: Indice de la partición por tipo de dato del temporal.
+    :return: Dirección del temporal.
+    """
+    partition_size = (TEMP_ADDRESS_RANGE[1] - TEMP_ADDRESS_RANGE[0] + 1) // 4
+    if fun.temp_partition_sizes[partition] >= partition_size:
+        raise Exception('Temp memory block overflow')
+    addr = TEMP_ADDRESS_RANGE[0] + partition * partition_size + fun.temp_partition_sizes[partition]
+    fun.temp_partition_sizes[partition] += 1
+    return addr
+
+
+def returns_call_result(quad_list, gosub, fun):
+    """
+    Verifica que una llamada este en posición de cola: despues del GOSUB la función solo copia el valor de
+    regreso de la llamada (en temporales, variables locales y su propia variable de regreso) y salta hasta su
+    ENDFUN, así que terminar la función con el valor de regreso de la llamada es equivalente.
+
+    :param quad_list: Lista de cuadruplos.
+    :param gosub: Indice del GOSUB.
+    :param fun: Instancia de FunctionsDirectoryItem de la función que se llama a si misma.
+    :return: Verdadero si la llamada esta en posición de cola.
+    """
+    i = gosub + 1
+    holders = set()
+    return_addr = None
+    if fun.return_type != ReturnType.VOID:
+        # fun_call copia la variable de regreso de la función a un temporal despues del GOSUB.
+        quad = quad_list[i] if i < len(quad_list) else None
+        if quad is None or quad.operator != Operator.ASSIGN or not is_temp(quad.result) \
+                or partition_of(quad.result) != partition_of(quad.left_operand):
+            return False
+        return_addr = quad.left_operand
+        holders = {return_addr, quad.result}
+        i += 1
+    visited = set()
+    while i < len(quad_list) and i not in visited:
+        visited.add(i)
+        quad = quad_list[i]
+        if quad.operator == Operator.ENDFUN:
+            return True
+        elif quad.operator == Operator.GOTO:
+            i = quad.result
+        elif quad.operator == Operator.ASSIGN and quad.left_operand in holders \
+                and (is_temp(quad.result) or is_local(quad.result) or quad.result == return_addr) \
+                and partition_of(quad.result) == partition_of(return_addr):
+            holders.add(quad.result)
+            i += 1
+        else:
+            return False
+    return False
+
+
+def defined_before_use(quad_list, start, end, fun):
+    """
+    Verifica que en todos los caminos desde el inicio de una función sus variables locales (salvo los parametros)
+    y sus temporales se escriban antes de leerse, y que la función no lea elementos de sus arreglos locales. Así
+    los valores que deja una llamada en el frame no se pueden observar si otra llamada lo reutiliza.
+
+    :param quad_list: Lista de cuadruplos.
+    :param start: Indice del primer cuadruplo de la función.
+    :param end: Fin (exclusivo) de la función.
+    :param fun: Instancia de FunctionsDirectoryItem.
+    :return: Verdadero si ninguna lectura puede ver un valor de una llamada anterior.
+    """
+    # Direcciones escritas en todos los caminos hasta cada cuadruplo (interseccion sobre sus predecesores).
+    defined_at = {start: frozenset(addr for addr, _ in fun.param_table)}
+    pending = [start]
+    while pending:
+        i = pending.pop()
+        defined = defined_at[i]
+        quad = quad_list[i]
+        if quad.operator == Operator.LOADIDX and is_local(quad.left_operand):
+            return False
+        if quad.operator in SCALAR_WRITES or quad.operator == Operator.STOREIDX:
+            # Sin el operando C, que se escribe (o es la dirección base del arreglo en STOREIDX).
+            reads = read_addresses(quad)[:2]
+        else:
+            reads = read_addresses(quad)
+        if any((is_local(addr) or is_temp(addr)) and addr not in defined for addr in reads):
+            return False
+        if quad.operator in SCALAR_WRITES and (is_local(quad.result) or is_temp(quad.result)):
+            defined = defined | {quad.result}
+        if quad.operator == Operator.ENDFUN:
+            successors = []
+        elif quad.operator == Operator.GOTO:
+            successors = [quad.result]
+        elif quad.operator in BRANCH_OPERATORS:
+            successors = [i + 1, quad.result]
+        else:
+            successors = [i + 1]
+        for successor in successors:
+            if not start <= successor < end:
+                continue
+            if successor not in defined_at:
+                defined_at[successor] = defined
+                pending.append(successor)
+            elif not defined_at[successor] <= defined:
+                defined_at[successor] = defined_at[successor] & defined
+                pending.append(successor)
+    return True
+
+
+def eliminate_tail_calls(quad_list, fun_dir):
+    """
+    Reemplaza las llamadas recursivas en posición de cola por un salto al inicio de la misma función que reutiliza
+    su frame: se eliminan el ERA y el GOSUB, los PARAMETER se vuelven ASSIGN a los parametros del frame actual y
+    se agrega un GOTO al inicio de la función. Si un argumento lee un parametro que ya se reasigno, primero se
+    copia a un temporal nuevo. Los cuadruplos que copiaban el valor de regreso quedan inalcanzables. Solo se
+    aplica a las funciones que escriben sus variables locales antes de leerlas (ver defined_before_use), ya que
+    el salto no reinicia el resto del frame.
+
+    :param quad_list: Lista de cuadruplos, se modifica en su lugar.
+    :param fun_dir: Directorio de funciones.
+    :return: Número de llamadas reemplazadas.
+    """
+    replacements = dict()
+    for name, (start, end) in find_regions(quad_list, fun_dir).items():
+        if name == 'main':
+            continue
+        fun = fun_dir[name]
+        fresh = None
+        for gosub in range(start, end):
+            if quad_list[gosub].operator != Operator.GOSUB or quad_list[gosub].left_operand != name \
+                    or not returns_call_result(quad_list, gosub, fun):
+                continue
+            if fresh is None:
+                fresh = defined_before_use(quad_list, start, end, fun)
+            if not fresh:
+                break
+            # Entre el ERA y el GOSUB solo hay PARAMETER y las lecturas de arreglos de los argumentos.
+            era = gosub - 1
+            while era >= start and quad_list[era].operator in (Operator.PARAMETER, Operator.LOADIDX):
+                era -= 1
+            if era < start or quad_list[era].operator != Operator.ERA or quad_list[era].result != name:
+                continue
+            sequence = quad_list[era + 1:gosub]
+            reads = [quad for quad in sequence if quad.operator == Operator.LOADIDX]
+            copies = []
+            assigns = []
+            written = set()
+            for quad in sequence:
+                if quad.operator != Operator.PARAMETER:
+                    continue
+                value = quad.left_operand
+                if value in written:
+                    temp = allocate_temp(fun, partition_of(quad.result))
+                    copies.append(Quadruple(Operator.ASSIGN, value, None, temp))
+                    value = temp
+                assigns.append(Quadruple(Operator.ASSIGN, value, None, quad.result))
+                written.add(quad.result)
+            replacements[era] = reads + copies + assigns + [Quadruple(Operator.GOTO, None, None, fun.start_addr)]
+            for i in range(era + 1, gosub + 1):
+                replacements[i] = []
+    if replacements:
+        replace_quads(quad_list, fun_dir, replacements)
+    return sum(1 for quads in replacements.values() if quads)
+
+
+@dataclass
+class VectorLoop:
+    """
+    Ciclo for cuyo cuerpo se puede ejecutar como una secuencia de operaciones sobre arreglos completos (ver
+    vectorize_loops). Es el operando A del cuadruplo VECTOR.
+
+    Atributos:
+        control:    Dirección de la variable de control.
+        final:      Dirección del valor final del ciclo.
+        bounds:     Tuplas (minimo, maximo) de los VERIFY de la variable de control en el cuerpo.
+        body:       Cuadruplos del cuerpo sin los VERIFY, en el mismo orden.
+    """
+    control: int
+    final: int
+    bounds: tuple
+    body: tuple
+
+
+def is_numeric(addr):
+    """
+    :param addr: Operando de un cuadruplo.
+    :return: Verdadero si el operando es una dirección global, local, constante o temporal int o float.
+    """
+    return type(addr) == int and GLOBAL_ADDRESS_RANGE[0] <= addr < TEMP_ADDRESS_RANGE[1] \
+        and partition_of(addr) in (0, 1)
+
+
+def vector_loop(quad_list, loop, constants):
+    """
+    Verifica si un ciclo for se puede vectorizar: su cuerpo solo lee y escribe elementos de arreglos int o float
+    indexados por la variable de control (LOADIDX y STOREIDX) y los combina con operaciones aritmeticas entre esos
+    elementos, la variable de control y valores que no cambian en el ciclo. En ese caso cada iteración solo toca
+    el elemento "i" de cada arreglo, así que ejecutar cada cuadruplo sobre todos los elementos, en orden, es
+    equivalente a ejecutar el ciclo. Un arreglo que se escribe en el ciclo solo se puede leer en el mismo indice.
+
+    :param quad_list: Lista de cuadruplos.
+    :param loop: Instancia de CountedLoop.
+    :param constants: Diccionario que asocia la dirección de cada constante entera con su valor.
+    :return: Instancia de VectorLoop, o None si el ciclo no se puede vectorizar.
+    """
+    control = loop.control
+    final = quad_list[loop.condition].right_operand
+    if partition_of(control) != 0 or not is_numeric(final) or partition_of(final) != 0:
+        return None
+    quads = quad_list[loop.body_start:loop.body_end]
+    written = {quad.result for quad in quads if quad.operator in SCALAR_WRITES}
+    stored = {quad.result for quad in quads if quad.operator == Operator.STOREIDX}
+    # Temporales que el cuerpo ya calculo: se pueden leer en los cuadruplos siguientes.
+    defined = {control}
+
+    def readable(addr):
+        return addr in defined or (is_numeric(addr) and addr not in written)
+
+    def is_array(addr):
+        return is_numeric(addr) and (is_local(addr) or addr < GLOBAL_ADDRESS_RANGE[1])
+
+    bounds = []
+    body = []
+    for quad in quads:
+        if quad.operator == Operator.VERIFY:
+            low, high = constants.get(quad.right_operand), constants.get(quad.result)
+            if quad.left_operand != control or low is None or high is None:
+                return None
+            bounds.append((low, high))
+            continue
+        if quad.operator == Operator.LOADIDX:
+            # Un indice fijo (que no cambia en el ciclo ni se calcula en el cuerpo) solo se permite en arreglos que
+            # el ciclo no escribe.
+            if not is_array(quad.left_operand) or not is_temp(quad.result) or quad.result in defined \
+                    or not (quad.right_operand == control
+                            or (readable(quad.right_operand) and quad.right_operand not in defined
+                                and quad.left_operand not in stored)):
+                return None
+            defined.add(quad.result)
+        elif quad.operator == Operator.STOREIDX:
+            if not is_array(quad.result) or quad.right_operand != control or not readable(quad.left_operand):
+                return None
+        elif quad.operator in VECTOR_ARITHMETIC:
+            if not is_temp(quad.result) or quad.result in defined or partition_of(quad.result) not in (0, 1) \
+                    or not readable(quad.left_operand) or not readable(quad.right_operand):
+                return None
+            defined.add(quad.result)
+        else:
+            return None
+        body.append(Quadruple(quad.operator, quad.left_operand, quad.right_operand, quad.result))
+    if not stored:
+        return None
+    return VectorLoop(control=control, final=final, bounds=tuple(bounds), body=tuple(body))
+
+
+def vectorize_loops(quad_list, fun_dir, const_table):
+    """
+    Agrega un cuadruplo VECTOR antes de la condición de cada ciclo for cuyo cuerpo es aritmetica elemento por
+    elemento sobre arreglos (ver vector_loop), por ejemplo "for i = 0 to n { c[i] = a[i] + b[i] * k }". Al
+    ejecutarse, VECTOR aplica el cuerpo a todos los elementos del rango, deja la variable de control en el valor
+    final y salta al final del ciclo; si la VM no puede vectorizarlo (sin NumPy, con otra memoria o con valores
+    que se saldrian de los limites) continua con el ciclo escalar, que se conserva sin cambios.
+
+    :param quad_list: Lista de cuadruplos, se modifica en su lugar.
+    :param fun_dir: Directorio de funciones.
+    :param const_table: Tabla de constantes.
+    :return: Número de ciclos vectorizados.
+    """
+    constants = integer_constants(const_table)
+    replacements = dict()
+    for start, end in find_regions(quad_list, fun_dir).values():
+        for loop in RangeAnalysis(quad_list, start, end, constants).loops:
+            # Los ciclos que ya se reemplazan por un FILL o un COPYBLOCK no se vectorizan.
+            if quad_list[loop.condition - 1].operator in (Operator.FILL, Operator.COPYBLOCK):
+                continue
+            vectorized = vector_loop(quad_list, loop, constants)
+            if vectorized is None:
+                continue
+            # VECTOR se agrega despues del cuadruplo anterior a la condición, ya que el GOTO del final del ciclo
+            # regresa a la condición y no debe volver a ejecutarlo.
+            before = loop.condition - 1
+            exit_index = loop.body_end + 3
+            replacements[before] = [quad_list[before], Quadruple(Operator.VECTOR, vectorized, None, exit_index)]
+    if replacements:
+        replace_quads(quad_list, fun_dir, replacements)
+    return len(replacements)
+
+
+@dataclass
+class MatMulNest:
+    """
+    Tres ciclos for anidados que multiplican matrices, "p[i][j] = p[i][j] + a[i][k] * b[k][j]" (ver
+    recognize_matmul). Es el operando A del cuadruplo MATMUL. Los arreglos se identifican por su dirección base y
+    su número de columnas.
+
+    Atributos:
+        i:              Variable de control del ciclo exterior.
+        i_final:        Dirección del valor final del ciclo exterior.
+        j:              Variable de control del ciclo intermedio.
+        j_start:        Dirección del valor inicial del ciclo intermedio.
+        j_final:        Dirección del valor final del ciclo intermedio.
+        k:              Variable de control del ciclo interior.
+        k_start:        Dirección del valor inicial del ciclo interior.
+        k_final:        Dirección del valor final del ciclo interior.
+        product:        Tupla (base, columnas) de la matriz p.
+        left:           Tupla (base, columnas) de la matriz a.
+        right:          Tupla (base, columnas) de la matriz b.
+        bounds:         Tuplas (variable de control, minimo, maximo) de los VERIFY del ciclo interior.
+    """
+    i: int
+    i_final: int
+    j: int
+    j_start: int
+    j_final: int
+    k: int
+    k_start: int
+    k_final: int
+    product: tuple
+    left: tuple
+    right: tuple
+    bounds: tuple
+
+
+def nested_loop(loops, outer):
+    """
+    :param loops: Ciclos for de la función, instancias de CountedLoop.
+    :param outer: Instancia de CountedLoop.
+    :return: El ciclo que forma todo el cuerpo de "outer", o None si el cuerpo tiene otros cuadruplos.
+    """
+    for loop in loops:
+        if loop.init == outer.body_start and loop.body_end + 3 == outer.body_end:
+            return loop
+    return None
+
+
+def symbolic_body(quad_list, loop, controls, constants):
+    """
+    Expresa el valor que escribe el único STOREIDX del cuerpo de un ciclo en terminos de las direcciones que lee.
+    Cada temporal se reemplaza por una tupla (operador, izquierdo, derecho) y cada LOADIDX por (LOADIDX, base,
+    indice).
+
+    :param quad_list: Lista de cuadruplos.
+    :param loop: Instancia de CountedLoop.
+    :param controls: Variables de control que pueden aparecer en los VERIFY del cuerpo.
+    :param constants: Diccionario que asocia la dirección de cada constante entera con su valor.
+    :return: Tupla (base, indice, valor, limites) del STOREIDX, o None si el cuerpo tiene otros cuadruplos.
+    """
+    expressions = dict()
+    store = None
+    bounds = []
+    for quad in quad_list[loop.body_start:loop.body_end]:
+        if quad.operator == Operator.VERIFY:
+            low, high = constants.get(quad.right_operand), constants.get(quad.result)
+            if quad.left_operand not in controls or low is None or high is None:
+                return None
+            bounds.append((quad.left_operand, low, high))
+        elif quad.operator in (Operator.PLUS, Operator.TIMES, Operator.LOADIDX):
+            if not is_temp(quad.result) or quad.result in expressions:
+                return None
+            expressions[quad.result] = (quad.operator, expressions.get(quad.left_operand, quad.left_operand),
+                                        expressions.get(quad.right_operand, quad.right_operand))
+        elif quad.operator == Operator.STOREIDX and store is None:
+            store = (quad.result, expressions.get(quad.right_operand, quad.right_operand),
+                     expressions.get(quad.left_operand, quad.left_operand))
+        else:
+            return None
+    if store is None:
+        return None
+    return (*store, tuple(bounds))
+
+
+def split(expression, operator):
+    """
+    :return: Los dos operandos de la expresión si es una operación "operator", o None.
+    """
+    if type(expression) == tuple and expression[0] == operator:
+        return expression[1], expression[2]
+    return None
+
+
+def matrix_index(expression, constants):
+    """
+    Reconoce el indice de un arreglo de dos dimensiones, "renglon * columnas + columna".
+
+    :return: Tupla (renglon, columnas, columna), o None.
+    """
+    terms = split(expression, Operator.PLUS)
+    if terms is None:
+        return None
+    for row_term, column in (terms, terms[::-1]):
+        factors = split(row_term, Operator.TIMES)
+        if factors is None:
+            continue
+        for row, columns in (factors, factors[::-1]):
+            if constants.get(columns, 0) > 0 and not is_temp(row) and not is_temp(column):
+                return row, constants[columns], column
+    return None
+
+
+def matrix_load(expression, constants):
+    """
+    :return: Tupla (base, renglon, columnas, columna) si la expresión lee un elemento de una matriz, o None.
+    """
+    if type(expression) != tuple or expression[0] != Operator.LOADIDX or not is_numeric(expression[1]) \
+            or is_temp(expression[1]) or CONST_ADDRESS_RANGE[0] <= expression[1] < CONST_ADDRESS_RANGE[1]:
+        return None
+    index = matrix_index(expression[2], constants)
+    return None if index is None else (expression[1], *index)
+
+
+def loop_limits(quad_list, loop):
+    """
+    :return: Tupla (inicio, final) con las direcciones que inicializan un ciclo for en exactamente dos ASSIGN
+             (la variable de control y el temporal del valor final), o None.
+    """
+    if loop.condition - loop.init != 2:
+        return None
+    final = quad_list[loop.init + 1]
+    if final.operator != Operator.ASSIGN or final.result != quad_list[loop.condition].right_operand:
+        return None
+    return quad_list[loop.init].left_operand, final.left_operand
+
+
+def matmul_nest(quad_list, loops, outer, constants):
+    """
+    Verifica si un ciclo for y los dos ciclos que forman su cuerpo calculan "p[i][j] = p[i][j] + a[i][k] * b[k][j]"
+    sobre matrices int o float, en cualquier orden de los operandos de la suma y del producto. Los limites de los
+    ciclos interiores deben ser constantes o variables int que la multiplicación no modifica, y p debe ser una
+    matriz distinta de a y b.
+
+    :param quad_list: Lista de cuadruplos.
+    :param loops: Ciclos for de la función.
+    :param outer: Instancia de CountedLoop del ciclo exterior.
+    :param constants: Diccionario que asocia la dirección de cada constante entera con su valor.
+    :return: Instancia de MatMulNest, o None.
+    """
+    middle = nested_loop(loops, outer)
+    inner = middle and nested_loop(loops, middle)
+    if inner is None:
+        return None
+    i, j, k = outer.control, middle.control, inner.control
+    written = {quad.result for quad in quad_list[outer.body_start:outer.body_end] if quad.operator in SCALAR_WRITES}
+    limits = [quad_list[outer.condition].right_operand]
+    for loop in (middle, inner):
+        loop_range = loop_limits(quad_list, loop)
+        if loop_range is None:
+            return None
+        limits.extend(loop_range)
+    if any(not is_numeric(addr) or partition_of(addr) != 0 for addr in limits + [i, j, k]) \
+            or any(addr in written for addr in limits):
+        return None
+    body = symbolic_body(quad_list, inner, (i, j, k), constants)
+    if body is None:
+        return None
+    base, index, value, bounds = body
+    index = matrix_index(index, constants)
+    terms = split(value, Operator.PLUS)
+    if index is None or index[0::2] != (i, j) or terms is None or not is_numeric(base) or is_temp(base):
+        return None
+    product_cols = index[1]
+    for accumulated, product in (terms, terms[::-1]):
+        factors = split(product, Operator.TIMES)
+        if matrix_load(accumulated, constants) != (base, i, product_cols, j) or factors is None:
+            continue
+        for left, right in (factors, factors[::-1]):
+            left, right = matrix_load(left, constants), matrix_load(right, constants)
+            if left is None or right is None or left[1:2] + left[3:] != (i, k) or right[1:2] + right[3:] != (k, j) \
+                    or base in (left[0], right[0]):
+                continue
+            return MatMulNest(i=i, i_final=limits[0], j=j, j_start=limits[1], j_final=limits[2], k=k,
+                              k_start=limits[3], k_final=limits[4], product=(base, product_cols),
+                              left=(left[0], left[2]), right=(right[0], right[2]), bounds=bounds)
+    return None
+
+
+def recognize_matmul(quad_list, fun_dir, const_table):
+    """
+    Agrega un cuadruplo MATMUL antes de la condición de cada anidamiento de tres ciclos for que multiplica
+    matrices (ver matmul_nest). Al ejecutarse, MATMUL calcula el producto completo con un kernel de la VM, deja las
+    variables de control en sus valores finales y salta al final del ciclo exterior; si no puede hacerlo (por
+    ejemplo si algún rango es vacio o un VERIFY fallaria) continua con los ciclos, que se conservan sin cambios.
+
+    :param quad_list: Lista de cuadruplos, se modifica en su lugar.
+    :param fun_dir: Directorio de funciones.
+    :param const_table: Tabla de constantes.
+    :return: Número de multiplicaciones reconocidas.
+    """
+    constants = integer_constants(const_table)
+    replacements = dict()
+    for start, end in find_regions(quad_list, fun_dir).values():
+        loops = RangeAnalysis(quad_list, start, end, constants).loops
+        for outer in loops:
+            nest = matmul_nest(quad_list, loops, outer, constants)
+            if nest is None:
+                continue
+            before = outer.condition - 1
+            replacements[before] = [quad_list[before], Quadruple(Operator.MATMUL, nest, None, outer.body_end + 3)]
+    if replacements:
+        replace_quads(quad_list, fun_dir, replacements)
+    return len(replacements)
+
+
+@dataclass
+class BulkStore:
+    """
+    Ciclo for, o dos ciclos for anidados, que escriben el mismo valor (FILL) o copian los elementos de otro
+    arreglo del mismo tipo (COPYBLOCK) en un rango de un arreglo (ver bulk_store). Es el operando A de los
+    cuadruplos FILL y COPYBLOCK. Un arreglo de una dimensión se trata como una matriz de una columna.
+
+    Atributos:
+        i:              Variable de control del ciclo exterior.
+        i_final:        Dirección del valor final del ciclo exterior.
+        j:              Variable de control del ciclo interior, o None si solo hay un ciclo.
+        j_start:        Dirección del valor inicial del ciclo interior, o None.
+        j_final:        Dirección del valor final del ciclo interior, o None.
+        target:         Tupla (base, columnas) del arreglo que se escribe.
+        source:         Dirección del valor (FILL) o tupla (base, columnas) del arreglo que se copia (COPYBLOCK).
+        bounds:         Tuplas (variable de control, minimo, maximo) de los VERIFY del cuerpo.
+    """
+    i: int
+    i_final: int
+    j: int
+    j_start: int
+    j_final: int
+    target: tuple
+    source: object
+    bounds: tuple
+
+
+def bulk_store(quad_list, loops, outer, constants):
+    """
+    Verifica si un ciclo for escribe un valor fijo o copia otro arreglo elemento por elemento, "a[i] = x",
+    "a[i] = b[i]", o si junto con el ciclo que forma todo su cuerpo escribe "a[i][j] = x" o "a[i][j] = b[i][j]".
+    El valor x debe ser una constante o una variable que los ciclos no modifican, b debe ser un arreglo distinto
+    de a del mismo tipo y con el mismo número de columnas, y los limites del ciclo interior deben ser invariantes.
+
+    :param quad_list: Lista de cuadruplos.
+    :param loops: Ciclos for de la función.
+    :param outer: Instancia de CountedLoop del ciclo exterior.
+    :param constants: Diccionario que asocia la dirección de cada constante entera con su valor.
+    :return: Tupla (operador, BulkStore) con el operador FILL o COPYBLOCK, o None.
+    """
+    i, j, j_start, j_final = outer.control, None, None, None
+    inner = nested_loop(loops, outer)
+    if inner is not None:
+        j = inner.control
+        limits = loop_limits(quad_list, inner)
+        if limits is None:
+            return None
+        j_start, j_final = limits
+    limits = [addr for addr in (quad_list[outer.condition].right_operand, j_start, j_final) if addr is not None]
+    written = {quad.result for quad in quad_list[outer.body_start:outer.body_end] if quad.operator in SCALAR_WRITES}
+    if any(not is_numeric(addr) or partition_of(addr) != 0 or addr in written for addr in limits):
+        return None
+    body = symbolic_body(quad_list, inner or outer, (i, j) if j else (i,), constants)
+    if body is None:
+        return None
+    base, index, value, bounds = body
+    if is_temp(base) or CONST_ADDRESS_RANGE[0] <= base < CONST_ADDRESS_RANGE[1]:
+        return None
+    if j is None:
+        columns = 1
+        if index != i:
+            return None
+    else:
+        index = matrix_index(index, constants)
+        if index is None or index[0::2] != (i, j):
+            return None
+        columns = index[1]
+    if type(value) != tuple:
+        if is_temp(value) or value in written or value in (i, j):
+            return None
+        return Operator.FILL, BulkStore(i, quad_list[outer.condition].right_operand, j, j_start, j_final,
+                                        (base, columns), value, bounds)
+    if value[0] != Operator.LOADIDX:
+        return None
+    source = value[1]
+    source_index = value[2] if j is None else matrix_index(value[2], constants)
+    if source_index != (i if j is None else (i, columns, j)) or source == base or is_temp(source) \
+            or CONST_ADDRESS_RANGE[0] <= source < CONST_ADDRESS_RANGE[1] or partition_of(source) != partition_of(base):
+        return None
+    return Operator.COPYBLOCK, BulkStore(i, quad_list[outer.condition].right_operand, j, j_start, j_final,
+                                         (base, columns), (source, columns), bounds)
+
+
+def lower_bulk_stores(quad_list, fun_dir, const_table):
+    """
+    Agrega un cuadruplo FILL o COPYBLOCK antes de la condición de cada ciclo, o par de ciclos anidados, que llena
+    un arreglo con un valor o lo copia de otro arreglo (ver bulk_store), por ejemplo
+    "for i = 0 to n { for j = 0 to m { p[i][j] = 0 } }". Al ejecutarse, la instrucción escribe todo el rango con
+    asignaciones de slices sobre las particiones de memoria, deja las variables de control en sus valores finales
+    y salta al final del ciclo exterior; si no puede hacerlo (un rango vacio, un VERIFY que fallaria) continua con
+    los ciclos, que se conservan sin cambios.
+
+    :param quad_list: Lista de cuadruplos, se modifica en su lugar.
+    :param fun_dir: Directorio de funciones.
+    :param const_table: Tabla de constantes.
+    :return: Número de ciclos reemplazados.
+    """
+    constants = integer_constants(const_table)
+    replacements = dict()
+    for start, end in find_regions(quad_list, fun_dir).values():
+        loops = RangeAnalysis(quad_list, start, end, constants).loops
+        for outer in loops:
+            found = bulk_store(quad_list, loops, outer, constants)
+            if found is None:
+                continue
+            operator, store = found
+            before = outer.condition - 1
+            replacements[before] = [quad_list[before], Quadruple(operator, store, None, outer.body_end + 3)]
+    if replacements:
+        replace_quads(quad_list, fun_dir, replacements)
+    return len(replacements)
+
+
+def read_addresses(quad):
+    """
+    :param quad: Cuadruplo.
+    :return: Lista con las direcciones que lee el cuadruplo.
+    """
+    # VECTOR, MATMUL, FILL y COPYBLOCK no cuentan sus lecturas: los ciclos escalares que les siguen conservan los
+    # mismos cuadruplos.
+    if quad.operator in (Operator.GOTO, Operator.GOSUB, Operator.ERA, Operator.ENDFUN, Operator.READ,
+                         Operator.VECTOR, Operator.MATMUL, Operator.FILL, Operator.COPYBLOCK):
+        return []
+    if quad.operator in (Operator.GOTOF, Operator.GOTOT, Operator.ASSIGN, Operator.ASSIGNPTR, Operator.PARAMETER):
+        return [quad.left_operand]
+    if quad.operator == Operator.WRITE:
+        return [quad.result]
+    if quad.operator == Operator.LOADIDX:
+        return [quad.left_operand, quad.right_operand]
+    return [quad.left_operand, quad.right_operand, quad.result]
+
+
+def find_pure_functions(quad_list, fun_dir):
+    """
+    Marca como puras (FunctionsDirectoryItem.pure) las funciones cuyo valor de regreso solo depende de sus
+    argumentos, que la VM puede memoizar: regresan un valor, no ejecutan READ ni WRITE, no leen variables
+    globales (salvo las variables de regreso de las funciones que llaman), solo escriben su propia variable de
+    regreso y solo llaman a funciones puras. Los parametros siempre son escalares (ver SemanticActions.add_params)
+    y toda función que regresa un valor termina con return, así que los argumentos de una llamada determinan su
+    resultado.
+
+    :param quad_list: Lista de cuadruplos.
+    :param fun_dir: Directorio de funciones.
+    :return: Número de funciones puras.
+    """
+    candidates = dict()
+    for name, (start, end) in find_regions(quad_list, fun_dir).items():
+        if name == 'main' or fun_dir[name].return_type == ReturnType.VOID:
+            continue
+        fun = fun_dir[name]
+        fun.pure = False
+        callees = {quad.left_operand for quad in quad_list[start:end] if quad.operator == Operator.GOSUB}
+        # Su propia variable de regreso solo se lee al copiar el resultado de una llamada recursiva (que puede
+        # haber quedado inalcanzable despues de eliminate_tail_calls).
+        allowed = {fun_dir[callee].return_addr for callee in callees} | {fun.return_addr}
+        is_pure = True
+        for quad in quad_list[start:end]:
+            if not is_pure:
+                break
+            if quad.operator in (Operator.READ, Operator.WRITE, Operator.ASSIGNPTR):
+                is_pure = False
+            elif quad.operator in SCALAR_WRITES and type(quad.result) == int \
+                    and not (is_local(quad.result) or is_temp(quad.result) or quad.result == fun.return_addr):
+                is_pure = False
+            elif any(type(addr) == int and not CONST_ADDRESS_RANGE[0] <= addr < CONST_ADDRESS_RANGE[1]
+                     and not is_local(addr) and not is_temp(addr) and addr not in allowed
+                     for addr in read_addresses(quad)):
+                is_pure = False
+        if is_pure:
+            candidates[name] = callees
+    # Una función deja de ser pura si llama a una función que no lo es, hasta que ya no cambie el conjunto.
+    changed = True
+    while changed:
+        changed = False
+        for name, callees in list(candidates.items()):
+            if not callees <= candidates.keys():
+                del candidates[name]
+                changed = True
+    for name in candidates:
+        fun_dir[name].pure = True
+    return len(candidates)
+
+
+def optimize(quad_list, fun_dir, const_table, bounds_checks=OPTIMIZE_BOUNDS_CHECKS,
+             tail_calls=OPTIMIZE_TAIL_CALLS, vectorize=OPTIMIZE_VECTORIZE, matmul=OPTIMIZE_MATMUL,
+             bulk_stores=OPTIMIZE_BULK_STORES):
+    """
+    Aplica las pasadas de optimización habilitadas. Por default se utilizan las opciones de
+    common/compiler_options.py.
+
+    :param quad_list: Lista de cuadruplos, se modifica en su lugar.
+    :param fun_dir: Directorio de funciones.
+    :param const_table: Tabla de constantes.
+    :param bounds_checks: Si es verdadero, elimina los VERIFY redundantes (eliminate_bounds_checks).
+    :param tail_calls: Si es verdadero, reemplaza las llamadas recursivas en posición de cola por saltos
+                       (eliminate_tail_calls).
+    :param vectorize: Si es verdadero, agrega instrucciones VECTOR a los ciclos for vectorizables
+                      (vectorize_loops).
+    :param matmul: Si es verdadero, agrega instrucciones MATMUL a las multiplicaciones de matrices
+                   (recognize_matmul).
+    :param bulk_stores: Si es verdadero, agrega instrucciones FILL y COPYBLOCK a los ciclos que llenan o copian
+                        arreglos (lower_bulk_stores).
+    :return: Diccionario con el número de veces que se aplico cada pasada y el número de funciones puras.
+    """
+    stats = dict()
+    if tail_calls:
+        stats['tail_calls'] = eliminate_tail_calls(quad_list, fun_dir)
+    if bounds_checks:
+        stats['bounds_checks_removed'] = eliminate_bounds_checks(quad_list, fun_dir, const_table)
+    if matmul:
+        stats['matmul_loops'] = recognize_matmul(quad_list, fun_dir, const_table)
+    if bulk_stores:
+        stats['bulk_stores'] = lower_bulk_stores(quad_list, fun_dir, const_table)
+    if vectorize:
+        stats['vectorized_loops'] = vectorize_loops(quad_list, fun_dir, const_table)
+    # El analisis de funciones puras no modifica los cuadruplos, así que se hace despues de las demás pasadas.
+    stats['pure_functions'] = find_pure_functions(quad_list, fun_dir)
+    return stats
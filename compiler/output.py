@@ -8,3 +8,6 @@ class CompilerOutput:
     quadruples: [Quadruple]
     constants: [VarTableItem]
     functions_directory: [FunctionsDirectoryItem]
+    global_partition_sizes: [int, int, int, int] = None
+    pointer_partition_sizes: [int, int, int, int] = None
+    optimization_stats: dict = None
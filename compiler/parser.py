@@ -3,6 +3,7 @@ from compiler.lexer import Tokens
 from compiler.semantic import SemanticActions
 from compiler.symbol_table import ReturnType, VarType
 from compiler.output import CompilerOutput
+from compiler.optimizer import optimize
 from common.debug_flags import DEBUG_PARSER
 
 class CompParser(SlyParser):
@@ -11,16 +12,47 @@ class CompParser(SlyParser):
     # Get the token list from the lexer
     tokens = Tokens
 
-    semantics = SemanticActions()
+    def __init__(self, **optimizations):
+        # Cada instancia del parser tiene sus propias acciones semanticas para poder compilar varios programas
+        # dentro del mismo proceso. Las optimizaciones se pasan a compiler.optimizer.optimize.
+        self.semantics = SemanticActions()
+        self.optimizations = optimizations
+
+    def parse(self, tokens):
+        return super().parse(self.track_lines(tokens))
+
+    def track_lines(self, tokens):
+        """
+        Recorre los tokens del lexer actualizando la línea actual de las acciones semanticas, para asignar a cada
+        cuadruplo la línea del código fuente que lo genera. El parser pide un token hasta despues de hacer shift del
+        anterior, y las reducciones que generan cuadruplos se hacen con el siguiente token (que puede estar en la
+        siguiente línea) ya leido; por eso los cuadruplos generados entre dos tokens se asignan a la línea del
+        token anterior al último.
+
+        :param tokens: Generador de tokens del lexer.
+        """
+        for token in tokens:
+            if self.semantics.line is None:
+                self.semantics.line = token.lineno
+            yield token
+            self.semantics.set_line(token.lineno)
 
     # Grammar rules and actions
     @_('jump_main ID set_global vars funs main')
     def program(self, p):
         if DEBUG_PARSER:
             print('Regla: program ' + p.ID)
+        self.semantics.end_main()
+        self.semantics.set_line(None)
+        optimization_stats = optimize(self.semantics.quad_list, self.semantics.functions_directory,
+                                      self.semantics.const_table, **self.optimizations)
+        v_memory_manager = self.semantics.v_memory_manager
         return CompilerOutput(quadruples=self.semantics.quad_list,
                               constants=self.semantics.const_table,
-                              functions_directory=self.semantics.functions_directory)
+                              functions_directory=self.semantics.functions_directory,
+                              global_partition_sizes=v_memory_manager.global_addr.get_partition_sizes(),
+                              pointer_partition_sizes=v_memory_manager.pointer_addr.get_partition_sizes(),
+                              optimization_stats=optimization_stats)
     
     @_('PROGRAM')
     def jump_main(self, _):
@@ -29,10 +29,27 @@ class Operator(Enum):
     ERA = 'era'
     VERIFY = 'verify'
     ASSIGNPTR = 'ASSIGNPTR'
+    LOADIDX = 'loadidx'
+    STOREIDX = 'storeidx'
+    VECTOR = 'vector'
+    MATMUL = 'matmul'
+    FILL = 'fill'
+    COPYBLOCK = 'copyblock'
 
 @dataclass
 class Quadruple:
+    """
+    Instrucción del código intermedio.
+
+    Atributos:
+        operator:       Operador.
+        left_operand:   Operando izquierdo (A).
+        right_operand:  Operando derecho (B).
+        result:         Resultado o destino (C).
+        line:           Línea del código fuente que genero el cuadruplo, o None si no se conoce.
+    """
     operator: Operator
     left_operand: any
     right_operand: any
     result: any
+    line: int = None
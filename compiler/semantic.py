@@ -2,6 +2,7 @@ from compiler.semantic_cube import SemanticCube
 from compiler.symbol_table import FunctionsDirectoryItem, VarTableItem, VarType, ConstType, ReturnType
 from compiler.quadruple import Operator, Quadruple
 from compiler.memory import VirtualMemoryManager
+from common.scope_size import GLOBAL_ADDRESS_RANGE
 
 
 class SemanticActions:
@@ -21,6 +22,11 @@ class SemanticActions:
         operators_stack:        Pila de operadores.
         jumps_stack:            Pila de saltos logicos en la lista de operandos.
         temp_vars_index:        Contador de variables temporales.
+        array_elements:         Elementos de arreglo en la pila de operandos que todavia no se leen ni se escriben.
+                                Asocia el nombre del operando con una tupla (variable del arreglo, dirección del
+                                desplazamiento).
+        line:                   Línea del código fuente del último token que proceso el parser.
+        lined_quads:            Número de cuadruplos al principio de quad_list que ya tienen asignada su línea.
     """
 
     def __init__(self):
@@ -36,6 +42,22 @@ class SemanticActions:
         self.operators_stack = []
         self.jumps_stack = []
         self.temp_vars_index = 0
+        self.array_elements = dict()
+        self.line = None
+        self.lined_quads = 0
+
+    def set_line(self, line):
+        """
+        Asigna la línea actual a los cuadruplos generados desde la llamada anterior que todavia no tienen línea, y
+        cambia la línea actual.
+
+        :param line: Nueva línea actual.
+        """
+        for quad in self.quad_list[self.lined_quads:]:
+            if quad.line is None:
+                quad.line = self.line
+        self.lined_quads = len(self.quad_list)
+        self.line = line
 
     def get_var(self, var_name):
         """
@@ -56,6 +78,24 @@ class SemanticActions:
                         raise Exception("Undeclared variable: " + var_name)
         return var
 
+    def get_operand(self, operand):
+        """
+        Recupera el operando que se va a leer. Si es un elemento de arreglo genera el cuadruplo LOADIDX que copia
+        su valor a una variable temporal, la cual se regresa en su lugar.
+
+        :param operand: Nombre del operando, tomado de la pila de operandos.
+        :return: Una instancia de la clase VarTableItem.
+        """
+        element = self.array_elements.pop(operand, None)
+        if element is None:
+            return self.get_var(operand)
+        var, offset_addr = element
+        temp_id = "_temp_" + str(self.temp_vars_index)
+        temp_addr = self.add_temp(temp_id, var.type)
+        self.temp_vars_index += 1
+        self.quad_list.append(Quadruple(Operator.LOADIDX, var.address, offset_addr, temp_addr))
+        return self.get_var(temp_id)
+
     def get_fun(self, fun_name):
         """
         Recuperar función del diccionario de funciones.
@@ -86,15 +126,18 @@ class SemanticActions:
         :param return_type: Tipo de retorno de la función
         """
         # Si la función no es VOID añadela a la memoria global.
+        return_addr = None
         if return_type != ReturnType.VOID:
             function_id = "_fun_" + fun_name
             self.add_var(function_id, VarType(return_type.value), [])
+            return_addr = self.current_var_table[function_id].address
 
         self.current_scope = fun_name
         self.functions_directory[fun_name] = FunctionsDirectoryItem(
             name=fun_name,
             return_type=return_type,
-            param_table=[]
+            param_table=[],
+            return_addr=return_addr
         )
         self.current_var_table = dict()
 
@@ -117,6 +160,15 @@ class SemanticActions:
         self.quad_list.append(Quadruple(Operator.ENDFUN, None, None, None))
         self.set_global_scope()
 
+    def end_main(self):
+        """
+        Guarda los tamaños de las particiones de la memoria local y temporal de main, para que la VM pueda crear
+        su frame con el tamaño exacto. Main no genera cuadruplo ENDFUN.
+        """
+        fun = self.get_fun('main')
+        fun.local_partition_sizes = self.v_memory_manager.local_addr.get_partition_sizes()
+        fun.temp_partition_sizes = self.v_memory_manager.temp_addr.get_partition_sizes()
+
     def add_var(self, var_name, var_type, dims):
         """
         Añade variable a la tabla actual de variables
@@ -170,25 +222,6 @@ class SemanticActions:
 
         return addr
 
-    def add_pointer(self, var_name, var_type):
-        """
-        Añade pointer a la tabla actual de variables
-
-        :param var_name: Nombre de la variable temporal a declarar
-        :param var_type: Tipo de dato de la variable temporal
-        :return: Dirección asignada a la nueva variable temporal
-        """
-        addr = self.v_memory_manager.pointer_addr.allocate_addr(var_type)
-
-        self.current_var_table[var_name] = VarTableItem(
-            name=var_name,
-            type=VarType(var_type),
-            dims=(0, 0),
-            size=1,
-            address=addr)
-
-        return addr
-
     def get_const(self, const_value, const_type):
         """
         Busca constante en tabla de constantes y si no existe la registra
@@ -261,8 +294,8 @@ class SemanticActions:
         Función para generar un cuadruplo utilizando las pilas de operadores, operandos y tipos
         """
         if len(self.operands_stack) >= 2 and len(self.operators_stack) >= 1 and self.operators_stack[-1] != '(':
-            right_operand = self.get_var(self.operands_stack.pop())
-            left_operand = self.get_var(self.operands_stack.pop())
+            right_operand = self.get_operand(self.operands_stack.pop())
+            left_operand = self.get_operand(self.operands_stack.pop())
             operator = Operator(self.operators_stack.pop())
             result_type = self.semantic_cube.type_match(left_operand.type, right_operand.type, operator)
             if result_type != "error":
@@ -282,16 +315,24 @@ class SemanticActions:
         Función para generar un cuadruplo de asignación utilizando la pila de operandos
 
         :param name_var: nombre de la variable donde se va a asignar el valor
+        :param array: Si es verdadero, el valor se asigna al elemento de arreglo que esta en la pila de operandos
+                      con el cuadruplo STOREIDX.
         """
         if self.operands_stack:
-            right_operand = self.get_var(self.operands_stack.pop())
+            right_operand = self.get_operand(self.operands_stack.pop())
+            offset_addr = None
             if array:
-                left_operand = self.get_var(self.operands_stack.pop())
+                left_operand, offset_addr = self.array_elements.pop(self.operands_stack.pop())
             else:
                 left_operand = self.get_var(name_var)
             result_type = self.semantic_cube.type_match(left_operand.type, right_operand.type, Operator.ASSIGN)
             if result_type != "error":
-                self.quad_list.append(Quadruple(Operator.ASSIGN, right_operand.address, None, left_operand.address))
+                if array:
+                    self.quad_list.append(
+                        Quadruple(Operator.STOREIDX, right_operand.address, offset_addr, left_operand.address))
+                else:
+                    self.quad_list.append(
+                        Quadruple(Operator.ASSIGN, right_operand.address, None, left_operand.address))
             else:
                 raise TypeError("Type mismatch: Cannot perform operation " + str(Operator.ASSIGN) + " between " + str(left_operand.type) + " and " + str(right_operand.type))
         else:
@@ -332,7 +373,7 @@ class SemanticActions:
         addr: int
         if self.operands_stack:
             var_name = self.operands_stack.pop()
-            var = self.get_var(var_name)
+            var = self.get_operand(var_name)
             self.quad_list.append(Quadruple(Operator.WRITE, None, None, var.address))
         else:
             raise Exception("Operation stack error: Not enough operands")
@@ -342,7 +383,7 @@ class SemanticActions:
         Genera cuadruplos necesarios al principio de un if
         """
         if self.operands_stack:
-            res = self.get_var(self.operands_stack.pop())
+            res = self.get_operand(self.operands_stack.pop())
             if res.type == VarType.BOOL:
                 self.quad_list.append(Quadruple(Operator.GOTOF, res.address, None, None))
                 self.jumps_stack.append(len(self.quad_list) - 1)
@@ -384,7 +425,7 @@ class SemanticActions:
         Genera cuadruplos necesarios al final de la expresion del while
         """
         if self.operands_stack:
-            res = self.get_var(self.operands_stack.pop())
+            res = self.get_operand(self.operands_stack.pop())
             if res.type == VarType.BOOL:
                 self.quad_list.append(Quadruple(Operator.GOTOF, res.address, None, None))
                 self.jumps_stack.append(len(self.quad_list) - 1)
@@ -400,7 +441,8 @@ class SemanticActions:
         if len(self.jumps_stack) >= 2:
             end = self.jumps_stack.pop()
             ret = self.jumps_stack.pop()
-            self.quad_list.append(Quadruple(Operator.GOTO, None, None, ret))
+            # El regreso a la condición se cuenta en la línea del while, no en la última línea del cuerpo.
+            self.quad_list.append(Quadruple(Operator.GOTO, None, None, ret, line=self.quad_list[ret].line))
             self.finish_jump(end, len(self.quad_list))
         else:
             raise Exception("Jump stack error")
@@ -422,7 +464,7 @@ class SemanticActions:
         Inicializa variable de control del ciclo for con valor de expresion
         """
         if len(self.operands_stack) >= 2:
-            exp = self.get_var(self.operands_stack.pop())
+            exp = self.get_operand(self.operands_stack.pop())
             if exp.type == VarType.INT or exp.type == VarType.FLOAT:
                 control = self.get_var(self.operands_stack.pop())
                 tipo_res = self.semantic_cube.type_match(control.type, exp.type, Operator.ASSIGN)
@@ -441,7 +483,7 @@ class SemanticActions:
         Establece valor final del ciclo for con valor de expresion
         """
         if len(self.operands_stack) >= 2:
-            exp = self.get_var(self.operands_stack.pop())
+            exp = self.get_operand(self.operands_stack.pop())
             if exp.type == VarType.INT or exp.type == VarType.FLOAT:
                 control = self.get_var(self.operands_stack.pop())
                 if control.type == VarType.INT or control.type == VarType.FLOAT:
@@ -473,12 +515,15 @@ class SemanticActions:
             self.temp_vars_index += 1
             tipo_res = self.semantic_cube.type_match(control.type, VarType.INT, Operator.PLUS)
             temp_address = self.add_temp(temp, tipo_res)
-            self.quad_list.append(
-                Quadruple(Operator('+'), control.address, self.get_const(1, VarType.INT), temp_address))
-            self.quad_list.append(Quadruple(Operator.ASSIGN, temp_address, None, control.address))
             end = self.jumps_stack.pop()
             ret = self.jumps_stack.pop()
-            self.quad_list.append(Quadruple(Operator('goto'), None, None, ret))
+            # El incremento y el regreso a la condición se cuentan en la línea del for, no en la última línea del
+            # cuerpo.
+            line = self.quad_list[ret].line
+            self.quad_list.append(
+                Quadruple(Operator('+'), control.address, self.get_const(1, VarType.INT), temp_address, line))
+            self.quad_list.append(Quadruple(Operator.ASSIGN, temp_address, None, control.address, line))
+            self.quad_list.append(Quadruple(Operator('goto'), None, None, ret, line))
             self.finish_jump(end, len(self.quad_list))
         else:
             raise Exception("Operation stack error: Not enough operands")
@@ -531,7 +576,7 @@ class SemanticActions:
         # Generate action ERA size
         self.quad_list.append(Quadruple(Operator.ERA, None, None, fun.name))
         for index, (param, arg_name) in enumerate(zip(fun.param_table, arg_list)):
-            arg = self.get_var(arg_name)
+            arg = self.get_operand(arg_name)
             # Verify coherence in types
             if param[1] == arg.type:
                 self.quad_list.append(Quadruple(Operator.PARAMETER, arg.address, None, param[0]))
@@ -555,7 +600,7 @@ class SemanticActions:
         """
         if self.operands_stack:
             return_exp = self.operands_stack.pop()
-            return_var = self.get_var(return_exp)
+            return_var = self.get_operand(return_exp)
             fun_var = self.get_var("_fun_" + self.current_scope)
             result_type = self.semantic_cube.type_match(fun_var.type, return_var.type, Operator.ASSIGN)
             if result_type != "error":
@@ -567,7 +612,9 @@ class SemanticActions:
 
     def array_usage(self, var_id, dims):
         """
-        Metodo adquirir direccion real de arreglo indexado y agregarlo al stack de operandos
+        Genera la verificación de los indices de un arreglo indexado y el calculo de su desplazamiento, y agrega el
+        elemento al stack de operandos. El elemento se lee (LOADIDX) o se escribe (STOREIDX) directamente sobre la
+        dirección base del arreglo cuando se utiliza como operando, ver get_operand y generate_quad_assign.
         """
         var = self.get_var(var_id)
         if dims == 1:
@@ -575,24 +622,20 @@ class SemanticActions:
             if var.dims[0] > 0:
                 if self.operands_stack:
                     dim = self.operands_stack.pop()
-                    dim_var = self.get_var(dim)
+                    dim_var = self.get_operand(dim)
                     if dim_var.type == VarType.INT:
                         self.quad_list.append(
                             Quadruple(Operator.VERIFY, dim_var.address, self.get_const(0, VarType.INT),
                                       self.get_const(var.dims[0], VarType.INT)))
-                        temp_id = "_temp_" + str(self.temp_vars_index)
-                        temp_addr = self.add_temp(temp_id, var.type)
-                        self.temp_vars_index += 1
-                        self.quad_list.append(
-                            Quadruple(Operator.PLUS, dim_var.address, self.get_const(var.address, VarType.INT),
-                                      temp_addr))
-                        # pointer_id tiene la direccion del arreglo indexado
-                        pointer_id = "_pointer_" + str(self.temp_vars_index)
-                        pointer_addr = self.add_pointer(pointer_id, var.type)
-                        self.temp_vars_index += 1
-                        self.quad_list.append(
-                            Quadruple(Operator.ASSIGNPTR, temp_addr, '', pointer_addr))
-                        self.operands_stack.append(pointer_id)
+                        offset_addr = dim_var.address
+                        if GLOBAL_ADDRESS_RANGE[0] <= offset_addr < GLOBAL_ADDRESS_RANGE[1]:
+                            # Una función llamada antes de usar el elemento podria cambiar el indice global, así
+                            # que se copia a un temporal. En otro caso el desplazamiento es el mismo indice.
+                            temp_id = "_temp_" + str(self.temp_vars_index)
+                            offset_addr = self.add_temp(temp_id, VarType.INT)
+                            self.temp_vars_index += 1
+                            self.quad_list.append(Quadruple(Operator.ASSIGN, dim_var.address, None, offset_addr))
+                        self.push_array_element(var, offset_addr)
                     else:
                         raise Exception("Index type error: Needed var type INT")
                 else:
@@ -604,9 +647,9 @@ class SemanticActions:
             if var.dims[0] > 0 and var.dims[1] > 0:
                 if self.operands_stack:
                     dim2 = self.operands_stack.pop()
-                    dim2_var = self.get_var(dim2)
+                    dim2_var = self.get_operand(dim2)
                     dim1 = self.operands_stack.pop()
-                    dim1_var = self.get_var(dim1)
+                    dim1_var = self.get_operand(dim1)
                     if dim1_var.type == VarType.INT and dim2_var.type == VarType.INT:
                         self.quad_list.append(
                             Quadruple(Operator.VERIFY, dim1_var.address, self.get_const(0, VarType.INT),
@@ -617,25 +660,15 @@ class SemanticActions:
                         self.quad_list.append(
                             Quadruple(Operator.TIMES, dim1_var.address, self.get_const(var.dims[1], VarType.INT),
                                       temp1_addr))
-                        temp2_id = "_temp_" + str(self.temp_vars_index)
-                        temp2_addr = self.add_temp(temp2_id, VarType.INT)
-                        self.temp_vars_index += 1
-                        self.quad_list.append(
-                            Quadruple(Operator.PLUS, temp1_addr, self.get_const(var.address, VarType.INT), temp2_addr))
                         self.quad_list.append(
                             Quadruple(Operator.VERIFY, dim2_var.address, self.get_const(0, VarType.INT),
                                       self.get_const(var.dims[1], VarType.INT)))
-                        temp3_id = "_temp_" + str(self.temp_vars_index)
-                        temp3_addr = self.add_temp(temp3_id, VarType.INT)
+                        temp2_id = "_temp_" + str(self.temp_vars_index)
+                        temp2_addr = self.add_temp(temp2_id, VarType.INT)
                         self.temp_vars_index += 1
                         self.quad_list.append(
-                            Quadruple(Operator.PLUS, temp2_addr, dim2_var.address, temp3_addr))
-                        # pointer_id tiene la direccion del arreglo indexado
-                        pointer_id = "_pointer_" + str(self.temp_vars_index)
-                        pointer_addr = self.add_pointer(pointer_id, var.type)
-                        self.temp_vars_index += 1
-                        self.quad_list.append(Quadruple(Operator.ASSIGNPTR, temp3_addr, '', pointer_addr))
-                        self.operands_stack.append(pointer_id)
+                            Quadruple(Operator.PLUS, temp1_addr, dim2_var.address, temp2_addr))
+                        self.push_array_element(var, temp2_addr)
                     else:
                         raise Exception("Index type error: Needed var type INT")
                 else:
@@ -643,6 +676,19 @@ class SemanticActions:
             else:
                 raise Exception("Var " + str(var_id) + " is not an array of 2 dimensions")
 
+    def push_array_element(self, var, offset_addr):
+        """
+        Agrega un elemento de arreglo al stack de operandos. El desplazamiento se guarda en una variable (temporal
+        o local) del frame actual, por lo que cada llamada recursiva tiene el suyo.
+
+        :param var: Variable del arreglo.
+        :param offset_addr: Dirección de la variable con el desplazamiento del elemento desde la dirección base.
+        """
+        element_id = "_element_" + str(self.temp_vars_index)
+        self.temp_vars_index += 1
+        self.array_elements[element_id] = (var, offset_addr)
+        self.operands_stack.append(element_id)
+
 # QuadList = SemanticActions.quad_list
 # FuncDir = SemanticActions.functions_directory
 # ConstTable = SemanticActions.const_table
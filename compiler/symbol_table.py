@@ -44,6 +44,8 @@ class FunctionsDirectoryItem:
     start_addr: int = None
     local_partition_sizes: [int, int, int, int] = None
     temp_partition_sizes: [int, int, int, int] = None
+    return_addr: int = None
+    pure: bool = False
 
 
 @dataclass
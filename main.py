@@ -1,8 +1,20 @@
 from compiler.lexer import CompLexer
 from compiler.parser import CompParser
 from compiler.output import CompilerOutput
-from vm.vm import VM
+from vm.vm import VM, DispatchMode
+from vm.memory import MemoryBackend
+from vm.threaded import ThreadedVM
+from vm.register import RegisterVM
+from vm.profiler import Profiler, LineProfiler, CallProfiler
+from vm.trace import TraceBuffer
+from vm.limits import ExecutionLimits
+from vm.snapshot import save_snapshot, restore_snapshot
+from vm.streams import PromptSource, IteratorSource, RecordingSource
 from common.debug_flags import DEBUG_UI, DEBUG_LEXER, DEBUG_SEMANTIC
+from common.vm_options import VM_BACKEND, VM_MEMORY, VM_PROFILE, VM_PROFILE_SAMPLE, VM_PROFILE_JSON, VM_INPUT, \
+    VM_INPUT_RECORD, VM_MAX_INSTRUCTIONS, VM_MAX_CALL_DEPTH, VM_MAX_SECONDS, VM_SNAPSHOT_LOAD, VM_SNAPSHOT_SAVE, \
+    VM_MEMO_SIZE, VM_CALL_PROFILE, VM_CALL_PROFILE_JSON, VM_TRACE, VM_TRACE_SIZE, VM_TRACE_SAMPLE, VM_LINE_PROFILE, \
+    VM_LINE_PROFILE_JSON
 import sys
 
 def main():
@@ -37,13 +49,78 @@ def main():
     if DEBUG_SEMANTIC:
         print('Quads: ')
         for i, quad in enumerate(compiler_output.quadruples):
-            print(f'{i}.\t{quad.operator}\tA:{quad.left_operand}\tB:{quad.right_operand}\tC:{quad.result}')
+            print(f'{i}.\t{quad.operator}\tA:{quad.left_operand}\tB:{quad.right_operand}\tC:{quad.result}'
+                  f'\tlínea:{quad.line}')
+        print('Optimizaciones: ', compiler_output.optimization_stats)
+        print('Funciones puras: ', [name for name, fun in compiler_output.functions_directory.items() if fun.pure])
 
     # VIRTUAL MACHINE
-    vm = VM(quad_list=compiler_output.quadruples,
-            const_table=compiler_output.constants,
-            fun_dir=compiler_output.functions_directory)
-    vm.run()
+    if VM_INPUT is None:
+        input_source = PromptSource()
+    elif VM_INPUT == 'stdin':
+        input_source = IteratorSource.from_stdin()
+    else:
+        input_source = IteratorSource.from_file(VM_INPUT)
+    if VM_INPUT_RECORD is not None:
+        input_source = RecordingSource(input_source, VM_INPUT_RECORD)
+
+    if VM_BACKEND in ('threaded', 'register'):
+        vm_class = ThreadedVM if VM_BACKEND == 'threaded' else RegisterVM
+        vm = vm_class(quad_list=compiler_output.quadruples,
+                      const_table=compiler_output.constants,
+                      fun_dir=compiler_output.functions_directory,
+                      global_partition_sizes=compiler_output.global_partition_sizes,
+                      pointer_partition_sizes=compiler_output.pointer_partition_sizes,
+                      memory_backend=MemoryBackend(VM_MEMORY),
+                      input_source=input_source,
+                      memo_size=VM_MEMO_SIZE)
+    else:
+        vm = VM(quad_list=compiler_output.quadruples,
+                const_table=compiler_output.constants,
+                fun_dir=compiler_output.functions_directory,
+                dispatch_mode=DispatchMode(VM_BACKEND),
+                global_partition_sizes=compiler_output.global_partition_sizes,
+                pointer_partition_sizes=compiler_output.pointer_partition_sizes,
+                memory_backend=MemoryBackend(VM_MEMORY),
+                input_source=input_source,
+                memo_size=VM_MEMO_SIZE)
+    limits = None
+    if VM_MAX_INSTRUCTIONS is not None or VM_MAX_CALL_DEPTH is not None or VM_MAX_SECONDS is not None:
+        limits = ExecutionLimits(max_instructions=VM_MAX_INSTRUCTIONS,
+                                 max_call_depth=VM_MAX_CALL_DEPTH,
+                                 max_seconds=VM_MAX_SECONDS)
+    if VM_SNAPSHOT_LOAD is not None:
+        restore_snapshot(vm, VM_SNAPSHOT_LOAD)
+    profiler = None
+    if VM_PROFILE:
+        profiler = Profiler(sample_every=VM_PROFILE_SAMPLE)
+    elif VM_LINE_PROFILE:
+        profiler = LineProfiler(sample_every=VM_PROFILE_SAMPLE)
+    elif VM_CALL_PROFILE:
+        profiler = CallProfiler()
+    trace = TraceBuffer(VM_TRACE_SIZE, VM_TRACE_SAMPLE) if VM_TRACE else None
+    try:
+        vm.run(profiler, limits, trace)
+    finally:
+        if VM_SNAPSHOT_SAVE is not None:
+            save_snapshot(vm, VM_SNAPSHOT_SAVE)
+        if isinstance(profiler, CallProfiler):
+            print('\n\nPerfil de llamadas:', file=sys.stderr)
+            print(profiler.format_text(), file=sys.stderr)
+            with open(VM_CALL_PROFILE_JSON, 'w') as profile_file:
+                profile_file.write(profiler.to_json())
+        elif isinstance(profiler, LineProfiler):
+            print('\n\nPerfil por línea:', file=sys.stderr)
+            print(profiler.format_listing(vm, code), file=sys.stderr)
+            with open(VM_LINE_PROFILE_JSON, 'w') as profile_file:
+                profile_file.write(profiler.to_json(vm))
+        elif profiler is not None:
+            print('\n\nPerfil de ejecución:', file=sys.stderr)
+            print(profiler.format_text(vm), file=sys.stderr)
+            if vm.memo_caches:
+                print('Memoización:', vm.memo_stats(), file=sys.stderr)
+            with open(VM_PROFILE_JSON, 'w') as profile_file:
+                profile_file.write(profiler.to_json(vm))
 
 
 if __name__ == '__main__':
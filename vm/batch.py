@@ -0,0 +1,157 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from time import perf_counter
+from vm.vm import VM
+from vm.streams import IteratorSource, ListSink
+
+"""
+Ejecución por lotes: un programa compilado una sola vez se ejecuta con muchos conjuntos de valores de entrada
+en un pool de procesos. El CompilerOutput se envia una sola vez a cada proceso al iniciarlo, así que los procesos
+no vuelven a compilar el programa ni a importar el parser.
+"""
+
+"""
+Programa y configuración de la VM de cada proceso del pool (ver init_worker).
+"""
+worker_state = None
+
+
+@dataclass
+class BatchResult:
+    """
+    Resultado de una ejecución del lote.
+
+    Atributos:
+        index:      Posición del conjunto de entrada en el lote.
+        output:     Texto que escribio el programa.
+        error:      Descripción del error que detuvo la ejecución, o None si termino correctamente.
+        elapsed:    Segundos de ejecución (sin contar la creación de la VM).
+    """
+    index: int
+    output: str
+    error: str = None
+    elapsed: float = 0.0
+
+    def as_dict(self):
+        return {'index': self.index, 'output': self.output, 'error': self.error, 'elapsed': self.elapsed}
+
+
+@dataclass
+class BatchStats:
+    """
+    Estadisticas de un lote.
+
+    Atributos:
+        runs:           Número de ejecuciones.
+        failures:       Ejecuciones que terminaron con un error.
+        workers:        Número de procesos del pool.
+        wall_time:      Segundos desde que se creo el pool hasta recibir el último resultado.
+        run_time:       Suma de los segundos de ejecución de todas las ejecuciones.
+        min_elapsed:    Ejecución más rápida, en segundos.
+        max_elapsed:    Ejecución más lenta, en segundos.
+    """
+    runs: int
+    failures: int
+    workers: int
+    wall_time: float
+    run_time: float
+    min_elapsed: float
+    max_elapsed: float
+
+    @property
+    def throughput(self):
+        """
+        :return: Ejecuciones por segundo del lote completo.
+        """
+        return self.runs / self.wall_time if self.wall_time else 0.0
+
+    @property
+    def mean_elapsed(self):
+        return self.run_time / self.runs if self.runs else 0.0
+
+    def as_dict(self):
+        return {'runs': self.runs, 'failures': self.failures, 'workers': self.workers, 'wall_time': self.wall_time,
+                'run_time': self.run_time, 'throughput': self.throughput, 'mean_elapsed': self.mean_elapsed,
+                'min_elapsed': self.min_elapsed, 'max_elapsed': self.max_elapsed}
+
+    def format_text(self):
+        """
+        :return: Reporte de texto con las estadisticas.
+        """
+        return (f'Ejecuciones: {self.runs} ({self.failures} con error) en {self.workers} procesos\n'
+                f'Tiempo total: {self.wall_time:.3f} s, {self.throughput:.1f} ejecuciones/s\n'
+                f'Tiempo por ejecución: promedio {self.mean_elapsed * 1000:.3f} ms, '
+                f'minimo {self.min_elapsed * 1000:.3f} ms, maximo {self.max_elapsed * 1000:.3f} ms')
+
+
+def init_worker(compiler_output, vm_class, vm_options, limits):
+    """
+    Inicializa un proceso del pool con el programa compilado y la configuración de la VM.
+    """
+    global worker_state
+    worker_state = (compiler_output, vm_class, vm_options, limits)
+
+
+def run_inputs(task):
+    """
+    Ejecuta el programa del proceso con un conjunto de valores de entrada, capturando su salida. Los errores de
+    la ejecución (incluyendo LimitExceeded) se regresan en el resultado en lugar de detener el lote.
+
+    :param task: Tupla (indice, lista de valores para las instrucciones READ).
+    :return: Instancia de BatchResult.
+    """
+    index, inputs = task
+    compiler_output, vm_class, vm_options, limits = worker_state
+    output = ListSink()
+    vm = vm_class(quad_list=compiler_output.quadruples,
+                  const_table=compiler_output.constants,
+                  fun_dir=compiler_output.functions_directory,
+                  global_partition_sizes=compiler_output.global_partition_sizes,
+                  pointer_partition_sizes=compiler_output.pointer_partition_sizes,
+                  output=output,
+                  input_source=IteratorSource(inputs),
+                  **vm_options)
+    error = None
+    start = perf_counter()
+    try:
+        vm.run(limits=limits)
+    except Exception as exception:
+        error = f'{type(exception).__name__}: {exception}'
+    elapsed = perf_counter() - start
+    return BatchResult(index=index, output=output.getvalue(), error=error, elapsed=elapsed)
+
+
+def run_batch(compiler_output, input_sets, workers=None, chunksize=None, limits=None, vm_class=VM, **vm_options):
+    """
+    Ejecuta un programa compilado con cada conjunto de valores de entrada en un pool de procesos.
+
+    :param compiler_output: Instancia de CompilerOutput.
+    :param input_sets: Lista de conjuntos de entrada; cada uno es una lista con los valores (str) de las
+                       instrucciones READ de una ejecución.
+    :param workers: Número de procesos del pool. Por default, el número de CPUs.
+    :param chunksize: Ejecuciones que se envian juntas a un proceso. Por default se reparten unos 4 grupos por
+                      proceso, para que las ejecuciones cortas no paguen la comunicación entre procesos una por una.
+    :param limits: Instancia opcional de ExecutionLimits que se aplica a cada ejecución.
+    :param vm_class: Clase de la maquina virtual (VM o alguna de sus subclases).
+    :param vm_options: Argumentos adicionales para la VM (dispatch_mode, memory_backend, memo_size, ...).
+    :return: Tupla (lista de BatchResult en el orden de input_sets, BatchStats).
+    """
+    input_sets = list(input_sets)
+    workers = workers or os.cpu_count() or 1
+    if chunksize is None:
+        chunksize = max(1, len(input_sets) // (workers * 4))
+    start = perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                             initargs=(compiler_output, vm_class, vm_options, limits)) as executor:
+        results = list(executor.map(run_inputs, enumerate(input_sets), chunksize=chunksize))
+    wall_time = perf_counter() - start
+    times = [result.elapsed for result in results]
+    stats = BatchStats(runs=len(results),
+                       failures=sum(1 for result in results if result.error is not None),
+                       workers=workers,
+                       wall_time=wall_time,
+                       run_time=sum(times),
+                       min_elapsed=min(times, default=0.0),
+                       max_elapsed=max(times, default=0.0))
+    return results, stats
@@ -0,0 +1,135 @@
+from array import array
+from vm.memory import INT_PARTITION, FLOAT_PARTITION
+
+"""
+Ejecución de las instrucciones FILL y COPYBLOCK (ver compiler.optimizer.lower_bulk_stores). Cada renglón del rango
+se escribe con una sola asignación de slice sobre la partición del arreglo, o todo el rango si los ciclos recorren
+renglones completos. Si algún rango es vacio, algún VERIFY fallaria, un elemento queda fuera de su partición o un
+valor no se puede convertir al tipo del arreglo, la instrucción no modifica la memoria y la VM ejecuta los ciclos,
+que lanzan el mismo error.
+"""
+
+
+def repeated(partition, value, count):
+    """
+    :param partition: Partición de memoria: lista, array, bytearray o memoryview.
+    :param value: Valor ya convertido al tipo de la partición.
+    :param count: Número de elementos.
+    :return: Secuencia de "count" copias del valor que se puede asignar a un slice de la partición.
+    """
+    if type(partition) == list:
+        return [value] * count
+    if type(partition) == bytearray:
+        return bytes([value]) * count
+    return array(partition.typecode if type(partition) == array else partition.format, [value]) * count
+
+
+def same_kind(partition, values):
+    """
+    :param partition: Partición de memoria que se escribe.
+    :param values: Slice de otra partición del mismo tipo de dato.
+    :return: Los valores como una secuencia que se puede asignar a un slice de la partición.
+    """
+    if type(partition) == array and type(values) != array:
+        return array(partition.typecode, values)
+    if type(partition) == list and type(values) != list:
+        return list(values)
+    return values
+
+
+def build_bulk_runners(segments):
+    """
+    Crea las funciones que ejecutan las instrucciones FILL y COPYBLOCK sobre los segmentos de la VM.
+
+    :param segments: Lista de segmentos de la VM, indexada por segmento y partición.
+    :return: Tupla (fill, copy) de funciones que reciben el operando A decodificado de la instrucción, una tupla
+             (i, i_final, j, j_start, j_final, destino, fuente, limites) donde cada arreglo es una tupla (base,
+             columnas), y regresan verdadero si escribieron todo el rango o falso si se deben ejecutar los ciclos.
+    """
+    def read(operand):
+        return segments[operand[0]][operand[1]][operand[2]]
+
+    def slices(store):
+        """
+        :return: Lista de tuplas (inicio, fin) relativas a la base de los arreglos, una por cada renglón o una sola
+                 si los renglones son completos, o None si no se puede escribir el rango.
+        """
+        i, i_final, j, j_start, j_final, target, source, bounds = store
+        ranges = {i: range(read(i), read(i_final))}
+        if j is not None:
+            ranges[j] = range(read(j_start), read(j_final))
+        rows, columns = ranges[i], ranges[j] if j is not None else range(0, 1)
+        if not rows or not columns:
+            return None
+        # Un VERIFY fallaria en alguna iteración: los ciclos lanzan el error en la iteración que corresponde.
+        for control, low, high in bounds:
+            if ranges[control].start < low or ranges[control].stop > high:
+                return None
+        width = target[1]
+        if columns.start == 0 and columns.stop == width:
+            return [(rows.start * width, rows.stop * width)]
+        return [(row * width + columns.start, row * width + columns.stop) for row in rows]
+
+    def fits(partition, base, spans):
+        return base + spans[0][0] >= 0 and base + spans[-1][1] <= len(partition)
+
+    def finish(store):
+        i, i_final, j, j_start, j_final = store[:5]
+        segments[i[0]][i[1]][i[2]] = read(i_final)
+        if j is not None:
+            segments[j[0]][j[1]][j[2]] = read(j_final)
+
+    def fill(store):
+        spans = slices(store)
+        if spans is None:
+            return False
+        (segment, partition_index, base), _ = store[5]
+        partition = segments[segment][partition_index]
+        if not fits(partition, base, spans):
+            return False
+        value = read(store[6])
+        try:
+            if partition_index == INT_PARTITION:
+                value = int(value)
+            elif partition_index == FLOAT_PARTITION:
+                value = float(value)
+            values = repeated(partition, value, spans[0][1] - spans[0][0])
+        except (TypeError, ValueError, OverflowError):
+            # Un valor sin inicializar o que no cabe en la partición.
+            return False
+        for start, stop in spans:
+            partition[base + start:base + stop] = values
+        finish(store)
+        return True
+
+    def copy(store):
+        spans = slices(store)
+        if spans is None:
+            return False
+        (segment, partition_index, base), _ = store[5]
+        (source_segment, _, source_base), _ = store[6]
+        partition = segments[segment][partition_index]
+        source = segments[source_segment][partition_index]
+        if not fits(partition, base, spans) or not fits(source, source_base, spans):
+            return False
+        # Dos arreglos distintos de la misma partición solo se traslapan si algún indice se sale de su arreglo; en
+        # ese caso se copia elemento por elemento como en los ciclos.
+        if partition is source and base + spans[0][0] < source_base + spans[-1][1] \
+                and source_base + spans[0][0] < base + spans[-1][1]:
+            return False
+        if type(partition) == list and partition_index in (INT_PARTITION, FLOAT_PARTITION):
+            # Las listas pueden tener elementos sin inicializar (None), que los ciclos no pueden convertir.
+            convert = int if partition_index == INT_PARTITION else float
+            try:
+                rows = [[convert(value) for value in source[source_base + start:source_base + stop]]
+                        for start, stop in spans]
+            except (TypeError, ValueError, OverflowError):
+                return False
+        else:
+            rows = [same_kind(partition, source[source_base + start:source_base + stop]) for start, stop in spans]
+        for (start, stop), values in zip(spans, rows):
+            partition[base + start:base + stop] = values
+        finish(store)
+        return True
+
+    return fill, copy
@@ -0,0 +1,102 @@
+import asyncio
+from inspect import isawaitable
+from compiler.quadruple import Operator
+from vm.vm import VM, DispatchMode, OPCODES
+from vm.memory import PARTITION_TYPES
+from vm.limits import LimitCounters, LimitExceeded
+from vm.streams import parse_input
+
+"""
+Número de instrucciones que ejecuta AsyncVM antes de ceder el event loop a las demás sesiones.
+"""
+SLICE_SIZE = 1000
+
+
+class AsyncVM(VM):
+    """
+    Maquina virtual cooperativa para asyncio: ejecuta el programa en porciones de slice_size instrucciones y al
+    terminar cada porción cede el event loop, así un solo proceso puede intercalar cientos de sesiones sin un hilo
+    o proceso por sesión. READ espera (await) a la fuente de entrada y WRITE escribe en un canal de salida que se
+    vacia (drain) al ceder el event loop. Ejecuta el programa con la tabla de despacho de VM.
+
+    Atributos:
+        slice_size:     Instrucciones por porción.
+        slices:         Porciones completas ejecutadas (las que terminaron cediendo el event loop).
+    """
+
+    def __init__(self, quad_list, const_table, fun_dir, slice_size=SLICE_SIZE, **kwargs):
+        """
+        :param slice_size: Instrucciones que se ejecutan antes de ceder el event loop.
+        :param kwargs: Argumentos adicionales de VM. La fuente de entrada y el canal de salida pueden ser
+                       asincronos (AsyncQueueSource, AsyncStreamSink, ...) o los de la VM sincrona.
+        """
+        kwargs['dispatch_mode'] = DispatchMode.TABLE
+        super().__init__(quad_list, const_table, fun_dir, **kwargs)
+        self.slice_size = slice_size
+        self.slices = 0
+
+    async def read_input_async(self, var_type):
+        """
+        Vacia la salida pendiente y espera el siguiente valor de la fuente de entrada.
+
+        :param var_type: Tipo de dato de la partición destino, instancia de VarType.
+        :return: El valor leido convertido al tipo de dato de la variable.
+        """
+        await self.drain_output()
+        value = self.input_source.read(var_type)
+        if isawaitable(value):
+            value = await value
+        return parse_input(value, var_type)
+
+    async def drain_output(self):
+        """
+        Escribe la salida pendiente; con un canal asincrono espera a que se envie.
+        """
+        drain = getattr(self.output, 'drain', None)
+        if drain is None:
+            self.output.flush()
+        else:
+            await drain()
+
+    async def run_async(self, limits=None):
+        """
+        Ejecuta el programa cediendo el event loop cada slice_size instrucciones y en cada READ cuyo valor todavía
+        no esta disponible. Se puede volver a llamar despues de LimitExceeded para continuar la ejecución.
+
+        :param limits: Instancia opcional de ExecutionLimits (ver VM.run).
+        """
+        counters = None if limits is None else LimitCounters(limits, self.get_current_frame().IP)
+        self.limit_counters = counters
+        table = self.dispatch_table if counters is None else self.build_limited_table(counters)
+        program = self.program
+        segments = self.segments
+        end = len(program)
+        read_opcode = OPCODES[Operator.READ]
+        slice_size = self.slice_size
+        budget = slice_size
+        IP = self.get_current_frame().IP
+        try:
+            while IP < end:
+                opcode, A, B, C = program[IP]
+                if opcode == read_opcode:
+                    self.get_current_frame().IP = IP
+                    segments[C[0]][C[1]][C[2]] = await self.read_input_async(PARTITION_TYPES[C[1]])
+                    IP += 1
+                else:
+                    IP = table[opcode](A, B, C, IP)
+                budget -= 1
+                if not budget:
+                    budget = slice_size
+                    self.slices += 1
+                    self.get_current_frame().IP = IP
+                    await self.drain_output()
+                    await asyncio.sleep(0)
+            if counters is not None:
+                counters.end_segment(end - 1, end)
+        except LimitExceeded as error:
+            IP = error.resume_IP
+            raise
+        finally:
+            self.get_current_frame().IP = IP
+            self.input_source.close()
+            await self.drain_output()
@@ -0,0 +1,113 @@
+from enum import Enum
+from time import perf_counter
+
+
+class Limit(Enum):
+    """
+    Limites de ejecución que se pueden imponer a la VM.
+    """
+    INSTRUCTIONS = 'instructions'   # Instrucciones ejecutadas
+    CALL_DEPTH = 'call_depth'       # Frames en el stack de ejecución
+    WALL_TIME = 'wall_time'         # Segundos transcurridos desde el inicio de la ejecución
+
+
+class ExecutionLimits:
+    """
+    Limites para ejecutar programas que pueden no terminar. Un limite en None no se verifica.
+
+    Atributos:
+        max_instructions:   Número máximo de instrucciones ejecutadas.
+        max_call_depth:     Número máximo de frames en el stack de ejecución.
+        max_seconds:        Tiempo máximo de ejecución en segundos.
+    """
+
+    def __init__(self, max_instructions=None, max_call_depth=None, max_seconds=None):
+        self.max_instructions = max_instructions
+        self.max_call_depth = max_call_depth
+        self.max_seconds = max_seconds
+
+
+class LimitExceeded(Exception):
+    """
+    Error que se lanza cuando la ejecución supera alguno de sus limites.
+
+    Atributos:
+        limit:          El limite superado, instancia de Limit.
+        quad_index:     Indice del cuadruplo donde se detuvo la ejecución.
+        instructions:   Instrucciones ejecutadas hasta ese momento.
+        call_depth:     Frames en el stack de ejecución.
+        elapsed:        Segundos transcurridos desde el inicio de la ejecución.
+        resume_IP:      Indice de la siguiente instrucción del programa decodificado (del cuadruplo con la cadena
+                        de if/elif), con la que continua la ejecución si se vuelve a llamar VM.run (None si el IP
+                        del frame ya esta actualizado).
+    """
+
+    def __init__(self, limit, quad_index, instructions, call_depth, elapsed, resume_IP=None):
+        super().__init__(f'Execution limit exceeded ({limit.value}) at quad {quad_index}: '
+                         f'{instructions} instructions, call depth {call_depth}, {elapsed:.3f} s')
+        self.limit = limit
+        self.quad_index = quad_index
+        self.instructions = instructions
+        self.call_depth = call_depth
+        self.elapsed = elapsed
+        self.resume_IP = resume_IP
+
+    def as_dict(self):
+        """
+        :return: Diccionario serializable con el limite superado y los contadores.
+        """
+        return {
+            'limit': self.limit.value,
+            'quad_index': self.quad_index,
+            'instructions': self.instructions,
+            'call_depth': self.call_depth,
+            'elapsed': self.elapsed,
+        }
+
+
+class LimitCounters:
+    """
+    Contadores de una ejecución con limites. Las instrucciones se cuentan por tramos: cada salto, llamada o
+    regreso suma las instrucciones ejecutadas desde el inicio del tramo anterior, por lo que las instrucciones
+    que no cambian el flujo no tienen ningún costo extra. Los limites solo se verifican en los saltos hacia atras
+    y en las llamadas, que es donde un programa puede ejecutarse indefinidamente.
+
+    Atributos:
+        limits:         Instancia de ExecutionLimits.
+        instructions:   Instrucciones ejecutadas hasta el inicio del tramo actual.
+        segment_start:  Indice de la primera instrucción del tramo actual.
+        started:        Momento (perf_counter) en que inicio la ejecución.
+    """
+
+    def __init__(self, limits, start_IP):
+        self.limits = limits
+        self.instructions = 0
+        self.segment_start = start_IP
+        self.started = perf_counter()
+
+    def end_segment(self, IP, next_IP):
+        """
+        Cierra el tramo que termina en la instrucción IP y empieza uno nuevo en next_IP.
+        """
+        self.instructions += IP - self.segment_start + 1
+        self.segment_start = next_IP
+
+    def check(self, quad_index, call_depth, resume_IP=None):
+        """
+        Verifica los limites y lanza LimitExceeded si alguno se supero.
+
+        :param quad_index: Indice del cuadruplo que se esta ejecutando.
+        :param call_depth: Frames en el stack de ejecución.
+        :param resume_IP: Indice de la siguiente instrucción a ejecutar (ver LimitExceeded.resume_IP).
+        """
+        limits = self.limits
+        elapsed = perf_counter() - self.started
+        if limits.max_instructions is not None and self.instructions > limits.max_instructions:
+            limit = Limit.INSTRUCTIONS
+        elif limits.max_call_depth is not None and call_depth > limits.max_call_depth:
+            limit = Limit.CALL_DEPTH
+        elif limits.max_seconds is not None and elapsed > limits.max_seconds:
+            limit = Limit.WALL_TIME
+        else:
+            return
+        raise LimitExceeded(limit, quad_index, self.instructions, call_depth, elapsed, resume_IP)
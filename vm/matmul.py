@@ -0,0 +1,141 @@
+from vm.memory import numpy, INT_PARTITION, FLOAT_PARTITION
+from vm.vector import INT_LIMIT, magnitude
+
+"""
+Ejecución de las instrucciones MATMUL (ver compiler.optimizer.recognize_matmul). La multiplicación completa se
+calcula con un kernel de Python, o de NumPy con la memoria de NumPy (MemoryBackend.NUMPY), que realiza las mismas
+operaciones en el mismo orden que los ciclos interpretados: cada elemento de p acumula los productos en orden de k
+y se convierte al tipo de p despues de cada suma. Si algún rango es vacio, algún VERIFY fallaria, un elemento
+queda fuera de su partición o algún calculo podría lanzar un error (un elemento sin inicializar, un entero que no
+cabe en 64 bits), la instrucción no modifica la memoria y la VM ejecuta los ciclos, que lanzan el mismo error.
+"""
+
+"""
+Tamaño de los bloques de renglones y columnas del kernel de Python. Cada bloque recorre un renglón de a y las
+columnas de b que le corresponden mientras siguen en la cache del procesador.
+"""
+BLOCK_SIZE = 32
+
+
+def build_matmul_runner(segments, use_numpy):
+    """
+    Crea la función que ejecuta una instrucción MATMUL sobre los segmentos de la VM.
+
+    :param segments: Lista de segmentos de la VM, indexada por segmento y partición.
+    :param use_numpy: Si es verdadero, las particiones son memoryviews de arreglos de NumPy (NumpyAddressBlock) y
+                      se usa el kernel de NumPy.
+    :return: Función run(nest) que recibe el operando A decodificado de la instrucción, una tupla (i, i_final, j,
+             j_start, j_final, k, k_start, k_final, p, a, b, limites) donde cada matriz es una tupla (base,
+             columnas), y regresa verdadero si calculo la multiplicación o falso si se deben ejecutar los ciclos.
+    """
+    def read(operand):
+        return segments[operand[0]][operand[1]][operand[2]]
+
+    def fits(matrix, rows, columns):
+        """
+        :return: Verdadero si los elementos [rows) x [columns) de la matriz estan dentro de su partición.
+        """
+        (segment, partition, base), width = matrix
+        first = base + rows.start * width + columns.start
+        last = base + (rows.stop - 1) * width + columns.stop - 1
+        return first >= 0 and last < len(segments[segment][partition])
+
+    def largest(matrix, rows, columns):
+        """
+        :return: El mayor valor absoluto de los elementos [rows) x [columns) de la matriz, como float, o None si
+                 algún elemento no es un número.
+        """
+        (segment, partition, base), width = matrix
+        values = segments[segment][partition]
+        if use_numpy:
+            block, _ = elements(matrix, rows, columns)
+            return magnitude(block)
+        result = 0.0
+        for row in range(rows.start, rows.stop):
+            first = base + row * width
+            for value in values[first + columns.start:first + columns.stop]:
+                if type(value) != int and type(value) != float:
+                    return None
+                result = max(result, abs(float(value)))
+        return result
+
+    def python_kernel(p, a, b, rows, columns, inner):
+        (p_segment, p_partition, p_base), p_width = p
+        (a_segment, a_partition, a_base), a_width = a
+        (b_segment, b_partition, b_base), b_width = b
+        p_values = segments[p_segment][p_partition]
+        a_values = segments[a_segment][a_partition]
+        b_values = segments[b_segment][b_partition]
+        convert = int if p_partition == INT_PARTITION else float if p_partition == FLOAT_PARTITION else None
+        for row_block in range(rows.start, rows.stop, BLOCK_SIZE):
+            for column_block in range(columns.start, columns.stop, BLOCK_SIZE):
+                for row in range(row_block, min(row_block + BLOCK_SIZE, rows.stop)):
+                    a_row = a_base + row * a_width
+                    p_row = p_base + row * p_width
+                    for column in range(column_block, min(column_block + BLOCK_SIZE, columns.stop)):
+                        index = p_row + column
+                        b_column = b_base + column
+                        for k in inner:
+                            value = p_values[index] + a_values[a_row + k] * b_values[b_column + k * b_width]
+                            p_values[index] = convert(value) if convert else value
+
+    def elements(matrix, rows, columns):
+        """
+        :return: Copia de los elementos [rows) x [columns) de la matriz como arreglo de NumPy de dos dimensiones.
+        """
+        (segment, partition, base), width = matrix
+        index = base + numpy.arange(rows.start, rows.stop)[:, None] * width + numpy.arange(columns.start,
+                                                                                            columns.stop)
+        return numpy.asarray(segments[segment][partition])[index], index
+
+    def numpy_kernel(p, a, b, rows, columns, inner):
+        p_values, p_index = elements(p, rows, columns)
+        a_values, _ = elements(a, rows, inner)
+        b_values, _ = elements(b, inner, columns)
+        with numpy.errstate(all='ignore'):
+            if p[0][1] == INT_PARTITION:
+                result = p_values + a_values @ b_values
+            else:
+                # Se suma un producto a la vez para conservar el redondeo de los ciclos interpretados.
+                result = p_values
+                for k in range(len(inner)):
+                    result += a_values[:, k:k + 1] * b_values[k:k + 1, :]
+        numpy.asarray(segments[p[0][0]][p[0][1]])[p_index] = result
+
+    def run(nest):
+        i, i_final, j, j_start, j_final, k, k_start, k_final, p, a, b, bounds = nest
+        ranges = {i: range(read(i), read(i_final)), j: range(read(j_start), read(j_final)),
+                  k: range(read(k_start), read(k_final))}
+        rows, columns, inner = ranges[i], ranges[j], ranges[k]
+        if not rows or not columns or not inner:
+            return False
+        # Un VERIFY fallaria en alguna iteración: los ciclos lanzan el error en la iteración que corresponde.
+        for control, low, high in bounds:
+            if ranges[control].start < low or ranges[control].stop > high:
+                return False
+        if not fits(p, rows, columns) or not fits(a, rows, inner) or not fits(b, inner, columns):
+            return False
+        try:
+            p_max, a_max, b_max = largest(p, rows, columns), largest(a, rows, inner), largest(b, inner, columns)
+            if p_max is None or a_max is None or b_max is None:
+                return False
+            # Cotas en float de los productos y de las sumas: con enteros deben caber en 64 bits y al convertir a int
+            # deben ser finitas. Las comparaciones negadas tambien rechazan NaN.
+            product_max = a_max * b_max
+            if a[0][1] == b[0][1] == INT_PARTITION and not product_max < INT_LIMIT \
+                    or p[0][1] == INT_PARTITION and not p_max + len(inner) * product_max < INT_LIMIT:
+                return False
+        except OverflowError:
+            # Un entero de Python que no se puede convertir a float.
+            return False
+        # NumPy solo calcula exactamente igual productos de enteros o acumulados en float.
+        if use_numpy and (p[0][1] == FLOAT_PARTITION or a[0][1] == b[0][1] == INT_PARTITION):
+            numpy_kernel(p, a, b, rows, columns, inner)
+        else:
+            python_kernel(p, a, b, rows, columns, inner)
+        segments[i[0]][i[1]][i[2]] = rows.stop
+        segments[j[0]][j[1]][j[2]] = columns.stop
+        segments[k[0]][k[1]][k[2]] = inner.stop
+        return True
+
+    return run
@@ -0,0 +1,60 @@
+from collections import OrderedDict
+from vm.memory import decode_address
+
+"""
+Marca de una consulta que no encontro el resultado en la cache (los resultados pueden ser cualquier valor).
+"""
+MISSING = object()
+
+
+class MemoCache:
+    """
+    Cache LRU con los valores de regreso de una función pura, indexados por la tupla de sus argumentos.
+
+    Atributos:
+        params:         Operandos decodificados (partición, indice) de los parametros en la memoria local.
+        return_operand: Operando decodificado (segmento, partición, indice) de la variable de regreso.
+        max_size:       Número máximo de resultados guardados; al llenarse se descarta el menos usado.
+        entries:        OrderedDict que asocia cada tupla de argumentos con el valor de regreso.
+        hits:           Llamadas cuyo resultado estaba en la cache.
+        misses:         Llamadas que se ejecutaron.
+    """
+
+    def __init__(self, fun, max_size):
+        self.params = [decode_address(addr)[1:] for addr, _ in fun.param_table]
+        self.return_operand = decode_address(fun.return_addr)
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, frame):
+        """
+        :param frame: Frame de la llamada, con sus parametros ya escritos (Frame o WindowFrame).
+        :return: Tupla con los argumentos de la llamada.
+        """
+        partitions = frame.local_partitions
+        return tuple([partitions[partition][index] for partition, index in self.params])
+
+    def get(self, key):
+        """
+        :return: El valor de regreso guardado para los argumentos "key", o MISSING.
+        """
+        value = self.entries.get(key, MISSING)
+        if value is MISSING:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self.entries[key] = value
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def stats(self):
+        """
+        :return: Diccionario serializable con los aciertos, fallos y resultados guardados.
+        """
+        return {'hits': self.hits, 'misses': self.misses, 'entries': len(self.entries)}
@@ -1,5 +1,89 @@
+from array import array
+from enum import Enum
+from functools import lru_cache
+from common.scope_size import GLOBAL_ADDRESS_RANGE, LOCAL_ADDRESS_RANGE, CONST_ADDRESS_RANGE, TEMP_ADDRESS_RANGE, \
+    POINTER_ADDRESS_RANGE
 from compiler.symbol_table import VarType
 
+try:
+    import numpy
+except ImportError:
+    # NumPy es opcional: sin él MemoryBackend.NUMPY no esta disponible y la VM utiliza MemoryBackend.TYPED.
+    numpy = None
+
+"""
+Identificadores de los segmentos de memoria por scope, en el mismo orden que SEGMENT_RANGES.
+"""
+GLOBAL_SEGMENT = 0
+LOCAL_SEGMENT = 1
+CONST_SEGMENT = 2
+TEMP_SEGMENT = 3
+POINTER_SEGMENT = 4
+SEGMENT_RANGES = (GLOBAL_ADDRESS_RANGE, LOCAL_ADDRESS_RANGE, CONST_ADDRESS_RANGE, TEMP_ADDRESS_RANGE,
+                  POINTER_ADDRESS_RANGE)
+
+"""
+Tipo de dato de cada partición de un bloque de memoria, en el orden de AddressBlock.partitions.
+"""
+PARTITION_TYPES = (VarType.INT, VarType.FLOAT, VarType.CHAR, VarType.BOOL)
+INT_PARTITION = 0
+FLOAT_PARTITION = 1
+CHAR_PARTITION = 2
+BOOL_PARTITION = 3
+
+
+class MemoryBackend(Enum):
+    """
+    Implementaciones disponibles para los bloques de memoria de la VM.
+    """
+    LIST = 'list'
+    TYPED = 'typed'
+    WINDOW = 'window'
+    NUMPY = 'numpy'
+
+
+@lru_cache(maxsize=None)
+def decode_address(addr):
+    """
+    Traduce una dirección virtual (absoluta) a su segmento, partición e indice relativo a la partición.
+
+    :param addr: Dirección (absoluta) a decodificar.
+    :return: Tupla (segmento, partición, indice).
+    """
+    for segment, (start_addr, end_addr) in enumerate(SEGMENT_RANGES):
+        if start_addr <= addr < end_addr:
+            partition, index = divmod(int(addr) - start_addr, (end_addr - start_addr + 1) // 4)
+            return segment, partition, index
+    raise MemoryError('Address out of bounds')
+
+
+class PointerPartition:
+    """
+    Vista de una partición de la memoria de apuntadores. Leer o escribir un indice de la vista desreferencia el
+    apuntador guardado en ese indice, de forma que los handlers acceden a un apuntador igual que a cualquier otro
+    operando decodificado.
+
+    Atributos:
+        slots:      Partición de la memoria de apuntadores que guarda las direcciones (absolutas).
+        segments:   Lista de segmentos de la VM, indexada por segmento y partición.
+    """
+    def __init__(self, slots, segments):
+        self.slots = slots
+        self.segments = segments
+
+    def __getitem__(self, index):
+        segment, partition, rel_index = decode_address(self.slots[index])
+        return self.segments[segment][partition][rel_index]
+
+    def __setitem__(self, index, value):
+        segment, partition, rel_index = decode_address(self.slots[index])
+        if partition == INT_PARTITION:
+            value = int(value)
+        elif partition == FLOAT_PARTITION:
+            value = float(value)
+        self.segments[segment][partition][rel_index] = value
+
+
 class AddressBlock:
     """
     Clase que representa un bloque de direcciones de memoria, particionado en los 4 tipos de dato disponibles
@@ -13,6 +97,7 @@ class AddressBlock:
         float_addr_block:   Bloque de direcciones de memoria para la partición float.
         char_addr_block:    Bloque de direcciones de memoria para la partición char.
         bool_addr_block:    Bloque de direcciones de memoria para la partición bool.
+        partitions:         Los 4 bloques anteriores, indexados por partición (ver PARTITION_TYPES).
     """
     def __init__(self, start_addr, end_addr, int_size=None, float_size=None, char_size=None, bool_size=None):
         self.start_addr = start_addr
@@ -22,6 +107,17 @@ class AddressBlock:
         self.float_addr_block = [None] * (self.default_size if float_size is None else float_size)
         self.char_addr_block = [None] * (self.default_size if char_size is None else char_size)
         self.bool_addr_block = [None] * (self.default_size if bool_size is None else bool_size)
+        self.partitions = [self.int_addr_block, self.float_addr_block, self.char_addr_block, self.bool_addr_block]
+
+    def set_partitions(self, partitions):
+        """
+        Reemplaza los 4 bloques de direcciones. La lista self.partitions se modifica en su lugar, por lo que las
+        referencias a ella (por ejemplo los segmentos de la VM) ven los nuevos bloques.
+
+        :param partitions: Los nuevos bloques, indexados por partición.
+        """
+        self.partitions[:] = partitions
+        self.int_addr_block, self.float_addr_block, self.char_addr_block, self.bool_addr_block = self.partitions
 
     def get_partition(self, addr):
         """
@@ -113,3 +209,261 @@ class AddressBlock:
             return self.char_addr_block[addr:addr + size]
         elif partition == VarType.BOOL:
             return self.bool_addr_block[addr:addr + size]
+
+
+class TypedAddressBlock(AddressBlock):
+    """
+    Bloque de direcciones de memoria cuyas particiones guardan los valores sin encapsular en objetos de Python:
+    int en array('q'), float en array('d') y bool en bytearray. La partición char se mantiene como lista porque
+    una variable char puede guardar una cadena completa.
+    Las particiones se inicializan en 0 (o None para char) en vez de None y los enteros estan limitados a 64 bits.
+    """
+    def __init__(self, start_addr, end_addr, int_size=None, float_size=None, char_size=None, bool_size=None):
+        self.start_addr = start_addr
+        self.default_size = (end_addr - start_addr + 1) // 4
+
+        self.int_addr_block = array('q', [0]) * (self.default_size if int_size is None else int_size)
+        self.float_addr_block = array('d', [0.0]) * (self.default_size if float_size is None else float_size)
+        self.char_addr_block = [None] * (self.default_size if char_size is None else char_size)
+        self.bool_addr_block = bytearray(self.default_size if bool_size is None else bool_size)
+        self.partitions = [self.int_addr_block, self.float_addr_block, self.char_addr_block, self.bool_addr_block]
+
+    def write(self, addr, value):
+        """
+        Escribe un valor en una dirección de memoria. Solo se convierte el valor cuando el tipo del arreglo no lo
+        acepta directamente (un float que se guarda en la partición int).
+
+        :param addr: Dirección (absoluta) en la cual se desea escribir.
+        :param value: Valor que se desea escribir en memoria.
+        """
+        partition = self.get_partition(addr)
+        index = self.get_address(addr, partition)
+        if partition == VarType.INT:
+            self.int_addr_block[index] = value if type(value) == int else int(value)
+        elif partition == VarType.FLOAT:
+            self.float_addr_block[index] = value
+        elif partition == VarType.CHAR:
+            self.char_addr_block[index] = value
+        elif partition == VarType.BOOL:
+            self.bool_addr_block[index] = value
+
+
+def numpy_partition(dtype, typecode, size):
+    """
+    Crea un arreglo de NumPy de "size" ceros y regresa una memoryview sobre él con el formato "typecode".
+    """
+    return memoryview(numpy.zeros(size, dtype)).cast('B').cast(typecode)
+
+
+class NumpyAddressBlock(TypedAddressBlock):
+    """
+    Bloque de direcciones de memoria cuyas particiones int, float y bool viven en arreglos de NumPy (int64, float64
+    y uint8), de forma que las instrucciones VECTOR operan sobre los arreglos declarados sin copiarlos (ver
+    vm/vector.py). La VM accede a cada partición a traves de una memoryview con el mismo formato que
+    TypedAddressBlock, así que las instrucciones escalares leen y escriben valores de Python igual que con ese
+    bloque, salvo que escribir un entero que no cabe en 64 bits lanza ValueError en vez de OverflowError.
+    La partición char se mantiene como lista. Requiere NumPy.
+    """
+    def __init__(self, start_addr, end_addr, int_size=None, float_size=None, char_size=None, bool_size=None):
+        self.start_addr = start_addr
+        self.default_size = (end_addr - start_addr + 1) // 4
+
+        self.int_addr_block = numpy_partition(numpy.int64, 'q', self.default_size if int_size is None else int_size)
+        self.float_addr_block = numpy_partition(numpy.float64, 'd',
+                                                self.default_size if float_size is None else float_size)
+        self.char_addr_block = [None] * (self.default_size if char_size is None else char_size)
+        self.bool_addr_block = numpy_partition(numpy.uint8, 'B', self.default_size if bool_size is None else bool_size)
+        self.partitions = [self.int_addr_block, self.float_addr_block, self.char_addr_block, self.bool_addr_block]
+
+
+class FrameLayout:
+    """
+    Distribución de la memoria de un frame dentro del CallStack. Se calcula una vez por función: en cada buffer
+    el frame ocupa primero sus variables locales y a continuación sus temporales.
+
+    Atributos:
+        local_sizes:    Tamaños de las particiones locales.
+        temp_sizes:     Tamaños de las particiones temporales.
+        sizes:          Espacio que ocupa el frame en cada buffer (locales más temporales).
+        windows:        Tuplas (partición, tamaño local, tamaño total, ceros) de las particiones tipadas que no
+                        estan vacias, donde "ceros" es un buffer del mismo formato para limpiar la ventana.
+    """
+    __slots__ = ('local_sizes', 'temp_sizes', 'sizes', 'windows')
+
+    def __init__(self, local_sizes, temp_sizes):
+        self.local_sizes = local_sizes
+        self.temp_sizes = temp_sizes
+        self.sizes = tuple(local + temp for local, temp in zip(local_sizes, temp_sizes))
+        self.windows = tuple((p, local_sizes[p], size, FrameLayout.zeros(p, size))
+                             for p, size in enumerate(self.sizes) if size and p != CHAR_PARTITION)
+
+    @staticmethod
+    def zeros(partition, size):
+        """
+        Regresa un buffer de "size" ceros con el mismo formato que el buffer de la partición en el CallStack.
+        """
+        if partition == BOOL_PARTITION:
+            return bytes(size)
+        return array('q' if partition == INT_PARTITION else 'd', [0]) * size
+
+
+class CallStack:
+    """
+    Stack de ejecución contiguo: las variables locales y temporales de todas las funciones activas viven en un
+    solo buffer tipado por partición (array('q'), array('d') y bytearray), y cada frame es solo un offset base
+    dentro de esos buffers. Llamar a una función reserva espacio moviendo el tope del stack y regresar lo libera.
+    El frame en ejecución accede a su ventana del buffer a traves de memoryviews, que solo existen para los frames
+    cercanos al tope del stack; antes de crecer los buffers se liberan todas las ventanas abiertas.
+    La partición char se guarda en una lista por frame porque una variable char puede guardar una cadena completa.
+
+    Atributos:
+        buffers:        Buffers de las particiones int, float y bool (la posición de char es None).
+        base_views:     Memoryview de cada buffer, de la que se obtienen las ventanas de los frames.
+        tops:           Primer indice libre de cada buffer.
+        peak:           Mayor tamaño alcanzado por cada buffer.
+    """
+    TYPED_PARTITIONS = (INT_PARTITION, FLOAT_PARTITION, BOOL_PARTITION)
+
+    def __init__(self, capacity=1024):
+        self.buffers = [array('q', [0]) * capacity, array('d', [0.0]) * capacity, None, bytearray(capacity)]
+        self.base_views = [None] * 4
+        self.tops = (0, 0, 0, 0)
+        self.peak = [0, 0, 0, 0]
+        self.open_base_views()
+
+    def open_base_views(self):
+        """
+        Crea una memoryview sobre cada buffer tipado (al crear el stack y despues de crecer los buffers).
+        """
+        for p in self.TYPED_PARTITIONS:
+            self.base_views[p] = memoryview(self.buffers[p])
+
+    def fits(self, sizes):
+        """
+        Indica si un frame con los tamaños "sizes" cabe en los buffers sin crecerlos.
+
+        :param sizes: Tamaños de las 4 particiones del frame.
+        """
+        tops, buffers = self.tops, self.buffers
+        return tops[0] + sizes[0] <= len(buffers[0]) and tops[1] + sizes[1] <= len(buffers[1]) \
+            and tops[3] + sizes[3] <= len(buffers[3])
+
+    def grow(self, sizes):
+        """
+        Duplica los buffers que no tienen espacio para un frame con los tamaños "sizes".
+        Todas las ventanas de los frames se deben liberar (CallStack.release) antes de llamar este metodo.
+
+        :param sizes: Tamaños de las 4 particiones del frame.
+        """
+        for p in self.TYPED_PARTITIONS:
+            self.base_views[p].release()
+        for p in self.TYPED_PARTITIONS:
+            buffer = self.buffers[p]
+            while self.tops[p] + sizes[p] > len(buffer):
+                buffer.extend(bytes(len(buffer)) if p == BOOL_PARTITION else buffer)
+        self.open_base_views()
+
+    def push(self, sizes):
+        """
+        Reserva espacio para un frame en el tope del stack.
+
+        :param sizes: Tamaños de las 4 particiones del frame.
+        :return: Offset base del frame en cada buffer.
+        """
+        bases = self.tops
+        self.tops = tops = (bases[0] + sizes[0], bases[1] + sizes[1], 0, bases[3] + sizes[3])
+        peak = self.peak
+        for p in self.TYPED_PARTITIONS:
+            if tops[p] > peak[p]:
+                peak[p] = tops[p]
+        return bases
+
+    def pop(self, bases):
+        """
+        Libera el espacio de un frame, regresando el tope del stack a su offset base.
+
+        :param bases: Offset base del frame en cada buffer.
+        """
+        self.tops = bases
+
+    def views(self, bases, layout, local_chars, temp_chars, clear=False):
+        """
+        Crea las ventanas de un frame sobre los buffers, indexadas por partición como AddressBlock.partitions.
+        Las particiones vacias no crean una ventana.
+
+        :param bases: Offset base del frame en cada buffer.
+        :param layout: FrameLayout del frame.
+        :param local_chars: Lista con la partición char local del frame.
+        :param temp_chars: Lista con la partición char temporal del frame.
+        :param clear: Si es verdadero, inicializa las ventanas en 0 (frames nuevos, ya que los buffers pueden
+                      tener valores de un frame anterior).
+        :return: Tupla (particiones locales, particiones temporales).
+        """
+        local = [(), (), local_chars, ()]
+        temp = [(), (), temp_chars, ()]
+        base_views = self.base_views
+        for p, local_size, size, zeros in layout.windows:
+            base = bases[p]
+            view = base_views[p][base:base + size]
+            if clear:
+                view[:] = zeros
+            if not local_size:
+                temp[p] = view
+            elif local_size == size:
+                local[p] = view
+            else:
+                local[p] = view[:local_size]
+                temp[p] = view[local_size:]
+        return local, temp
+
+    @staticmethod
+    def release(partitions):
+        """
+        Libera las ventanas de un frame para que los buffers puedan volver a crecer.
+
+        :param partitions: Particiones creadas por CallStack.views.
+        """
+        for partition in partitions:
+            if type(partition) == memoryview:
+                partition.release()
+
+
+class ConstantPool(AddressBlock):
+    """
+    Bloque de memoria de solo lectura con los valores de la tabla de constantes, materializados una sola vez al
+    cargar el programa. Cada partición tiene el tamaño exacto que ocupan las constantes: los int y float se guardan
+    en arreglos tipados y las cadenas en una lista, tal como llegan del lexer (compiler/lexer.py ya resolvio sus
+    secuencias de escape).
+    """
+    def __init__(self, const_table):
+        self.start_addr = CONST_ADDRESS_RANGE[0]
+        self.default_size = (CONST_ADDRESS_RANGE[1] - CONST_ADDRESS_RANGE[0] + 1) // 4
+
+        sizes = [0, 0, 0, 0]
+        values = []
+        for const in const_table.values():
+            partition = self.get_partition(const.address)
+            index = self.get_address(const.address, partition)
+            if partition == VarType.INT:
+                value = int(const.name)
+            elif partition == VarType.FLOAT:
+                value = float(const.name)
+            else:
+                value = const.name
+            partition_index = PARTITION_TYPES.index(partition)
+            sizes[partition_index] = max(sizes[partition_index], index + const.size)
+            values.append((partition_index, index, value))
+
+        self.partitions = [[0] * sizes[0], [0.0] * sizes[1], [None] * sizes[2], [None] * sizes[3]]
+        for partition_index, index, value in values:
+            self.partitions[partition_index][index] = value
+        try:
+            self.partitions[0] = array('q', self.partitions[0])
+        except OverflowError:
+            # Alguna constante entera no cabe en 64 bits, se mantiene la lista.
+            pass
+        self.partitions[1] = array('d', self.partitions[1])
+        self.int_addr_block, self.float_addr_block, self.char_addr_block, self.bool_addr_block = self.partitions
+
+    def write(self, addr, value):
+        raise MemoryError('Cannot to write to read-only memory')
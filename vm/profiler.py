@@ -0,0 +1,368 @@
+import json
+from dataclasses import dataclass, asdict
+from compiler.quadruple import Operator
+from vm.superinstructions import Superinstruction
+
+"""
+Nombre de cada opcode entero de la VM: los operadores seguidos de las superinstrucciones.
+"""
+OPCODE_NAMES = [operator.name for operator in Operator] + [superinstruction.name
+                                                            for superinstruction in Superinstruction]
+
+
+class Profiler:
+    """
+    Perfilador de la ejecución de la VM. Se pasa a VM.run para contar cuantas veces se ejecuta cada instrucción y
+    medir el tiempo acumulado de cada una. Sin perfilador la VM ejecuta su ciclo normal, sin ningún costo extra.
+
+    Atributos:
+        sample_every:   Se mide el tiempo de una de cada "sample_every" instrucciones ejecutadas; el tiempo del
+                        resto se estima a partir de las muestras.
+        top:            Número de instrucciones que se incluyen en el reporte por indice.
+        counts:         Número de ejecuciones de cada instrucción, indexado por su posición en el programa.
+        times:          Tiempo acumulado (en segundos) de las ejecuciones medidas de cada instrucción.
+        samples:        Número de ejecuciones medidas de cada instrucción.
+    """
+
+    def __init__(self, sample_every=1, top=20):
+        self.sample_every = sample_every
+        self.top = top
+        self.counts = []
+        self.times = []
+        self.samples = []
+
+    def start(self, program_size):
+        """
+        Reinicia los contadores para un programa con "program_size" instrucciones.
+
+        :return: Tupla (counts, times, samples) con las listas que actualiza el ciclo de ejecución.
+        """
+        self.counts = [0] * program_size
+        self.times = [0.0] * program_size
+        self.samples = [0] * program_size
+        return self.counts, self.times, self.samples
+
+    def estimated_time(self, index):
+        """
+        Estima el tiempo total de una instrucción escalando el tiempo de sus ejecuciones medidas.
+
+        :param index: Posición de la instrucción en el programa.
+        """
+        if not self.samples[index]:
+            return 0.0
+        return self.times[index] * self.counts[index] / self.samples[index]
+
+    def report(self, vm):
+        """
+        Genera el reporte de la ejecución: los opcodes ordenados por tiempo estimado y las instrucciones más
+        ejecutadas, cada una con los cuadruplos originales que le corresponden.
+
+        :param vm: La VM que se ejecuto con este perfilador.
+        :return: Diccionario serializable a JSON.
+        """
+        opcodes = {}
+        for index, count in enumerate(self.counts):
+            if not count:
+                continue
+            name = OPCODE_NAMES[vm.program[index][0]]
+            entry = opcodes.setdefault(name, {'opcode': name, 'count': 0, 'time': 0.0})
+            entry['count'] += count
+            entry['time'] += self.estimated_time(index)
+
+        origin = vm.program_origin + [len(vm.quad_list)]
+        hot = sorted((index for index, count in enumerate(self.counts) if count),
+                     key=lambda index: (-self.counts[index], index))[:self.top]
+        instructions = [{
+            'index': index,
+            'opcode': OPCODE_NAMES[vm.program[index][0]],
+            'count': self.counts[index],
+            'time': self.estimated_time(index),
+            'quads': list(range(origin[index], origin[index + 1])),
+            'quadruples': [str(quad) for quad in vm.quad_list[origin[index]:origin[index + 1]]],
+        } for index in hot]
+
+        return {
+            'instructions_executed': sum(self.counts),
+            'estimated_time': sum(entry['time'] for entry in opcodes.values()),
+            'sample_every': self.sample_every,
+            'opcodes': sorted(opcodes.values(), key=lambda entry: (-entry['time'], -entry['count'])),
+            'hot_instructions': instructions,
+        }
+
+    def format_text(self, vm):
+        """
+        Genera el reporte como texto en forma de tabla.
+
+        :param vm: La VM que se ejecuto con este perfilador.
+        :return: El reporte.
+        """
+        report = self.report(vm)
+        total_time = report['estimated_time'] or 1.0
+        lines = [f'Instrucciones ejecutadas: {report["instructions_executed"]}',
+                 f'Tiempo estimado: {report["estimated_time"] * 1000:.2f} ms '
+                 f'(muestra 1 de cada {report["sample_every"]})',
+                 '',
+                 f'{"opcode":<20}{"ejecuciones":>14}{"ms":>12}{"%":>8}']
+        for entry in report['opcodes']:
+            lines.append(f'{entry["opcode"]:<20}{entry["count"]:>14}{entry["time"] * 1000:>12.2f}'
+                         f'{entry["time"] / total_time * 100:>8.1f}')
+        lines += ['', f'{"indice":<8}{"cuadruplo":<11}{"opcode":<20}{"ejecuciones":>14}{"ms":>12}']
+        for entry in report['hot_instructions']:
+            lines.append(f'{entry["index"]:<8}{entry["quads"][0]:<11}{entry["opcode"]:<20}{entry["count"]:>14}'
+                         f'{entry["time"] * 1000:>12.2f}')
+            for quadruple in entry['quadruples']:
+                lines.append(f'{"":<19}{quadruple}')
+        return '\n'.join(lines)
+
+    def to_json(self, vm):
+        """
+        Genera el reporte en formato JSON.
+
+        :param vm: La VM que se ejecuto con este perfilador.
+        :return: El reporte como cadena JSON.
+        """
+        return json.dumps(self.report(vm), indent=2)
+
+
+class LineProfiler(Profiler):
+    """
+    Perfilador por línea del código fuente. Se pasa a VM.run en lugar de un Profiler: mide igual cada instrucción y
+    agrupa las ejecuciones y el tiempo por la línea del programa que genero cada cuadruplo (Quadruple.line). Una
+    superinstrucción se cuenta en la línea de su primer cuadruplo, y las instrucciones que agrega el optimizador en
+    la línea del cuadruplo que reemplazan (el incremento y el regreso de un for, en la línea del for). El tiempo de
+    una línea que llama a una función no incluye el de la función, que se cuenta en sus propias líneas.
+
+    Atributos:
+        hot_share:      Fracción minima del tiempo estimado total para marcar una línea como costosa en el listado.
+    """
+
+    def __init__(self, sample_every=1, top=20, hot_share=0.05):
+        super().__init__(sample_every, top)
+        self.hot_share = hot_share
+
+    def report(self, vm):
+        """
+        Genera el reporte de la ejecución: las líneas del código fuente ordenadas por tiempo estimado. Las
+        instrucciones cuyo cuadruplo no tiene línea se agrupan en la línea None.
+
+        :param vm: La VM que se ejecuto con este perfilador.
+        :return: Diccionario serializable a JSON.
+        """
+        lines = {}
+        for index, count in enumerate(self.counts):
+            if not count:
+                continue
+            line = vm.quad_list[vm.program_origin[index]].line
+            entry = lines.setdefault(line, {'line': line, 'count': 0, 'time': 0.0})
+            entry['count'] += count
+            entry['time'] += self.estimated_time(index)
+
+        return {
+            'instructions_executed': sum(self.counts),
+            'estimated_time': sum(entry['time'] for entry in lines.values()),
+            'sample_every': self.sample_every,
+            'lines': sorted(lines.values(), key=lambda entry: (-entry['time'], -entry['count'], entry['line'] or 0)),
+        }
+
+    def format_text(self, vm):
+        """
+        Genera el reporte como texto en forma de tabla, con las "top" líneas más costosas.
+
+        :param vm: La VM que se ejecuto con este perfilador.
+        :return: El reporte.
+        """
+        report = self.report(vm)
+        total_time = report['estimated_time'] or 1.0
+        lines = [f'Instrucciones ejecutadas: {report["instructions_executed"]}',
+                 f'Tiempo estimado: {report["estimated_time"] * 1000:.2f} ms '
+                 f'(muestra 1 de cada {report["sample_every"]})',
+                 '',
+                 f'{"línea":<8}{"instrucciones":>14}{"ms":>12}{"%":>8}']
+        for entry in report['lines'][:self.top]:
+            line = entry['line'] if entry['line'] is not None else '-'
+            lines.append(f'{line:<8}{entry["count"]:>14}{entry["time"] * 1000:>12.2f}'
+                         f'{entry["time"] / total_time * 100:>8.1f}')
+        return '\n'.join(lines)
+
+    def format_listing(self, vm, source):
+        """
+        Genera el listado del programa con las instrucciones ejecutadas y el tiempo estimado de cada línea. Las
+        líneas que usan al menos "hot_share" del tiempo total se marcan con ">>".
+
+        :param vm: La VM que se ejecuto con este perfilador.
+        :param source: Código fuente del programa compilado.
+        :return: El listado.
+        """
+        report = self.report(vm)
+        total_time = report['estimated_time'] or 1.0
+        by_line = {entry['line']: entry for entry in report['lines']}
+        lines = [f'Instrucciones ejecutadas: {report["instructions_executed"]}',
+                 f'Tiempo estimado: {report["estimated_time"] * 1000:.2f} ms '
+                 f'(muestra 1 de cada {report["sample_every"]})',
+                 '',
+                 f'{"":<3}{"línea":>6}{"instrucciones":>15}{"ms":>11}{"%":>8}  código']
+        for number, code in enumerate(source.splitlines(), start=1):
+            entry = by_line.get(number)
+            if entry is None:
+                lines.append(f'{"":<3}{number:>6}{"":>34}  {code}')
+                continue
+            share = entry['time'] / total_time
+            marker = '>>' if share >= self.hot_share else ''
+            lines.append(f'{marker:<3}{number:>6}{entry["count"]:>15}{entry["time"] * 1000:>11.2f}'
+                         f'{share * 100:>8.1f}  {code}')
+        if None in by_line:
+            lines.append(f'Instrucciones sin línea: {by_line[None]["count"]}')
+        return '\n'.join(lines)
+
+
+@dataclass
+class FunctionProfile:
+    """
+    Resultados de CallProfiler para una función.
+
+    Atributos:
+        name:                       Nombre de la función en el directorio de funciones.
+        calls:                      Número de llamadas (GOSUB) a la función.
+        memo_hits:                  Llamadas que se resolvieron con la cache de memoización, sin ejecutarla.
+        inclusive_instructions:     Instrucciones ejecutadas por la función y las funciones que llama.
+        exclusive_instructions:     Instrucciones ejecutadas por la función, sin las de las funciones que llama.
+        inclusive_time:             Tiempo (en segundos) de la función y de las funciones que llama.
+        exclusive_time:             Tiempo (en segundos) de la función sin el de las funciones que llama.
+        max_depth:                  Máximo número de llamadas a la función activas al mismo tiempo (1 si no es
+                                    recursiva).
+    """
+    name: str
+    calls: int = 0
+    memo_hits: int = 0
+    inclusive_instructions: int = 0
+    exclusive_instructions: int = 0
+    inclusive_time: float = 0.0
+    exclusive_time: float = 0.0
+    max_depth: int = 0
+
+
+class CallProfiler:
+    """
+    Perfilador de llamadas de la VM. Se pasa a VM.run en lugar de un Profiler para medir, por función, las llamadas,
+    las instrucciones ejecutadas, el tiempo y la profundidad de recursión. La ejecución solo mide el tiempo en cada
+    GOSUB y ENDFUN, así que el costo extra es mucho menor que el de Profiler.
+
+    Una llamada empieza en su GOSUB, despues del ERA y de los PARAMETER: la evaluación de los argumentos (que puede
+    llamar a otras funciones) se cuenta en la función que llama. Como en cProfile, los valores inclusivos de una
+    función recursiva solo cuentan la llamada más externa, para no sumar varias veces el mismo tiempo. Las llamadas
+    recursivas en posición de cola que el compilador reemplaza por saltos no son llamadas en la VM.
+
+    Atributos:
+        functions:      Diccionario que asocia el nombre de cada función llamada con su FunctionProfile. Incluye la
+                        función principal (main), que empieza con la ejecución.
+        calls:          Llamadas en ejecución, listas [FunctionProfile, instrucciones al empezar, tiempo al empezar,
+                        instrucciones de las llamadas internas, tiempo de las llamadas internas].
+        active:         Número de llamadas en ejecución de cada función.
+    """
+
+    def __init__(self):
+        self.functions = {}
+        self.calls = []
+        self.active = {}
+
+    def start(self, root, instructions, now):
+        """
+        Reinicia los resultados y empieza la llamada de la función principal.
+
+        :param root: Nombre de la función principal.
+        :param instructions: Instrucciones ejecutadas hasta el momento.
+        :param now: Tiempo actual (perf_counter).
+        """
+        self.functions = {}
+        self.calls = []
+        self.active = {}
+        self.enter(root, instructions, now)
+
+    def enter(self, name, instructions, now):
+        """
+        Empieza una llamada a la función "name" (al ejecutar su GOSUB).
+        """
+        function = self.functions.get(name)
+        if function is None:
+            function = self.functions[name] = FunctionProfile(name)
+        function.calls += 1
+        depth = self.active.get(name, 0) + 1
+        self.active[name] = depth
+        function.max_depth = max(function.max_depth, depth)
+        self.calls.append([function, instructions, now, 0, 0.0])
+
+    def leave(self, instructions, now):
+        """
+        Termina la llamada en ejecución (al ejecutar su ENDFUN) y descuenta su costo del de la función que la llamo.
+        """
+        function, start_instructions, start_time, inner_instructions, inner_time = self.calls.pop()
+        spent_instructions = instructions - start_instructions
+        spent_time = now - start_time
+        function.exclusive_instructions += spent_instructions - inner_instructions
+        function.exclusive_time += spent_time - inner_time
+        self.active[function.name] -= 1
+        if not self.active[function.name]:
+            function.inclusive_instructions += spent_instructions
+            function.inclusive_time += spent_time
+        if self.calls:
+            self.calls[-1][3] += spent_instructions
+            self.calls[-1][4] += spent_time
+
+    def memoized(self, name, instructions, start, now):
+        """
+        Registra una llamada que se resolvió con la cache de memoización: no abre un frame ni ejecuta ENDFUN.
+
+        :param start: Tiempo al empezar el GOSUB.
+        """
+        self.enter(name, instructions, start)
+        self.functions[name].memo_hits += 1
+        self.leave(instructions, now)
+
+    def finish(self, instructions, now):
+        """
+        Termina las llamadas que siguen en ejecución al terminar el programa o al detenerse por un error o por un
+        limite de ejecución.
+        """
+        while self.calls:
+            self.leave(instructions, now)
+
+    def report(self):
+        """
+        Genera el reporte de la ejecución: las funciones ordenadas por tiempo exclusivo.
+
+        :return: Diccionario serializable a JSON.
+        """
+        functions = sorted(self.functions.values(), key=lambda function: (-function.exclusive_time, function.name))
+        return {
+            'instructions_executed': sum(function.exclusive_instructions for function in functions),
+            'time': sum(function.exclusive_time for function in functions),
+            'functions': [asdict(function) for function in functions],
+        }
+
+    def format_text(self):
+        """
+        Genera el reporte como texto en forma de tabla.
+
+        :return: El reporte.
+        """
+        report = self.report()
+        total_time = report['time'] or 1.0
+        lines = [f'Instrucciones ejecutadas: {report["instructions_executed"]}',
+                 f'Tiempo: {report["time"] * 1000:.2f} ms',
+                 '',
+                 f'{"función":<24}{"llamadas":>10}{"instr. incl.":>14}{"instr. excl.":>14}{"ms incl.":>11}'
+                 f'{"ms excl.":>11}{"%":>7}{"profundidad":>13}']
+        for entry in report['functions']:
+            lines.append(f'{entry["name"]:<24}{entry["calls"]:>10}{entry["inclusive_instructions"]:>14}'
+                         f'{entry["exclusive_instructions"]:>14}{entry["inclusive_time"] * 1000:>11.2f}'
+                         f'{entry["exclusive_time"] * 1000:>11.2f}{entry["exclusive_time"] / total_time * 100:>7.1f}'
+                         f'{entry["max_depth"]:>13}')
+        return '\n'.join(lines)
+
+    def to_json(self):
+        """
+        Genera el reporte en formato JSON.
+
+        :return: El reporte como cadena JSON.
+        """
+        return json.dumps(self.report(), indent=2)
@@ -0,0 +1,487 @@
+from compiler.quadruple import Operator
+from common.scope_size import LOCAL_ADDRESS_RANGE, TEMP_ADDRESS_RANGE
+from vm.vm import VM, Frame, BINARY_OPERATIONS
+from vm.memory import MemoryBackend, decode_address, PARTITION_TYPES, INT_PARTITION, FLOAT_PARTITION, \
+    GLOBAL_SEGMENT, LOCAL_SEGMENT, CONST_SEGMENT, TEMP_SEGMENT
+from vm.memo import MISSING
+from common.debug_flags import DEBUG_VM
+
+"""
+Tipos de operando del programa de registros: un registro del frame actual, un indice del pool de variables
+globales o un valor inmediato (las constantes se copian a la instrucción al traducir el programa).
+"""
+REGISTER = 0
+GLOBAL = 1
+IMMEDIATE = 2
+
+
+class RegisterLayout:
+    """
+    Asignación de registros de una función: las 4 particiones locales seguidas de las 4 particiones temporales,
+    en un solo arreglo por frame.
+
+    Atributos:
+        offsets:    Registro inicial de cada partición, indexado por segmento (LOCAL_SEGMENT o TEMP_SEGMENT) y
+                    partición.
+        sizes:      Tamaño de cada partición, indexado igual que offsets.
+        size:       Número de registros del frame.
+    """
+
+    def __init__(self, local_sizes, temp_sizes):
+        self.offsets = {}
+        self.sizes = {LOCAL_SEGMENT: list(local_sizes), TEMP_SEGMENT: list(temp_sizes)}
+        offset = 0
+        for segment, sizes in ((LOCAL_SEGMENT, local_sizes), (TEMP_SEGMENT, temp_sizes)):
+            self.offsets[segment] = []
+            for size in sizes:
+                self.offsets[segment].append(offset)
+                offset += size
+        self.size = offset
+
+    def register(self, segment, partition, index):
+        return self.offsets[segment][partition] + index
+
+
+def function_of_quads(quad_list, fun_dir):
+    """
+    Encuentra la función a la que pertenece cada cuadruplo: cada función va de su inicio a su ENDFUN y main del
+    destino del GOTO inicial hasta el final de la lista.
+
+    :return: Lista con el nombre de la función de cada cuadruplo (None si no pertenece a ninguna).
+    """
+    owners = [None] * len(quad_list)
+    for name, fun in fun_dir.items():
+        start = fun.start_addr
+        if start is None and name == 'main' and quad_list and quad_list[0].operator == Operator.GOTO:
+            start = quad_list[0].result
+        if start is None:
+            continue
+        i = start
+        while i < len(quad_list):
+            owners[i] = name
+            if quad_list[i].operator == Operator.ENDFUN:
+                break
+            i += 1
+    return owners
+
+
+class RegisterVM(VM):
+    """
+    Maquina virtual de registros. Al cargar el programa traduce cada cuadruplo a una instrucción de tres
+    direcciones (handler, A, B, C) sobre registros: las variables locales, temporales y parametros de cada función
+    se vuelven indices de un arreglo plano de registros por frame (ver RegisterLayout), las variables globales se
+    vuelven indices de un pool plano y las constantes se copian a la instrucción como valores inmediatos. Cada
+    handler se especializa al traducir segun el tipo de sus operandos y la conversión de su destino, por lo que la
+    ejecución no decodifica direcciones ni recorre segmentos.
+    Tiene la misma semántica que VM con MemoryBackend.LIST, que es la única memoria que acepta.
+
+    El estado de la ejecución vive en la memoria y los frames de VM: run copia la memoria global y los frames a los
+    registros al empezar y los regresa al terminar, de modo que los snapshots, los limites y los perfiladores (que
+    ejecutan el programa con VM) continuan la misma ejecución. Las funciones puras se memoizan con las mismas
+    caches que VM (memo_caches).
+
+    Atributos:
+        layouts:            RegisterLayout de cada función.
+        global_pool:        Lista plana con las variables globales.
+        global_offsets:     Indice inicial de cada partición global en global_pool.
+        owners:             Función a la que pertenece cada cuadruplo (ver function_of_quads).
+        register_program:   Programa traducido, lista de tuplas (handler, A, B, C).
+        load_registers:     Función sin argumentos que copia el estado de VM a los registros y regresa el IP.
+        save_registers:     Función que recibe el IP y copia los registros al estado de VM.
+    """
+
+    def __init__(self, quad_list, const_table, fun_dir, **kwargs):
+        memory_backend = kwargs.get('memory_backend', MemoryBackend.LIST)
+        if memory_backend != MemoryBackend.LIST:
+            raise ValueError('RegisterVM only supports MemoryBackend.LIST, got ' + str(memory_backend))
+        kwargs['superinstructions'] = False
+        super().__init__(quad_list, const_table, fun_dir, **kwargs)
+        self.layouts = {name: RegisterLayout(fun.local_partition_sizes, fun.temp_partition_sizes)
+                        for name, fun in fun_dir.items() if fun.local_partition_sizes is not None}
+        global_sizes = [len(partition) for partition in self.global_memory.partitions]
+        self.global_offsets = [sum(global_sizes[:partition]) for partition in range(4)]
+        self.global_pool = [None] * sum(global_sizes)
+        self.owners = function_of_quads(quad_list, fun_dir)
+        self.register_program = None
+        self.load_registers = None
+        self.save_registers = None
+        self.translate()
+
+    def layout_at(self, IP):
+        """
+        :param IP: Indice de la siguiente instrucción de un frame (o su dirección de regreso).
+        :return: RegisterLayout de la función del frame. El GOTO inicial y el final del programa son de main.
+        """
+        owner = self.owners[IP] if IP < len(self.owners) else None
+        return self.layouts[owner or 'main']
+
+    @staticmethod
+    def frame_registers(frame):
+        """
+        :param frame: Frame de VM.
+        :return: Registros con la memoria local y temporal del frame, en el orden de RegisterLayout.
+        """
+        registers = []
+        for partition in frame.local_memory.partitions + frame.temp_memory.partitions:
+            registers.extend(partition)
+        return registers
+
+    def registers_frame(self, IP, registers, layout):
+        """
+        :param IP: IP del frame.
+        :param registers: Registros de una función.
+        :param layout: RegisterLayout de la función.
+        :return: Frame de VM con la memoria local y temporal copiada de los registros.
+        """
+        frame = Frame(IP=IP,
+                      local_memory=self.address_block(LOCAL_ADDRESS_RANGE[0], LOCAL_ADDRESS_RANGE[1],
+                                                      *layout.sizes[LOCAL_SEGMENT]),
+                      temp_memory=self.address_block(TEMP_ADDRESS_RANGE[0], TEMP_ADDRESS_RANGE[1],
+                                                     *layout.sizes[TEMP_SEGMENT]))
+        for segment, block in ((LOCAL_SEGMENT, frame.local_memory), (TEMP_SEGMENT, frame.temp_memory)):
+            for partition, offset in enumerate(layout.offsets[segment]):
+                block.partitions[partition][:] = registers[offset:offset + layout.sizes[segment][partition]]
+        return frame
+
+    def operand(self, addr, layout):
+        """
+        Traduce una dirección virtual a un operando del programa de registros.
+
+        :param addr: Dirección (absoluta).
+        :param layout: RegisterLayout de la función que ejecuta la instrucción.
+        :return: Tupla (tipo de operando, registro, indice global o valor inmediato, partición). Los handlers
+                 genericos reciben los dos primeros elementos.
+        """
+        segment, partition, index = decode_address(addr)
+        if segment == CONST_SEGMENT:
+            return IMMEDIATE, self.const_pool.partitions[partition][index], partition
+        if segment == GLOBAL_SEGMENT:
+            return GLOBAL, self.global_offsets[partition] + index, partition
+        if segment in (LOCAL_SEGMENT, TEMP_SEGMENT):
+            return REGISTER, layout.register(segment, partition, index), partition
+        raise Exception('RegisterVM does not support pointer operands (address ' + str(addr) + ')')
+
+    def translate(self):
+        """
+        Traduce la lista de cuadruplos al programa de registros y crea los handlers. Los registros del frame
+        actual, los del frame que prepara ERA y el stack de llamadas son variables compartidas por las closures de
+        los handlers, de modo que cambiar de frame solo reasigna una variable.
+        """
+        glob = self.global_pool
+        output = self.output.write
+        stack = []
+        regs = []
+        next_regs = None
+        next_name = None
+
+        def load_registers():
+            nonlocal regs, next_regs, next_name
+            del glob[:]
+            for partition in self.global_memory.partitions:
+                glob.extend(partition)
+            frames = self.execution_stack
+            stack[:] = [(frame.IP, self.frame_registers(frame)) for frame in frames[:-1]]
+            regs = self.frame_registers(frames[-1])
+            next_regs = next_name = None
+            if self.next_frame is not None:
+                next_regs = self.frame_registers(self.next_frame)
+                next_name = self.owners[self.next_frame.IP]
+            return frames[-1].IP
+        self.load_registers = load_registers
+
+        def save_registers(IP):
+            for partition, values in enumerate(self.global_memory.partitions):
+                offset = self.global_offsets[partition]
+                values[:] = glob[offset:offset + len(values)]
+            frames = [self.registers_frame(return_IP, registers, self.layout_at(return_IP))
+                      for return_IP, registers in stack]
+            frames.append(self.registers_frame(IP, regs, self.layout_at(IP)))
+            self.execution_stack[:] = frames
+            self.next_frame = None
+            if next_regs is not None:
+                self.next_frame = self.registers_frame(self.fun_start[next_name], next_regs, self.layouts[next_name])
+            self.bind_frame(self.get_current_frame())
+        self.save_registers = save_registers
+
+        def load(operand):
+            kind, value = operand
+            if kind == REGISTER:
+                return regs[value]
+            if kind == GLOBAL:
+                return glob[value]
+            return value
+
+        def store(operand, value):
+            kind, index = operand
+            if kind == REGISTER:
+                regs[index] = value
+            else:
+                glob[index] = value
+
+        def convert_int(value):
+            return int(value)
+
+        def convert_float(value):
+            return float(value)
+
+        def identity(value):
+            return value
+
+        def binary(operation, kind_a, kind_b, kind_c):
+            if kind_c == REGISTER and kind_a == REGISTER and kind_b == REGISTER:
+                def handler(A, B, C, IP):
+                    regs[C] = operation(regs[A], regs[B])
+                    return IP + 1
+            elif kind_c == REGISTER and kind_a == REGISTER and kind_b == IMMEDIATE:
+                def handler(A, B, C, IP):
+                    regs[C] = operation(regs[A], B)
+                    return IP + 1
+            elif kind_c == REGISTER and kind_a == IMMEDIATE and kind_b == REGISTER:
+                def handler(A, B, C, IP):
+                    regs[C] = operation(A, regs[B])
+                    return IP + 1
+            else:
+                def handler(A, B, C, IP):
+                    store(C, operation(load(A), load(B)))
+                    return IP + 1
+            return handler
+
+        def assign(kind_a, kind_c, convert):
+            if kind_c == REGISTER and kind_a == IMMEDIATE:
+                def handler(A, B, C, IP):
+                    regs[C] = A
+                    return IP + 1
+            elif kind_c == REGISTER and kind_a == REGISTER and convert is identity:
+                def handler(A, B, C, IP):
+                    regs[C] = regs[A]
+                    return IP + 1
+            elif kind_c == REGISTER and kind_a == REGISTER and convert is convert_int:
+                def handler(A, B, C, IP):
+                    regs[C] = int(regs[A])
+                    return IP + 1
+            elif kind_c == REGISTER and kind_a == REGISTER and convert is convert_float:
+                def handler(A, B, C, IP):
+                    regs[C] = float(regs[A])
+                    return IP + 1
+            else:
+                def handler(A, B, C, IP):
+                    store(C, convert(load(A)))
+                    return IP + 1
+            return handler
+
+        def read_input(A, B, C, IP):
+            store(C, self.read_input(B))
+            return IP + 1
+
+        def write_output(A, B, C, IP):
+            output(load(C))
+            return IP + 1
+
+        def goto(A, B, C, IP):
+            return C
+
+        def gotof_register(A, B, C, IP):
+            return IP + 1 if regs[A] else C
+
+        def gotof(A, B, C, IP):
+            return IP + 1 if load(A) else C
+
+        def gotot(A, B, C, IP):
+            return C if load(A) else IP + 1
+
+        def era(A, B, C, IP):
+            nonlocal next_regs, next_name
+            next_regs = [None] * A
+            next_name = C
+            return IP + 1
+
+        def parameter(A, B, C, IP):
+            next_regs[C] = load(A)
+            return IP + 1
+
+        def gosub(A, B, C, IP):
+            nonlocal regs, next_regs
+            stack.append((IP + 1, regs))
+            regs = next_regs
+            next_regs = None
+            return C
+
+        def endfun(A, B, C, IP):
+            nonlocal regs
+            IP, regs = stack.pop()
+            return IP
+
+        # Parametros y variable de regreso de cada función memoizada como operandos de registros. Las llamadas
+        # pendientes se guardan en memo_pending con la misma profundidad que en VM (número de frames en ejecución
+        # contando el de main), así que pasan de una ejecución a otra al copiar el estado.
+        memo = {name: (cache, [self.layouts[name].register(LOCAL_SEGMENT, partition, index)
+                               for partition, index in cache.params],
+                       self.operand(self.fun_dir[name].return_addr, self.layouts[name])[:2])
+                for name, cache in self.memo_caches.items()}
+        returns = {cache: result for cache, _, result in memo.values()}
+
+        def gosub_memoized(A, B, C, IP):
+            nonlocal next_regs
+            entry = memo.get(A)
+            if entry is not None:
+                cache, params, result = entry
+                key = tuple([next_regs[register] for register in params])
+                value = cache.get(key)
+                if value is not MISSING:
+                    next_regs = None
+                    store(result, value)
+                    return IP + 1
+                self.memo_pending.append((len(stack) + 2, cache, key))
+            return gosub(A, B, C, IP)
+
+        def endfun_memoized(A, B, C, IP):
+            pending = self.memo_pending
+            if pending and pending[-1][0] == len(stack) + 1:
+                _, cache, key = pending.pop()
+                cache.put(key, load(returns[cache]))
+            return endfun(A, B, C, IP)
+
+        def verify_register(A, B, C, IP):
+            try:
+                index = int(regs[A])
+            except:
+                raise TypeError("Index is not an integer")
+            if not B <= index < C:
+                raise Exception("Index out of bounds")
+            return IP + 1
+
+        def verify(A, B, C, IP):
+            try:
+                index = int(load(A))
+            except:
+                raise TypeError("Index is not an integer")
+            if not load(B) <= index < load(C):
+                raise Exception("Index out of bounds")
+            return IP + 1
+
+        def load_indexed(kind_a, kind_b, kind_c):
+            if kind_c == REGISTER and kind_a == REGISTER and kind_b == REGISTER:
+                def handler(A, B, C, IP):
+                    regs[C] = regs[A + regs[B]]
+                    return IP + 1
+            elif kind_c == REGISTER and kind_a == GLOBAL and kind_b == REGISTER:
+                def handler(A, B, C, IP):
+                    regs[C] = glob[A + regs[B]]
+                    return IP + 1
+            else:
+                def handler(A, B, C, IP):
+                    store(C, (regs if A[0] == REGISTER else glob)[A[1] + load(B)])
+                    return IP + 1
+            return handler
+
+        def store_indexed(convert):
+            def handler(A, B, C, IP):
+                (regs if C[0] == REGISTER else glob)[C[1] + load(B)] = convert(load(A))
+                return IP + 1
+            return handler
+
+        def skip(A, B, C, IP):
+            return IP + 1
+
+        def conversion(partition):
+            return convert_int if partition == INT_PARTITION else convert_float if partition == FLOAT_PARTITION \
+                else identity
+
+        owners = self.owners
+        program = []
+        callee = None
+        for i, quad in enumerate(self.quad_list):
+            operator = quad.operator
+            layout = self.layouts.get(owners[i])
+            A, B, C = quad.left_operand, quad.right_operand, quad.result
+            # Las direcciones de escritura en constantes ya se rechazaron al decodificar el programa en VM.
+            if operator in BINARY_OPERATIONS:
+                a, b, c = (self.operand(addr, layout) for addr in (A, B, C))
+                if c[0] == REGISTER and (a[0], b[0]) in ((REGISTER, REGISTER), (REGISTER, IMMEDIATE),
+                                                         (IMMEDIATE, REGISTER)):
+                    operands = a[1], b[1], c[1]
+                else:
+                    operands = a[:2], b[:2], c[:2]
+                program.append((binary(BINARY_OPERATIONS[operator], a[0], b[0], c[0]), *operands))
+            elif operator == Operator.ASSIGN:
+                a, c = self.operand(A, layout), self.operand(C, layout)
+                convert = conversion(c[2])
+                handler = assign(a[0], c[0], convert)
+                if c[0] == REGISTER and a[0] == IMMEDIATE:
+                    program.append((handler, convert(a[1]), None, c[1]))
+                elif c[0] == REGISTER and a[0] == REGISTER:
+                    program.append((handler, a[1], None, c[1]))
+                else:
+                    program.append((handler, a[:2], None, c[:2]))
+            elif operator == Operator.READ:
+                c = self.operand(C, layout)
+                program.append((read_input, None, PARTITION_TYPES[c[2]], c[:2]))
+            elif operator == Operator.WRITE:
+                program.append((write_output, None, None, self.operand(C, layout)[:2]))
+            elif operator == Operator.GOTO:
+                program.append((goto, None, None, C))
+            elif operator == Operator.GOTOF:
+                a = self.operand(A, layout)
+                if a[0] == REGISTER:
+                    program.append((gotof_register, a[1], None, C))
+                else:
+                    program.append((gotof, a[:2], None, C))
+            elif operator == Operator.GOTOT:
+                program.append((gotot, self.operand(A, layout)[:2], None, C))
+            elif operator == Operator.ERA:
+                callee = self.layouts[C]
+                program.append((era, callee.size, None, C))
+            elif operator == Operator.PARAMETER:
+                # El parametro es un registro del frame que prepara el ERA anterior.
+                program.append((parameter, self.operand(A, layout)[:2], None, self.operand(C, callee)[1]))
+            elif operator == Operator.GOSUB:
+                program.append((gosub_memoized if memo else gosub, A, None, self.fun_dir[A].start_addr))
+            elif operator == Operator.ENDFUN:
+                program.append((endfun_memoized if memo else endfun, None, None, None))
+            elif operator == Operator.VERIFY:
+                a, b, c = (self.operand(addr, layout) for addr in (A, B, C))
+                if a[0] == REGISTER and b[0] == IMMEDIATE and c[0] == IMMEDIATE:
+                    program.append((verify_register, a[1], b[1], c[1]))
+                else:
+                    program.append((verify, a[:2], b[:2], c[:2]))
+            elif operator == Operator.LOADIDX:
+                a, b, c = (self.operand(addr, layout) for addr in (A, B, C))
+                if c[0] == REGISTER and b[0] == REGISTER and a[0] in (REGISTER, GLOBAL):
+                    operands = a[1], b[1], c[1]
+                else:
+                    operands = a[:2], b[:2], c[:2]
+                program.append((load_indexed(a[0], b[0], c[0]), *operands))
+            elif operator == Operator.STOREIDX:
+                a, b, c = (self.operand(addr, layout) for addr in (A, B, C))
+                program.append((store_indexed(conversion(c[2])), a[:2], b[:2], c[:2]))
+            elif operator in (Operator.VECTOR, Operator.MATMUL, Operator.FILL, Operator.COPYBLOCK):
+                # Los registros son listas de Python, así que siempre se ejecutan los ciclos escalares.
+                program.append((skip, None, None, None))
+            else:
+                raise Exception('Operator ' + str(operator) + ' cannot be translated to registers')
+        self.register_program = program
+
+    def run(self, profiler=None, limits=None, trace=None):
+        """
+        Ejecuta el programa de registros a partir del estado de VM, y al terminar (o al detenerse por un error)
+        regresa el estado a VM.
+
+        :param profiler: Instancia opcional de Profiler.
+        :param limits: Instancia opcional de ExecutionLimits.
+        :param trace: Instancia opcional de TraceBuffer.
+        Los perfiles, los limites y el trace se miden sobre el programa de cuadruplos, así que en esos casos se
+        ejecuta el programa con la tabla de despacho de VM.
+        """
+        if profiler is not None or limits is not None or trace is not None or DEBUG_VM:
+            return super().run(profiler, limits, trace)
+        program = self.register_program
+        end = len(program)
+        IP = self.load_registers()
+        try:
+            while IP < end:
+                handler, A, B, C = program[IP]
+                IP = handler(A, B, C, IP)
+        finally:
+            self.save_registers(IP)
+            self.output.flush()
+            self.input_source.close()
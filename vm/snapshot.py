@@ -0,0 +1,229 @@
+import hashlib
+import marshal
+import mmap
+import struct
+from array import array
+from vm.memory import CallStack, FrameLayout, PointerPartition, POINTER_SEGMENT, INT_PARTITION, \
+    FLOAT_PARTITION, CHAR_PARTITION, BOOL_PARTITION
+from vm.vm import Frame, WindowFrame
+from common.scope_size import LOCAL_ADDRESS_RANGE, TEMP_ADDRESS_RANGE
+
+"""
+Formato del archivo: MAGIC, la longitud del encabezado (entero de 8 bytes), el encabezado serializado con marshal
+y a continuación los datos de los arreglos tipados, cada uno alineado a 8 bytes. El encabezado describe el estado
+de la VM y la posición de cada arreglo dentro del archivo.
+"""
+MAGIC = b'DALESNAP'
+VERSION = 2
+HEADER_LENGTH = struct.Struct('<Q')
+ALIGNMENT = 8
+
+"""
+Typecode con el que se escriben las particiones int y float de las listas de Python (MemoryBackend.LIST).
+Las direcciones de la memoria de apuntadores son enteras en todas sus particiones.
+"""
+LIST_TYPECODES = {INT_PARTITION: 'q', FLOAT_PARTITION: 'd'}
+POINTER_TYPECODES = {INT_PARTITION: 'q', FLOAT_PARTITION: 'q', CHAR_PARTITION: 'q', BOOL_PARTITION: 'q'}
+LIST_VALUE_TYPES = {'q': int, 'd': float}
+
+
+def program_fingerprint(vm):
+    """
+    Calcula un hash del programa decodificado. Un snapshot solo se puede restaurar en una VM con el mismo programa,
+    ya que los IP de los frames son indices de vm.program.
+    """
+    return hashlib.sha256(marshal.dumps(vm.program)).hexdigest()
+
+
+class SnapshotWriter:
+    """
+    Acumula los arreglos tipados que se van a escribir en el archivo y genera el descriptor de cada partición.
+
+    Atributos:
+        chunks:     Datos de los arreglos, en el orden en que se escriben.
+        offset:     Posición de los siguientes datos, relativa al inicio de la sección de datos.
+    """
+
+    def __init__(self):
+        self.chunks = []
+        self.offset = 0
+
+    def add_buffer(self, buffer):
+        """
+        Agrega los datos de un arreglo tipado (array, bytearray o memoryview).
+
+        :return: Descriptor ('raw', typecode, offset, longitud).
+        """
+        data = bytes(buffer) if type(buffer) != array else buffer.tobytes()
+        typecode = buffer.typecode if type(buffer) == array else memoryview(buffer).format
+        descriptor = ('raw', typecode, self.offset, len(buffer))
+        padding = -len(data) % ALIGNMENT
+        self.chunks.append(data + bytes(padding))
+        self.offset += len(data) + padding
+        return descriptor
+
+    def add_list(self, partition, typecode):
+        """
+        Agrega los datos de una lista de Python como un arreglo tipado y, si tiene valores sin asignar (None), una
+        mascara con un byte por elemento (0 si el elemento es None).
+
+        :return: Descriptor ('list', descriptor del arreglo, descriptor de la mascara o None), u ('obj', lista) si
+                 algún valor no es del tipo de la partición o no cabe en 64 bits.
+        """
+        value_type = LIST_VALUE_TYPES[typecode]
+        if any(value is not None and type(value) != value_type for value in partition):
+            return 'obj', list(partition)
+        try:
+            values = array(typecode, [value_type() if value is None else value for value in partition])
+        except OverflowError:
+            return 'obj', list(partition)
+        mask = None
+        if None in partition:
+            mask = self.add_buffer(bytearray(value is not None for value in partition))
+        return 'list', self.add_buffer(values), mask
+
+    def add_partition(self, partition, typecode=None):
+        """
+        Genera el descriptor de una partición. Las listas int y float se guardan como arreglos tipados (ver
+        add_list); el resto de las listas de objetos de Python se guardan en el encabezado.
+
+        :param typecode: Typecode con el que se guarda la partición si es una lista, o None.
+        :return: Descriptor ('raw', ...), ('list', ...) u ('obj', lista).
+        """
+        if type(partition) in (array, bytearray, memoryview):
+            return self.add_buffer(partition)
+        if type(partition) == list and typecode is not None:
+            return self.add_list(partition, typecode)
+        return 'obj', list(partition)
+
+    def add_block(self, block, typecodes=LIST_TYPECODES):
+        return [self.add_partition(partition, typecodes.get(p)) for p, partition in enumerate(block.partitions)]
+
+
+def save_snapshot(vm, path):
+    """
+    Guarda el estado completo de la VM en un archivo binario: memoria global y de apuntadores, los frames del
+    stack de ejecución, el frame pendiente (next_frame) con su IP y, con MemoryBackend.WINDOW, el CallStack.
+    La salida pendiente se escribe antes de guardar; la fuente de entrada no forma parte del snapshot.
+    Con MemoryBackend.LIST las particiones int y float y las direcciones de apuntadores se escriben como arreglos
+    tipados, igual que con la memoria tipada, pero al restaurar se vuelven a convertir en listas.
+
+    :param vm: La VM a guardar.
+    :param path: Ruta del archivo.
+    """
+    vm.output.flush()
+    writer = SnapshotWriter()
+
+    def frame_state(frame):
+        if frame is None:
+            return None
+        if type(frame) == WindowFrame:
+            return {'IP': frame.IP, 'bases': tuple(frame.bases), 'local_sizes': list(frame.layout.local_sizes),
+                    'temp_sizes': list(frame.layout.temp_sizes), 'local_chars': list(frame.local_chars),
+                    'temp_chars': list(frame.temp_chars)}
+        return {'IP': frame.IP, 'local': writer.add_block(frame.local_memory),
+                'temp': writer.add_block(frame.temp_memory)}
+
+    call_stack = None
+    if vm.call_stack is not None:
+        call_stack = {'tops': tuple(vm.call_stack.tops), 'peak': list(vm.call_stack.peak),
+                      'buffers': [None if buffer is None else writer.add_buffer(buffer[:vm.call_stack.tops[p]])
+                                  for p, buffer in enumerate(vm.call_stack.buffers)]}
+    header = {
+        'version': VERSION,
+        'fingerprint': program_fingerprint(vm),
+        'window': vm.call_stack is not None,
+        'global': writer.add_block(vm.global_memory),
+        'pointer': writer.add_block(vm.pointer_memory, POINTER_TYPECODES),
+        'frames': [frame_state(frame) for frame in vm.execution_stack],
+        'next_frame': frame_state(vm.next_frame),
+        'call_stack': call_stack,
+    }
+    encoded = marshal.dumps(header)
+    padding = -(len(MAGIC) + HEADER_LENGTH.size + len(encoded)) % ALIGNMENT
+    with open(path, 'wb') as snapshot_file:
+        snapshot_file.write(MAGIC)
+        snapshot_file.write(HEADER_LENGTH.pack(len(encoded)))
+        snapshot_file.write(encoded + bytes(padding))
+        for chunk in writer.chunks:
+            snapshot_file.write(chunk)
+
+
+def restore_snapshot(vm, path):
+    """
+    Restaura en la VM el estado guardado por save_snapshot. La VM debe haberse creado con el mismo programa y la
+    misma configuración (superinstrucciones y memoria). El archivo se mapea en memoria con copia en escritura: las
+    particiones tipadas de la memoria global, de apuntadores y de los frames son vistas sobre el archivo, por lo
+    que no se copian al restaurar y los cambios de la ejecución no modifican el archivo.
+    La parte ocupada de los buffers del CallStack se copia, ya que deben poder crecer. Con MemoryBackend.LIST las
+    particiones son listas de objetos de Python, así que se reconstruyen (se copian) a partir de sus arreglos en
+    el archivo.
+
+    :param vm: La VM donde se restaura el estado.
+    :param path: Ruta del archivo.
+    """
+    with open(path, 'rb') as snapshot_file:
+        mapped = mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_COPY)
+    if mapped[:len(MAGIC)] != MAGIC:
+        raise ValueError('Not a VM snapshot file')
+    start = len(MAGIC) + HEADER_LENGTH.size
+    (length,) = HEADER_LENGTH.unpack(mapped[len(MAGIC):start])
+    header = marshal.loads(mapped[start:start + length])
+    if header['version'] != VERSION:
+        raise ValueError('Unsupported snapshot version ' + str(header['version']))
+    if header['fingerprint'] != program_fingerprint(vm):
+        raise ValueError('The snapshot was taken from a different program')
+    if header['window'] != (vm.call_stack is not None):
+        raise ValueError('The snapshot was taken with a different memory backend')
+    data = memoryview(mapped)[start + length + -(len(MAGIC) + HEADER_LENGTH.size + length) % ALIGNMENT:]
+
+    def load_partition(descriptor):
+        if descriptor[0] == 'obj':
+            return descriptor[1]
+        if descriptor[0] == 'list':
+            values = load_partition(descriptor[1]).tolist()
+            if descriptor[2] is not None:
+                values = [value if valid else None for value, valid in zip(values, load_partition(descriptor[2]))]
+            return values
+        _, typecode, offset, count = descriptor
+        view = data[offset:offset + count * (8 if typecode in ('q', 'd') else 1)]
+        return view.cast(typecode) if typecode in ('q', 'd') else view
+
+    def load_block(start_addr, end_addr, descriptors):
+        block = vm.address_block(start_addr, end_addr, 0, 0, 0, 0)
+        block.set_partitions([load_partition(descriptor) for descriptor in descriptors])
+        return block
+
+    def load_frame(state):
+        if state is None:
+            return None
+        if 'bases' in state:
+            frame = WindowFrame(state['IP'], state['bases'], FrameLayout(state['local_sizes'], state['temp_sizes']))
+            frame.local_chars = state['local_chars'] or ()
+            frame.temp_chars = state['temp_chars'] or ()
+            return frame
+        return Frame(IP=state['IP'],
+                     local_memory=load_block(LOCAL_ADDRESS_RANGE[0], LOCAL_ADDRESS_RANGE[1], state['local']),
+                     temp_memory=load_block(TEMP_ADDRESS_RANGE[0], TEMP_ADDRESS_RANGE[1], state['temp']))
+
+    if header['call_stack'] is not None:
+        call_stack = CallStack()
+        tops = tuple(header['call_stack']['tops'])
+        call_stack.grow(tops)
+        for p, descriptor in enumerate(header['call_stack']['buffers']):
+            if descriptor is not None:
+                call_stack.base_views[p][:tops[p]] = load_partition(descriptor)
+        call_stack.tops = tops
+        call_stack.peak = list(header['call_stack']['peak'])
+        vm.call_stack = call_stack
+
+    vm.global_memory.set_partitions([load_partition(descriptor) for descriptor in header['global']])
+    vm.pointer_memory.set_partitions([load_partition(descriptor) for descriptor in header['pointer']])
+    vm.segments[POINTER_SEGMENT][:] = [PointerPartition(slots, vm.segments) for slots in vm.pointer_memory.partitions]
+    vm.execution_stack[:] = [load_frame(state) for state in header['frames']]
+    vm.next_frame = load_frame(header['next_frame'])
+    if vm.next_frame is not None and vm.call_stack is not None:
+        vm.open_window(vm.next_frame)
+    vm.snapshot_map = mapped
+    vm.bind_frame(vm.get_current_frame())
+    vm.state_restored()
@@ -0,0 +1,311 @@
+import asyncio
+import sys
+from compiler.symbol_table import VarType
+from common.vm_options import VM_OUTPUT_BUFFER
+
+"""
+Canales de entrada y salida de la VM.
+La instrucción WRITE escribe cada valor en el canal de salida de la VM, que decide cuando y donde se escribe el
+texto. Todos los canales de salida implementan write(value) y flush().
+La instrucción READ obtiene cada valor de la fuente de entrada de la VM y lo convierte al tipo de la variable
+destino. Todas las fuentes implementan read(var_type), que regresa el valor sin convertir, y close().
+Los canales y fuentes asincronos (para AsyncVM, ver vm/cooperative.py) además implementan drain() y su read es
+una corrutina, respectivamente.
+"""
+
+
+class BufferedSink:
+    """
+    Canal de salida que acumula los valores escritos y los escribe en el stream de una sola vez cuando el texto
+    acumulado alcanza el umbral, antes de cada READ y al terminar la ejecución.
+
+    Atributos:
+        stream:     Stream de salida. Si es None se utiliza el sys.stdout vigente al momento de escribir.
+        threshold:  Número de caracteres acumulados a partir del cual se escribe el buffer.
+        parts:      Textos escritos desde la última escritura al stream.
+        size:       Número de caracteres en parts.
+    """
+
+    def __init__(self, stream=None, threshold=VM_OUTPUT_BUFFER):
+        self.stream = stream
+        self.threshold = threshold
+        self.parts = []
+        self.size = 0
+
+    def write(self, value):
+        """
+        Agrega un valor al buffer.
+
+        :param value: Valor a escribir.
+        """
+        text = value if type(value) == str else str(value)
+        self.parts.append(text)
+        self.size += len(text)
+        if self.size >= self.threshold:
+            self.flush()
+
+    def flush(self):
+        """
+        Escribe en el stream el texto acumulado.
+        """
+        if self.parts:
+            stream = self.stream or sys.stdout
+            stream.write(''.join(self.parts))
+            stream.flush()
+            self.parts = []
+            self.size = 0
+
+
+class StreamSink:
+    """
+    Canal de salida sin buffer que escribe cada valor directamente en un stream (por ejemplo un io.StringIO).
+
+    Atributos:
+        stream:     Stream de salida.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, value):
+        self.stream.write(value if type(value) == str else str(value))
+
+    def flush(self):
+        self.stream.flush()
+
+
+class ListSink:
+    """
+    Canal de salida que guarda los valores escritos en una lista, para utilizar la VM desde otro programa.
+
+    Atributos:
+        values:     Valores escritos, sin convertir a texto.
+    """
+
+    def __init__(self):
+        self.values = []
+
+    def write(self, value):
+        self.values.append(value)
+
+    def flush(self):
+        pass
+
+    def getvalue(self):
+        """
+        :return: El texto que se hubiera escrito en pantalla.
+        """
+        return ''.join(str(value) for value in self.values)
+
+
+def parse_input(value, var_type):
+    """
+    Convierte un valor de entrada al tipo de la variable donde se guardara.
+
+    :param value: Valor leido de la fuente de entrada.
+    :param var_type: Tipo de dato de la partición destino, instancia de VarType.
+    :return: El valor convertido.
+    """
+    if var_type == VarType.INT:
+        try:
+            return int(value)
+        except:
+            raise TypeError("Can not cast input to int")
+    elif var_type == VarType.FLOAT:
+        try:
+            return float(value)
+        except:
+            raise TypeError("Can not cast input to float")
+    elif var_type == VarType.CHAR:
+        try:
+            return str(value)
+        except:
+            raise TypeError("Can not cast input to char")
+    elif var_type == VarType.BOOL:
+        try:
+            return bool(value)
+        except:
+            raise TypeError("Can not cast input to bool")
+    return value
+
+
+class PromptSource:
+    """
+    Fuente de entrada interactiva: pide cada valor al usuario con input() mostrando el tipo esperado.
+    """
+
+    def read(self, var_type):
+        return input(f'READ {var_type.value}: ')
+
+    def close(self):
+        pass
+
+
+class IteratorSource:
+    """
+    Fuente de entrada no interactiva que toma los valores de un iterable, sin mostrar ningún mensaje.
+
+    Atributos:
+        values:     Iterador con los valores restantes.
+    """
+
+    def __init__(self, values):
+        self.values = iter(values)
+
+    @classmethod
+    def from_text(cls, text):
+        """
+        Crea una fuente con un valor por cada línea del texto.
+        """
+        return cls(text.splitlines())
+
+    @classmethod
+    def from_file(cls, path):
+        """
+        Crea una fuente con un valor por cada línea de un archivo, leido completo al crear la fuente.
+        """
+        with open(path, 'r') as input_file:
+            return cls.from_text(input_file.read())
+
+    @classmethod
+    def from_stdin(cls):
+        """
+        Crea una fuente con un valor por cada línea de la entrada estandar, leida completa de una sola vez.
+        """
+        return cls.from_text(sys.stdin.read())
+
+    def read(self, var_type):
+        try:
+            return next(self.values)
+        except StopIteration:
+            raise EOFError('There are no more input values for READ')
+
+    def close(self):
+        pass
+
+
+class RecordingSource:
+    """
+    Fuente de entrada que guarda en un archivo los valores que consume de otra fuente, un valor por línea, para
+    repetir la ejecución despues con IteratorSource.from_file.
+
+    Atributos:
+        source:     Fuente de entrada de la que se leen los valores.
+        path:       Archivo donde se guardan los valores.
+        values:     Valores consumidos durante la ejecución.
+    """
+
+    def __init__(self, source, path):
+        self.source = source
+        self.path = path
+        self.values = []
+
+    def read(self, var_type):
+        value = self.source.read(var_type)
+        self.values.append(value)
+        return value
+
+    def close(self):
+        """
+        Guarda los valores consumidos en el archivo.
+        """
+        self.source.close()
+        with open(self.path, 'w') as record_file:
+            record_file.writelines(f'{value}\n' for value in self.values)
+
+
+class AsyncQueueSource:
+    """
+    Fuente de entrada asincrona: cada READ espera el siguiente valor de una asyncio.Queue, por lo que la sesión
+    cede el event loop mientras no hay valores. Un None en la cola indica el fin de la entrada.
+
+    Atributos:
+        queue:      Cola de la que se leen los valores.
+    """
+
+    def __init__(self, queue=None):
+        self.queue = queue if queue is not None else asyncio.Queue()
+
+    async def read(self, var_type):
+        value = await self.queue.get()
+        if value is None:
+            raise EOFError('There are no more input values for READ')
+        return value
+
+    def close(self):
+        pass
+
+
+class AsyncStreamSource:
+    """
+    Fuente de entrada asincrona que lee un valor por línea de un asyncio.StreamReader (por ejemplo un socket o
+    la salida de un proceso hijo).
+
+    Atributos:
+        reader:     StreamReader del que se leen las líneas.
+    """
+
+    def __init__(self, reader):
+        self.reader = reader
+
+    async def read(self, var_type):
+        line = await self.reader.readline()
+        if not line:
+            raise EOFError('There are no more input values for READ')
+        return line.decode().rstrip('\r\n')
+
+    def close(self):
+        pass
+
+
+class AsyncQueueSink:
+    """
+    Canal de salida asincrono que acumula los valores escritos y pone el texto acumulado en una asyncio.Queue al
+    vaciarse (cada vez que la VM cede el event loop, antes de cada READ y al terminar).
+
+    Atributos:
+        queue:      Cola donde se ponen los textos.
+        parts:      Textos escritos desde el último vaciado.
+    """
+
+    def __init__(self, queue=None):
+        self.queue = queue if queue is not None else asyncio.Queue()
+        self.parts = []
+
+    def write(self, value):
+        self.parts.append(value if type(value) == str else str(value))
+
+    def flush(self):
+        if self.parts:
+            self.queue.put_nowait(''.join(self.parts))
+            self.parts = []
+
+    async def drain(self):
+        self.flush()
+
+
+class AsyncStreamSink:
+    """
+    Canal de salida asincrono que escribe el texto acumulado en un asyncio.StreamWriter y espera a que se envie,
+    de modo que una sesión con un cliente lento no acumula salida sin limite.
+
+    Atributos:
+        writer:     StreamWriter donde se escribe el texto.
+        parts:      Textos escritos desde el último vaciado.
+    """
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.parts = []
+
+    def write(self, value):
+        self.parts.append(value if type(value) == str else str(value))
+
+    def flush(self):
+        if self.parts:
+            self.writer.write(''.join(self.parts).encode())
+            self.parts = []
+
+    async def drain(self):
+        self.flush()
+        await self.writer.drain()
@@ -0,0 +1,230 @@
+from enum import Enum
+from compiler.quadruple import Operator
+from vm.memory import INT_PARTITION, FLOAT_PARTITION
+
+
+class Superinstruction(Enum):
+    """
+    Superinstrucciones que reemplazan secuencias regulares de cuadruplos generadas por el compilador.
+    """
+    COMPARE_GOTOF = 'compare_gotof'     # <, >, <=, >=, ==, != seguido del GOTOF que usa su resultado
+    BINARY_ASSIGN = 'binary_assign'     # Operación aritmetica seguida del ASSIGN de su resultado (incrementos)
+    INDEX_1D = 'index_1d'               # VERIFY y LOADIDX de la lectura de un arreglo de una dimensión
+    INDEX_2D = 'index_2d'               # VERIFY, TIMES, VERIFY, PLUS del desplazamiento de un elemento de matriz
+
+
+COMPARISONS = {Operator.LESSTHAN, Operator.GREATERTHAN, Operator.LESSTHANOREQ, Operator.GREATERTHANOREQ,
+               Operator.EQUAL, Operator.NOTEQUAL}
+ARITHMETIC = {Operator.PLUS, Operator.MINUS, Operator.TIMES, Operator.DIVIDE}
+
+
+def match_compare_gotof(quads, i):
+    """
+    Reconoce "T = A < B; GOTOF T" en la posición i.
+
+    :return: Número de cuadruplos fusionados, o 0 si no coincide.
+    """
+    if i + 1 < len(quads) and quads[i].operator in COMPARISONS and quads[i + 1].operator == Operator.GOTOF \
+            and quads[i + 1].left_operand == quads[i].result:
+        return 2
+    return 0
+
+
+def match_binary_assign(quads, i):
+    """
+    Reconoce "T = A + B; X = T" en la posición i.
+
+    :return: Número de cuadruplos fusionados, o 0 si no coincide.
+    """
+    if i + 1 < len(quads) and quads[i].operator in ARITHMETIC and quads[i + 1].operator == Operator.ASSIGN \
+            and quads[i + 1].left_operand == quads[i].result:
+        return 2
+    return 0
+
+
+def match_index_1d(quads, i):
+    """
+    Reconoce "VERIFY I; LOADIDX base I T" en la posición i.
+
+    :return: Número de cuadruplos fusionados, o 0 si no coincide.
+    """
+    if i + 1 < len(quads) and quads[i].operator == Operator.VERIFY and quads[i + 1].operator == Operator.LOADIDX \
+            and quads[i + 1].right_operand == quads[i].left_operand:
+        return 2
+    return 0
+
+
+def match_index_2d(quads, i):
+    """
+    Reconoce "VERIFY I; T1 = I * cols; VERIFY J; T2 = T1 + J" en la posición i.
+
+    :return: Número de cuadruplos fusionados, o 0 si no coincide.
+    """
+    if i + 3 >= len(quads):
+        return 0
+    verify_i, times, verify_j, plus = quads[i:i + 4]
+    if verify_i.operator == Operator.VERIFY and times.operator == Operator.TIMES \
+            and verify_j.operator == Operator.VERIFY and plus.operator == Operator.PLUS \
+            and times.left_operand == verify_i.left_operand and plus.left_operand == times.result \
+            and plus.right_operand == verify_j.left_operand:
+        return 4
+    return 0
+
+
+"""
+Patrones en orden de prioridad: se intenta primero el patrón más largo.
+"""
+PATTERNS = [
+    (Superinstruction.INDEX_2D, match_index_2d),
+    (Superinstruction.INDEX_1D, match_index_1d),
+    (Superinstruction.COMPARE_GOTOF, match_compare_gotof),
+    (Superinstruction.BINARY_ASSIGN, match_binary_assign),
+]
+
+
+def find_entry_points(quads, fun_dir):
+    """
+    Regresa los indices a los que se puede llegar sin pasar por el cuadruplo anterior: destinos de salto, inicio
+    de funciones y el regreso de cada GOSUB. Una secuencia solo se fusiona si ninguno de estos indices cae dentro
+    de ella.
+    """
+    entries = {0}
+    for fun in fun_dir.values():
+        if fun.start_addr is not None:
+            entries.add(fun.start_addr)
+    for i, quad in enumerate(quads):
+        if quad.operator in (Operator.GOTO, Operator.GOTOF, Operator.GOTOT, Operator.VECTOR, Operator.MATMUL,
+                             Operator.FILL, Operator.COPYBLOCK):
+            entries.add(quad.result)
+        elif quad.operator == Operator.GOSUB:
+            entries.add(i + 1)
+    return entries
+
+
+def fuse_superinstructions(quads, program, fun_dir, super_opcodes, jump_opcodes):
+    """
+    Reemplaza las secuencias reconocidas del programa decodificado por superinstrucciones y reasigna los destinos
+    de salto al nuevo programa.
+
+    :param quads: Lista de cuadruplos original.
+    :param program: Programa decodificado, con el mismo orden que quads.
+    :param fun_dir: Directorio de funciones.
+    :param super_opcodes: Diccionario que asocia cada Superinstruction con su opcode entero.
+    :param jump_opcodes: Opcodes cuyo operando C es un indice de cuadruplo (GOTO, GOTOF, GOTOT, VECTOR,
+                         MATMUL, FILL, COPYBLOCK).
+    :return: Tupla (programa, origen, estadisticas, index_map): el programa fusionado, el indice del cuadruplo
+             original de cada instrucción, un diccionario con cuantas veces se aplico cada superinstrucción y la
+             lista que asocia el indice de cada cuadruplo original con el de su instrucción en el nuevo programa.
+    """
+    entries = find_entry_points(quads, fun_dir)
+    fused = []
+    origin = []
+    index_map = [0] * (len(quads) + 1)
+    stats = {superinstruction: 0 for superinstruction in Superinstruction}
+    i = 0
+    while i < len(quads):
+        index_map[i] = len(fused)
+        for superinstruction, match in PATTERNS:
+            length = match(quads, i)
+            if length and not any(i + k in entries for k in range(1, length)):
+                fused.append(encode(superinstruction, super_opcodes[superinstruction], program[i:i + length]))
+                stats[superinstruction] += 1
+                break
+        else:
+            length = 1
+            fused.append(program[i])
+        origin.append(i)
+        i += length
+    index_map[len(quads)] = len(fused)
+
+    # Reasigna los destinos de salto al indice de la instrucción fusionada.
+    compare_gotof = super_opcodes[Superinstruction.COMPARE_GOTOF]
+    for k, (opcode, A, B, C) in enumerate(fused):
+        if opcode in jump_opcodes or opcode == compare_gotof:
+            fused[k] = (opcode, A, B, index_map[C])
+    return fused, origin, stats, index_map
+
+
+def encode(superinstruction, opcode, records):
+    """
+    Codifica una secuencia de instrucciones decodificadas como una sola tupla (opcode, A, B, C).
+
+    :param superinstruction: La superinstrucción a codificar.
+    :param opcode: Opcode entero de la superinstrucción.
+    :param records: Instrucciones decodificadas (opcode, A, B, C) de la secuencia.
+    :return: La instrucción fusionada.
+    """
+    if superinstruction == Superinstruction.COMPARE_GOTOF:
+        (compare, A, B, T), (_, _, _, target) = records
+        return opcode, (compare, A, B), T, target
+    elif superinstruction == Superinstruction.BINARY_ASSIGN:
+        (operation, A, B, T), (_, _, _, X) = records
+        return opcode, (operation, A, B), T, X
+    elif superinstruction == Superinstruction.INDEX_1D:
+        (_, I, low, high), (_, base, _, T) = records
+        return opcode, (I, low, high), base, T
+    else:
+        (_, I, low_i, high_i), (_, _, cols, T1), (_, J, low_j, high_j), (_, _, _, T2) = records
+        return opcode, (I, low_i, high_i, cols, T1), (J, low_j, high_j), T2
+
+
+def build_superinstruction_handlers(segments, operations):
+    """
+    Construye los handlers de las superinstrucciones, con la misma firma handler(A, B, C, IP) que los de
+    VM.build_dispatch_table. Los temporales intermedios se siguen escribiendo, por lo que la memoria queda igual
+    que al ejecutar los cuadruplos por separado.
+
+    :param segments: Segmentos de memoria de la VM.
+    :param operations: Lista que asocia el opcode entero de cada operador binario con su función.
+    :return: Diccionario que asocia cada Superinstruction con su handler.
+    """
+    def compare_gotof(A, B, C, IP):
+        compare, (sa, pa, ia), (sb, pb, ib) = A
+        value = operations[compare](segments[sa][pa][ia], segments[sb][pb][ib])
+        segments[B[0]][B[1]][B[2]] = value
+        return IP + 1 if value else C
+
+    def binary_assign(A, B, C, IP):
+        operation, (sa, pa, ia), (sb, pb, ib) = A
+        value = operations[operation](segments[sa][pa][ia], segments[sb][pb][ib])
+        segments[B[0]][B[1]][B[2]] = value
+        segment, partition, index = C
+        if partition == INT_PARTITION:
+            value = int(value)
+        elif partition == FLOAT_PARTITION:
+            value = float(value)
+        segments[segment][partition][index] = value
+        return IP + 1
+
+    def verify(index, low, high):
+        try:
+            index = int(index)
+        except:
+            raise TypeError("Index is not an integer")
+        if not low <= index < high:
+            raise Exception("Index out of bounds")
+        return index
+
+    def index_1d(A, B, C, IP):
+        (si, pi, ii), (sl, pl, il), (sh, ph, ih) = A
+        index = verify(segments[si][pi][ii], segments[sl][pl][il], segments[sh][ph][ih])
+        segments[C[0]][C[1]][C[2]] = segments[B[0]][B[1]][B[2] + index]
+        return IP + 1
+
+    def index_2d(A, B, C, IP):
+        (si, pi, ii), (sl, pl, il), (sh, ph, ih), (sc, pc, ic), (s1, p1, i1) = A
+        row = verify(segments[si][pi][ii], segments[sl][pl][il], segments[sh][ph][ih])
+        offset = row * segments[sc][pc][ic]
+        segments[s1][p1][i1] = offset
+        (sj, pj, ij), (sl, pl, il), (sh, ph, ih) = B
+        column = segments[sj][pj][ij]
+        verify(column, segments[sl][pl][il], segments[sh][ph][ih])
+        segments[C[0]][C[1]][C[2]] = offset + column
+        return IP + 1
+
+    return {
+        Superinstruction.COMPARE_GOTOF: compare_gotof,
+        Superinstruction.BINARY_ASSIGN: binary_assign,
+        Superinstruction.INDEX_1D: index_1d,
+        Superinstruction.INDEX_2D: index_2d,
+    }
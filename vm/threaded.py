@@ -0,0 +1,351 @@
+from compiler.quadruple import Operator
+from vm.vm import VM, OPCODES, BINARY_OPERATIONS
+from vm.memory import PARTITION_TYPES, INT_PARTITION, FLOAT_PARTITION, GLOBAL_SEGMENT, CONST_SEGMENT
+from vm.vector import build_vector_runner
+from vm.matmul import build_matmul_runner
+from vm.bulk import build_bulk_runners
+from common.debug_flags import DEBUG_VM
+
+"""
+Operadores que terminan un bloque basico: despues de ellos la ejecucion no continua necesariamente con el
+siguiente cuadruplo.
+"""
+BLOCK_TERMINATORS = {Operator.GOTO, Operator.GOTOF, Operator.GOTOT, Operator.GOSUB, Operator.ENDFUN, Operator.VECTOR,
+                     Operator.MATMUL, Operator.FILL, Operator.COPYBLOCK}
+
+
+class Block:
+    """
+    Bloque basico compilado a closures.
+
+    Atributos:
+        start:  Indice del primer cuadruplo del bloque.
+        ops:    Lista de closures sin argumentos, una por cada cuadruplo que no es salto.
+        exit:   Closure sin argumentos que regresa el siguiente bloque a ejecutar (None al terminar el programa).
+    """
+    __slots__ = ('start', 'ops', 'exit')
+
+    def __init__(self, start):
+        self.start = start
+        self.ops = []
+        self.exit = None
+
+
+class ThreadedVM(VM):
+    """
+    Maquina virtual que compila cada bloque basico de la lista de cuadruplos a una cadena de closures.
+    Cada closure tiene capturados sus operandos ya decodificados, y la salida de cada bloque regresa
+    directamente el bloque sucesor, por lo que en la ejecución no se despachan opcodes ni se decodifican
+    direcciones.
+    Comparte la memoria y el stack de ejecución con VM.
+
+    Atributos:
+        blocks:     Diccionario que asocia el indice del primer cuadruplo de cada bloque con su Block.
+    """
+
+    def __init__(self, quad_list, const_table, fun_dir, **kwargs):
+        # Los bloques se construyen sobre el programa sin superinstrucciones.
+        kwargs.setdefault('superinstructions', False)
+        super().__init__(quad_list, const_table, fun_dir, **kwargs)
+        self.blocks = self.build_blocks()
+
+    def state_restored(self):
+        """
+        Las closures tienen capturadas las particiones globales y de apuntadores, así que se vuelven a compilar
+        los bloques con la memoria restaurada.
+        """
+        super().state_restored()
+        self.blocks = self.build_blocks()
+
+    def find_leaders(self):
+        """
+        Encuentra los indices de los cuadruplos que inician un bloque basico: el primero, los destinos de salto,
+        el inicio de cada función y cualquier cuadruplo que sigue a un salto, GOSUB o ENDFUN.
+
+        :return: Lista ordenada con los indices.
+        """
+        leaders = {0}
+        for fun in self.fun_dir.values():
+            if fun.start_addr is not None:
+                leaders.add(fun.start_addr)
+        for i, quad in enumerate(self.quad_list):
+            if quad.operator in BLOCK_TERMINATORS:
+                leaders.add(i + 1)
+            if quad.operator in (Operator.GOTO, Operator.GOTOF, Operator.GOTOT, Operator.VECTOR, Operator.MATMUL,
+                                 Operator.FILL, Operator.COPYBLOCK):
+                leaders.add(quad.result)
+        return sorted(leader for leader in leaders if leader < len(self.quad_list))
+
+    def make_loader(self, operand):
+        """
+        Crea una closure que lee el valor de un operando decodificado.
+        Las particiones globales y constantes no cambian durante la ejecución, así que se capturan directamente;
+        las locales, temporales y de apuntadores se leen a traves de los segmentos del frame actual.
+
+        :param operand: Operando decodificado (segmento, partición, indice).
+        :return: Closure sin argumentos que regresa el valor.
+        """
+        segment, partition, index = operand
+        if segment == CONST_SEGMENT:
+            value = self.segments[segment][partition][index]
+            return lambda: value
+        if segment == GLOBAL_SEGMENT:
+            block = self.segments[segment][partition]
+            return lambda: block[index]
+        segments = self.segments
+        return lambda: segments[segment][partition][index]
+
+    def make_storer(self, operand, convert=False):
+        """
+        Crea una closure que escribe un valor en un operando decodificado.
+
+        :param operand: Operando decodificado (segmento, partición, indice).
+        :param convert: Si es verdadero, convierte el valor al tipo de la partición int o float (asignaciones).
+        :return: Closure que recibe el valor a escribir.
+        """
+        segment, partition, index = operand
+        segments = self.segments
+        if convert and partition == INT_PARTITION:
+            def store(value):
+                segments[segment][partition][index] = int(value)
+        elif convert and partition == FLOAT_PARTITION:
+            def store(value):
+                segments[segment][partition][index] = float(value)
+        elif segment == GLOBAL_SEGMENT:
+            block = segments[segment][partition]
+
+            def store(value):
+                block[index] = value
+        else:
+            def store(value):
+                segments[segment][partition][index] = value
+        return store
+
+    def compile_op(self, operator, A, B, C):
+        """
+        Compila un cuadruplo que no termina el bloque a una closure sin argumentos.
+
+        :param operator: Operador del cuadruplo.
+        :param A: Operando A decodificado.
+        :param B: Operando B decodificado.
+        :param C: Operando C decodificado.
+        :return: La closure.
+        """
+        segments = self.segments
+        if operator in BINARY_OPERATIONS:
+            operation = BINARY_OPERATIONS[operator]
+            (sa, pa, ia), (sb, pb, ib), (sc, pc, ic) = A, B, C
+
+            def binary():
+                segments[sc][pc][ic] = operation(segments[sa][pa][ia], segments[sb][pb][ib])
+            return binary
+        elif operator == Operator.ASSIGN:
+            (sa, pa, ia) = A
+            if C[1] in (INT_PARTITION, FLOAT_PARTITION):
+                load_a = self.make_loader(A)
+                store_c = self.make_storer(C, convert=True)
+                return lambda: store_c(load_a())
+            (sc, pc, ic) = C
+
+            def assign():
+                segments[sc][pc][ic] = segments[sa][pa][ia]
+            return assign
+        elif operator == Operator.READ:
+            store_c = self.make_storer(C)
+            var_type = PARTITION_TYPES[C[1]]
+            return lambda: store_c(self.read_input(var_type))
+        elif operator == Operator.WRITE:
+            load_c = self.make_loader(C)
+            output = self.output.write
+            return lambda: output(load_c())
+        elif operator == Operator.PARAMETER:
+            load_a = self.make_loader(A)
+            _, partition, index = C
+
+            def parameter():
+                self.next_frame.local_partitions[partition][index] = load_a()
+            return parameter
+        elif operator == Operator.ERA:
+            fun = self.fun_dir[C]
+            if self.call_stack is not None:
+                layout = self.frame_layouts[C]
+                return lambda: self.start_window_frame(fun.start_addr, layout)
+            return lambda: self.start_new_frame(IP=fun.start_addr,
+                                                local_partition_sizes=fun.local_partition_sizes,
+                                                temp_partition_sizes=fun.temp_partition_sizes)
+        elif operator == Operator.VERIFY:
+            load_a = self.make_loader(A)
+            load_b = self.make_loader(B)
+            load_c = self.make_loader(C)
+
+            def verify():
+                try:
+                    index = int(load_a())
+                except:
+                    raise TypeError("Index is not an integer")
+                if not load_b() <= index < load_c():
+                    raise Exception("Index out of bounds")
+            return verify
+        elif operator == Operator.ASSIGNPTR:
+            load_a = self.make_loader(A)
+            slots = self.pointer_memory.partitions[C[1]]
+            index = C[2]
+
+            def assign_ptr():
+                slots[index] = int(load_a())
+            return assign_ptr
+        elif operator == Operator.LOADIDX:
+            base_segment, base_partition, base = A
+            load_b = self.make_loader(B)
+            store_c = self.make_storer(C)
+            if base_segment == GLOBAL_SEGMENT:
+                block = segments[base_segment][base_partition]
+                return lambda: store_c(block[base + load_b()])
+            return lambda: store_c(segments[base_segment][base_partition][base + load_b()])
+        elif operator == Operator.STOREIDX:
+            load_a = self.make_loader(A)
+            load_b = self.make_loader(B)
+            base_segment, base_partition, base = C
+            convert = int if base_partition == INT_PARTITION else float if base_partition == FLOAT_PARTITION \
+                else None
+            if base_segment == GLOBAL_SEGMENT:
+                block = segments[base_segment][base_partition]
+                if convert is None:
+                    def store_indexed():
+                        block[base + load_b()] = load_a()
+                else:
+                    def store_indexed():
+                        block[base + load_b()] = convert(load_a())
+            elif convert is None:
+                def store_indexed():
+                    segments[base_segment][base_partition][base + load_b()] = load_a()
+            else:
+                def store_indexed():
+                    segments[base_segment][base_partition][base + load_b()] = convert(load_a())
+            return store_indexed
+        else:
+            raise Exception('Operator ' + str(operator) + ' cannot be compiled')
+
+    def compile_exit(self, blocks, IP, operator, A, B, C):
+        """
+        Compila la salida de un bloque que termina en el cuadruplo IP. La closure regresa el siguiente bloque.
+
+        :param blocks: Diccionario de bloques por indice de inicio.
+        :param IP: Indice del cuadruplo de salida del bloque, o del siguiente bloque si no termina en un salto.
+        :param operator: Operador del cuadruplo de salida, o None si el bloque solo continua con el siguiente.
+        :param A: Operando A decodificado.
+        :param B: Operando B decodificado.
+        :param C: Operando C decodificado.
+        :return: La closure de salida.
+        """
+        following = IP + 1 if operator is not None else IP
+        if operator == Operator.GOTO:
+            target = blocks.get(C)
+            return lambda: target
+        elif operator == Operator.GOTOF:
+            segment, partition, index = A
+            segments = self.segments
+            target = blocks.get(C)
+            fallthrough = blocks.get(following)
+            return lambda: fallthrough if segments[segment][partition][index] else target
+        elif operator == Operator.GOTOT:
+            segment, partition, index = A
+            segments = self.segments
+            target = blocks.get(C)
+            fallthrough = blocks.get(following)
+            return lambda: target if segments[segment][partition][index] else fallthrough
+        elif operator == Operator.GOSUB:
+            def gosub():
+                self.get_current_frame().IP = following
+                self.switch_to_new_frame()
+                frame = self.get_current_frame()
+                self.bind_frame(frame)
+                return blocks[frame.IP]
+            cache = self.memo_caches.get(A)
+            if cache is None:
+                return gosub
+            fallthrough = blocks.get(following)
+            return lambda: fallthrough if self.call_memoized(cache) else gosub()
+        elif operator == Operator.ENDFUN:
+            def endfun():
+                self.restore_past_frame()
+                frame = self.get_current_frame()
+                self.bind_frame(frame)
+                return blocks.get(frame.IP)
+
+            def endfun_memoized():
+                if self.memo_pending:
+                    self.return_memoized()
+                return endfun()
+            return endfun_memoized if self.memo_caches else endfun
+        elif operator == Operator.VECTOR:
+            fallthrough = blocks.get(following)
+            if not self.vectorize:
+                return lambda: fallthrough
+            run_vector = build_vector_runner(self.segments, OPCODES)
+            target = blocks.get(C)
+            return lambda: target if run_vector(A) else fallthrough
+        elif operator == Operator.MATMUL:
+            fallthrough = blocks.get(following)
+            run_matmul = build_matmul_runner(self.segments, self.vectorize)
+            target = blocks.get(C)
+            return lambda: target if run_matmul(A) else fallthrough
+        elif operator in (Operator.FILL, Operator.COPYBLOCK):
+            fallthrough = blocks.get(following)
+            run_fill, run_copy = build_bulk_runners(self.segments)
+            run_store = run_fill if operator == Operator.FILL else run_copy
+            target = blocks.get(C)
+            return lambda: target if run_store(A) else fallthrough
+        else:
+            fallthrough = blocks.get(following)
+            return lambda: fallthrough
+
+    def build_blocks(self):
+        """
+        Divide el programa decodificado en bloques basicos y compila cada uno a closures.
+
+        :return: Diccionario que asocia el indice de inicio de cada bloque con su Block.
+        """
+        leaders = self.find_leaders()
+        blocks = {start: Block(start) for start in leaders}
+        bounds = leaders[1:] + [len(self.program)]
+        operators = list(OPCODES)
+        for start, end in zip(leaders, bounds):
+            block = blocks[start]
+            last = end - 1
+            opcode, *operands = self.program[last]
+            if operators[opcode] in BLOCK_TERMINATORS:
+                terminator, body_end = operators[opcode], last
+            else:
+                terminator, body_end = None, end
+            for IP in range(start, body_end):
+                opcode, A, B, C = self.program[IP]
+                block.ops.append(self.compile_op(operators[opcode], A, B, C))
+            block.exit = self.compile_exit(blocks, body_end, terminator, *operands)
+        return blocks
+
+    def run(self, profiler=None, limits=None, trace=None):
+        """
+        Ejecuta el programa siguiendo la cadena de bloques a partir del IP del frame actual.
+
+        :param profiler: Instancia opcional de Profiler.
+        :param limits: Instancia opcional de ExecutionLimits.
+        :param trace: Instancia opcional de TraceBuffer.
+        Los bloques no se pueden medir ni interrumpir por instrucción, así que al perfilar, con limites o con trace
+        se ejecuta el programa con la tabla de despacho de VM.
+        """
+        if profiler is not None or limits is not None or trace is not None or DEBUG_VM:
+            return super().run(profiler, limits, trace)
+        frame = self.get_current_frame()
+        if frame.IP >= len(self.program):
+            return
+        block = self.blocks[frame.IP]
+        try:
+            while block is not None:
+                for op in block.ops:
+                    op()
+                block = block.exit()
+        finally:
+            self.output.flush()
+            self.input_source.close()
+        self.get_current_frame().IP = len(self.program)
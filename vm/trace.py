@@ -0,0 +1,84 @@
+import sys
+from vm.profiler import OPCODE_NAMES
+
+"""
+Valor que se guarda en el trace en lugar del de un operando que no se pudo leer (por ejemplo un apuntador sin
+inicializar).
+"""
+UNREADABLE = '?'
+
+
+class TraceBuffer:
+    """
+    Buffer circular con las últimas instrucciones ejecutadas por la VM. Se pasa a VM.run para guardar, de una de
+    cada "sample_every" instrucciones, su indice, su operador y los valores de sus operandos; cuando el buffer se
+    llena cada registro nuevo reemplaza al más antiguo, así que la memoria no crece con la ejecución. Si la
+    ejecución termina con un error, la VM registra la instrucción que fallo y escribe el buffer en "output"; en
+    cualquier otro momento se puede escribir con dump. Sin trace la VM ejecuta su ciclo normal, sin ningún costo
+    extra.
+
+    Cada operando que es una dirección se guarda como su valor: el de los operandos que lee la instrucción antes de
+    ejecutarla y el del resultado despues de ejecutarla. El resto de los operandos (destinos de salto, nombres de
+    funciones) y los de las superinstrucciones se guardan tal cual.
+
+    Atributos:
+        size:           Número máximo de registros.
+        sample_every:   Se registra una de cada "sample_every" instrucciones ejecutadas.
+        output:         Archivo donde se escribe el buffer al terminar con un error (por default la salida de
+                        errores).
+        entries:        Registros (quad, opcode, valores) ordenados por posición en el buffer, donde quad es el
+                        indice del cuadruplo original y valores es una tupla (A, B, C).
+        position:       Posición del buffer donde se guarda el siguiente registro.
+        recorded:       Número total de registros, incluyendo los que ya se reemplazaron.
+        error:          Descripción del error con el que termino la ejecución, o None.
+    """
+
+    def __init__(self, size=1000, sample_every=1, output=None):
+        self.size = size
+        self.sample_every = sample_every
+        self.output = output
+        self.entries = [None] * size
+        self.position = 0
+        self.recorded = 0
+        self.error = None
+
+    def record(self, quad, opcode, values):
+        """
+        Guarda un registro en el buffer, reemplazando al más antiguo si esta lleno.
+        """
+        self.entries[self.position] = (quad, opcode, values)
+        self.position = (self.position + 1) % self.size
+        self.recorded += 1
+
+    def records(self):
+        """
+        :return: Lista con los registros que siguen en el buffer, del más antiguo al más reciente.
+        """
+        if self.recorded < self.size:
+            return self.entries[:self.position]
+        return self.entries[self.position:] + self.entries[:self.position]
+
+    def format_text(self):
+        """
+        Genera el contenido del buffer como texto, una instrucción por línea.
+
+        :return: El trace.
+        """
+        records = self.records()
+        lines = [f'Últimas {len(records)} de {self.recorded} instrucciones registradas '
+                 f'(1 de cada {self.sample_every}):',
+                 f'{"cuadruplo":<11}{"operador":<20}{"A":<16}{"B":<16}{"C":<16}']
+        for quad, opcode, values in records:
+            operands = ''.join(f'{str(value)[:15]:<16}' for value in values)
+            lines.append(f'{quad:<11}{OPCODE_NAMES[opcode]:<20}{operands}')
+        if self.error is not None:
+            lines.append(f'Error: {self.error}')
+        return '\n'.join(lines)
+
+    def dump(self, file=None):
+        """
+        Escribe el contenido del buffer.
+
+        :param file: Archivo donde se escribe, por default "output" o la salida de errores.
+        """
+        print(self.format_text(), file=file or self.output or sys.stderr)
@@ -0,0 +1,145 @@
+from compiler.quadruple import Operator
+from vm.memory import numpy, INT_PARTITION, FLOAT_PARTITION
+
+"""
+Ejecución de las instrucciones VECTOR (ver compiler.optimizer.vectorize_loops) sobre la memoria de NumPy
+(MemoryBackend.NUMPY). Cada cuadruplo del cuerpo del ciclo se aplica a todos los elementos del rango a la vez.
+Si algún valor se comportaria distinto que en el ciclo escalar (enteros fuera de 64 bits, división entre cero,
+indices fuera de la partición), la instrucción no modifica la memoria y la VM ejecuta el ciclo escalar, que
+produce el mismo resultado o el mismo error que sin vectorizar.
+"""
+
+"""
+Magnitud a partir de la cual un resultado entero podría no caber en 64 bits. Se compara contra el mismo calculo
+hecho en float, así que se deja un margen sobre 2 ** 63.
+"""
+INT_LIMIT = 2.0 ** 62
+
+"""
+Magnitud hasta la cual un entero se convierte a float sin perder precisión. La división de enteros de Python
+redondea el cociente exacto, mientras que NumPy primero convierte los operandos a float.
+"""
+EXACT_INT_LIMIT = 2.0 ** 53
+
+VECTOR_OPERATIONS = {
+    Operator.PLUS: 'add',
+    Operator.MINUS: 'subtract',
+    Operator.TIMES: 'multiply',
+    Operator.DIVIDE: 'true_divide',
+}
+
+
+def magnitude(value):
+    """
+    :param value: Vector de NumPy o escalar.
+    :return: El mayor valor absoluto, como float.
+    """
+    return float(numpy.max(numpy.abs(value)))
+
+
+def as_float(value):
+    return value.astype(numpy.float64) if isinstance(value, numpy.ndarray) else numpy.float64(value)
+
+
+def is_int(value):
+    return numpy.asarray(value).dtype.kind in 'iu'
+
+
+def build_vector_runner(segments, opcodes):
+    """
+    Crea la función que ejecuta una instrucción VECTOR sobre los segmentos de la VM.
+
+    :param segments: Lista de segmentos de la VM, indexada por segmento y partición.
+    :param opcodes: Diccionario que asocia cada Operator con su opcode entero.
+    :return: Función run(loop) que recibe el operando A decodificado de la instrucción, una tupla (control, final,
+             limites, cuerpo), y regresa verdadero si ejecuto el ciclo completo o falso si se debe ejecutar el
+             ciclo escalar.
+    """
+    load_opcode = opcodes[Operator.LOADIDX]
+    store_opcode = opcodes[Operator.STOREIDX]
+    divide_opcode = opcodes[Operator.DIVIDE]
+    operations = {opcodes[operator]: getattr(numpy, name) for operator, name in VECTOR_OPERATIONS.items()}
+
+    def run(loop):
+        control, final, bounds, body = loop
+        start = segments[control[0]][control[1]][control[2]]
+        stop = segments[final[0]][final[1]][final[2]]
+        count = stop - start
+        if count <= 0:
+            return False
+        # Un VERIFY fallaria en alguna iteración: el ciclo escalar lanza el error en la iteración que corresponde.
+        for low, high in bounds:
+            if start < low or stop > high:
+                return False
+        values = {control: numpy.arange(start, stop, dtype=numpy.int64)}
+        # Los arreglos escritos se guardan aparte hasta terminar, así que si el ciclo no se puede vectorizar la
+        # memoria no cambia.
+        stored = {}
+
+        def value(operand):
+            if operand in values:
+                return values[operand]
+            return segments[operand[0]][operand[1]][operand[2]]
+
+        def window(base):
+            partition = segments[base[0]][base[1]]
+            first = base[2] + start
+            if first < 0 or base[2] + stop > len(partition):
+                return None
+            return numpy.asarray(partition)[first:first + count]
+
+        try:
+            with numpy.errstate(all='ignore'):
+                for opcode, A, B, C in body:
+                    if opcode == load_opcode:
+                        if B != control:
+                            # Indice fijo sobre un arreglo que el ciclo no escribe: es un valor escalar.
+                            values[C] = segments[A[0]][A[1]][A[2] + value(B)]
+                        elif A in stored:
+                            values[C] = stored[A]
+                        else:
+                            elements = window(A)
+                            if elements is None:
+                                return False
+                            # Se copia porque el ciclo puede escribir el mismo arreglo antes de usar el valor.
+                            values[C] = elements.copy()
+                    elif opcode == store_opcode:
+                        elements = value(A)
+                        if C[1] == INT_PARTITION:
+                            if not is_int(elements):
+                                if not numpy.all(numpy.isfinite(elements)) or magnitude(elements) >= INT_LIMIT:
+                                    return False
+                                elements = numpy.trunc(elements)
+                            elements = numpy.asarray(elements, dtype=numpy.int64)
+                        elif C[1] == FLOAT_PARTITION:
+                            elements = numpy.asarray(elements, dtype=numpy.float64)
+                        if window(C) is None:
+                            return False
+                        stored[C] = numpy.broadcast_to(elements, (count,))
+                    else:
+                        left, right = value(A), value(B)
+                        if opcode == divide_opcode:
+                            if not numpy.all(right) or (is_int(left) and magnitude(left) > EXACT_INT_LIMIT) \
+                                    or (is_int(right) and magnitude(right) > EXACT_INT_LIMIT):
+                                return False
+                        result = operations[opcode](left, right)
+                        if is_int(result):
+                            if C[1] != INT_PARTITION and C[1] != FLOAT_PARTITION \
+                                    or magnitude(operations[opcode](as_float(left), as_float(right))) >= INT_LIMIT:
+                                return False
+                            if C[1] == FLOAT_PARTITION:
+                                result = as_float(result)
+                        elif C[1] != FLOAT_PARTITION:
+                            return False
+                        values[C] = result
+        except (OverflowError, ValueError, IndexError):
+            # Un valor de Python que no cabe en los tipos de NumPy (por ejemplo una constante de más de 64 bits) o
+            # un indice fijo fuera de la partición: el ciclo escalar lanza el error que corresponde.
+            return False
+
+        for base, elements in stored.items():
+            numpy.asarray(segments[base[0]][base[1]])[base[2] + start:base[2] + stop] = elements
+        segments[control[0]][control[1]][control[2]] = stop
+        return True
+
+    return run
@@ -1,10 +1,25 @@
 from dataclasses import dataclass
+from enum import Enum
+from functools import partial
+from time import perf_counter
+from operator import add, sub, mul, truediv, lt, gt, le, ge, eq, ne
 from common.scope_size import GLOBAL_ADDRESS_RANGE, LOCAL_ADDRESS_RANGE, CONST_ADDRESS_RANGE, TEMP_ADDRESS_RANGE, \
     POINTER_ADDRESS_RANGE
 from compiler.quadruple import Operator, Quadruple
-from compiler.symbol_table import VarType
-from vm.memory import AddressBlock
+from vm.memory import AddressBlock, TypedAddressBlock, NumpyAddressBlock, ConstantPool, CallStack, FrameLayout, \
+    MemoryBackend, PointerPartition, decode_address, numpy, PARTITION_TYPES, INT_PARTITION, FLOAT_PARTITION, \
+    LOCAL_SEGMENT, CONST_SEGMENT, TEMP_SEGMENT, POINTER_SEGMENT
+from vm.limits import LimitCounters, LimitExceeded
+from vm.memo import MemoCache, MISSING
+from vm.streams import BufferedSink, PromptSource, parse_input
+from vm.superinstructions import Superinstruction, fuse_superinstructions, build_superinstruction_handlers
+from vm.profiler import CallProfiler
+from vm.trace import TraceBuffer, UNREADABLE
+from vm.vector import build_vector_runner
+from vm.matmul import build_matmul_runner
+from vm.bulk import build_bulk_runners
 from common.debug_flags import DEBUG_VM
+from common.vm_options import VM_TRACE_SIZE, VM_TRACE_SAMPLE
 
 """
 Esta clase se utiliza para guardar el contexto de ejecucion.
@@ -18,6 +33,104 @@ class Frame:
     local_memory: AddressBlock
     temp_memory: AddressBlock
 
+    @property
+    def local_partitions(self):
+        return self.local_memory.partitions
+
+
+class WindowFrame:
+    """
+    Contexto de ejecución de una función cuya memoria local y temporal vive en el CallStack de la VM.
+
+    Atributos:
+        IP:                 Posición del instruction pointer.
+        bases:              Offset base del frame en cada buffer del CallStack.
+        layout:             FrameLayout de la función del frame.
+        local_chars:        Partición char local (no vive en el CallStack).
+        temp_chars:         Partición char temporal (no vive en el CallStack).
+        local_partitions:   Ventanas de la memoria local, o None si el frame no esta en ejecución.
+        temp_partitions:    Ventanas de la memoria temporal, o None si el frame no esta en ejecución.
+    """
+    __slots__ = ('IP', 'bases', 'layout', 'local_chars', 'temp_chars', 'local_partitions', 'temp_partitions')
+
+    def __init__(self, IP, bases, layout):
+        self.IP = IP
+        self.bases = bases
+        self.layout = layout
+        self.local_chars = [None] * layout.local_sizes[2] if layout.local_sizes[2] else ()
+        self.temp_chars = [None] * layout.temp_sizes[2] if layout.temp_sizes[2] else ()
+        self.local_partitions = None
+        self.temp_partitions = None
+
+
+class DispatchMode(Enum):
+    """
+    Modos disponibles para despachar las instrucciones de la VM.
+    """
+    IF_CHAIN = 'if_chain'
+    TABLE = 'table'
+
+
+"""
+Número de frames al tope del stack de ejecución que mantienen abiertas sus ventanas sobre el CallStack
+(MemoryBackend.WINDOW).
+"""
+OPEN_WINDOWS = 8
+
+"""
+Indice entero de cada operador. Se utiliza para indexar la tabla de despacho de la VM.
+"""
+OPCODES = {operator: index for index, operator in enumerate(Operator)}
+
+"""
+Opcodes de las superinstrucciones, a continuación de los opcodes de los operadores.
+"""
+SUPER_OPCODES = {superinstruction: len(OPCODES) + index for index, superinstruction in enumerate(Superinstruction)}
+
+"""
+Operaciones binarias que guardan en C el resultado de operar A y B.
+"""
+BINARY_OPERATIONS = {
+    Operator.PLUS: add,
+    Operator.MINUS: sub,
+    Operator.TIMES: mul,
+    Operator.DIVIDE: truediv,
+    Operator.AND: lambda a, b: a and b,
+    Operator.OR: lambda a, b: a or b,
+    Operator.LESSTHAN: lt,
+    Operator.GREATERTHAN: gt,
+    Operator.LESSTHANOREQ: le,
+    Operator.GREATERTHANOREQ: ge,
+    Operator.EQUAL: eq,
+    Operator.NOTEQUAL: ne,
+}
+
+"""
+Indica por cada operador cuales de sus operandos (A, B, C) son direcciones de memoria que se decodifican al cargar
+el programa. El resto de los operandos (saltos, nombres de funciones) se conservan tal cual.
+"""
+ADDRESS_OPERANDS = {
+    **{operator: (True, True, True) for operator in BINARY_OPERATIONS},
+    Operator.ASSIGN: (True, False, True),
+    Operator.READ: (False, False, True),
+    Operator.WRITE: (False, False, True),
+    Operator.GOTO: (False, False, False),
+    Operator.GOTOF: (True, False, False),
+    Operator.GOTOT: (True, False, False),
+    Operator.GOSUB: (False, False, False),
+    Operator.PARAMETER: (True, False, True),
+    Operator.ENDFUN: (False, False, False),
+    Operator.ERA: (False, False, False),
+    Operator.VERIFY: (True, True, True),
+    Operator.ASSIGNPTR: (True, False, True),
+    Operator.LOADIDX: (True, True, True),
+    Operator.STOREIDX: (True, True, True),
+    Operator.VECTOR: (False, False, False),
+    Operator.MATMUL: (False, False, False),
+    Operator.FILL: (False, False, False),
+    Operator.COPYBLOCK: (False, False, False),
+}
+
 
 class VM:
     """
@@ -28,29 +141,253 @@ class VM:
         temp_memory:        Partición de memoria para mantener valores auxiliares.
         execution_stack:    Lista de bloques de memoria para cada función del directorio de funciones.
         quad_list:          Lista de cuadruplos a ejecutar.
-        const_memory:       Partición de memoria para los valores constantes (read-only).
+        const_pool:         Bloque de memoria con los valores constantes ya convertidos a su tipo (read-only).
         fun_dir:            Tabla que almacena la informacion de las funciones a ejecutar.
+        dispatch_mode:      Modo de despacho de instrucciones (cadena de if/elif o tabla de despacho).
+        segments:           Particiones de memoria indexadas por segmento y partición (segments[seg][part][idx]).
+                            Los segmentos local y temporal apuntan al frame actual.
+        program:            Cuadruplos decodificados como tuplas (opcode, A, B, C), donde cada operando que es una
+                            dirección se traduce a una tupla (segmento, partición, indice).
+        dispatch_table:     Lista de handlers indexada por el opcode entero de cada operador.
+        program_origin:     Indice del cuadruplo original de cada instrucción de program.
+        fun_start:          Indice en program de la primera instrucción de cada función.
+        fusion_stats:       Número de veces que se aplico cada superinstrucción al cargar el programa.
+        frame_layouts:      FrameLayout de cada función (solo con MemoryBackend.WINDOW).
+        output:             Canal de salida de la instrucción WRITE (ver vm/streams.py).
+        input_source:       Fuente de entrada de la instrucción READ (ver vm/streams.py).
+        limit_counters:     Contadores de la última ejecución con limites (LimitCounters), o None.
+        snapshot_map:       Archivo mapeado en memoria del último snapshot restaurado (ver vm/snapshot.py), o None.
+        address_block:      Clase de los bloques de memoria de la VM (AddressBlock, TypedAddressBlock o
+                            NumpyAddressBlock).
+        vectorize:          Indica si las instrucciones VECTOR ejecutan sus ciclos sobre arreglos completos (solo con
+                            MemoryBackend.NUMPY); si es falso se ejecuta el ciclo escalar que les sigue. Tambien
+                            indica si las instrucciones MATMUL utilizan el kernel de NumPy.
+        call_stack:         Stack contiguo con la memoria local y temporal de los frames (solo con
+                            MemoryBackend.WINDOW), o None si cada frame tiene sus propios bloques de memoria.
+        memo_caches:        MemoCache de cada función pura que se memoiza (vacio si no se memoiza).
+        memo_pending:       Llamadas memoizadas en ejecución, tuplas (profundidad del frame, MemoCache,
+                            argumentos); su resultado se guarda en la cache al ejecutar su ENDFUN.
     """
 
-    def __init__(self, quad_list, const_table, fun_dir):
+    def __init__(self, quad_list, const_table, fun_dir, dispatch_mode=DispatchMode.TABLE,
+                 memory_backend=MemoryBackend.LIST, global_partition_sizes=None, pointer_partition_sizes=None,
+                 superinstructions=True, output=None, input_source=None, memo_size=None):
         """
         Inicializa los atributos de la clase VM.
 
         :param quad_list: Lista de cuadruplos a ejecutar.
         :param const_table: Tabla que asocia las constantes con una dirección de memoria.
         :param fun_dir: Tabla que almacena la informacion de las funciones a ejecutar.
+        :param dispatch_mode: Modo de despacho de instrucciones, instancia de DispatchMode.
+        :param memory_backend: Implementación de los bloques de memoria, instancia de MemoryBackend.
+        :param global_partition_sizes: Tamaños de las particiones globales calculados por el compilador.
+        :param pointer_partition_sizes: Tamaños de las particiones de apuntadores calculados por el compilador.
+        :param superinstructions: Si es verdadero, fusiona secuencias de cuadruplos en superinstrucciones al cargar
+                                  el programa (solo con la tabla de despacho).
+        :param output: Canal de salida de la instrucción WRITE. Por default se utiliza un BufferedSink sobre la
+                       salida estandar.
+        :param input_source: Fuente de entrada de la instrucción READ. Por default se le pide cada valor al usuario
+                             (PromptSource).
+        :param memo_size: Si no es None, memoiza las funciones puras (FunctionsDirectoryItem.pure) guardando hasta
+                          memo_size resultados por función (solo con la tabla de despacho y ThreadedVM).
         """
-        self.global_memory = AddressBlock(GLOBAL_ADDRESS_RANGE[0], GLOBAL_ADDRESS_RANGE[1])
-        self.pointer_memory = AddressBlock(POINTER_ADDRESS_RANGE[0], POINTER_ADDRESS_RANGE[1])
-        self.execution_stack = [Frame(IP=0,
-                                      local_memory=AddressBlock(LOCAL_ADDRESS_RANGE[0], LOCAL_ADDRESS_RANGE[1]),
-                                      temp_memory=AddressBlock(TEMP_ADDRESS_RANGE[0], TEMP_ADDRESS_RANGE[1]))]
+        # El stack contiguo solo se usa con la tabla de despacho; la cadena de if/elif lee la memoria a traves de
+        # los bloques de cada frame, así que en ese caso se usan bloques tipados.
+        if memory_backend == MemoryBackend.WINDOW and dispatch_mode != DispatchMode.TABLE:
+            memory_backend = MemoryBackend.TYPED
+        # Sin NumPy se utilizan los arreglos tipados, que guardan los mismos valores.
+        if memory_backend == MemoryBackend.NUMPY and numpy is None:
+            memory_backend = MemoryBackend.TYPED
+        self.call_stack = CallStack() if memory_backend == MemoryBackend.WINDOW else None
+        self.address_block = AddressBlock if memory_backend == MemoryBackend.LIST else \
+            NumpyAddressBlock if memory_backend == MemoryBackend.NUMPY else TypedAddressBlock
+        self.vectorize = memory_backend == MemoryBackend.NUMPY
+        self.global_memory = self.address_block(GLOBAL_ADDRESS_RANGE[0], GLOBAL_ADDRESS_RANGE[1],
+                                                *(global_partition_sizes or []))
+        self.pointer_memory = self.address_block(POINTER_ADDRESS_RANGE[0], POINTER_ADDRESS_RANGE[1],
+                                                 *(pointer_partition_sizes or []))
+        self.execution_stack = []
+        self.next_frame = None
+        main = fun_dir.get('main')
+        if main is not None and main.local_partition_sizes is not None:
+            self.start_new_frame(IP=0,
+                                 local_partition_sizes=main.local_partition_sizes,
+                                 temp_partition_sizes=main.temp_partition_sizes)
+        elif self.call_stack is not None:
+            default_size = (LOCAL_ADDRESS_RANGE[1] - LOCAL_ADDRESS_RANGE[0] + 1) // 4
+            self.start_new_frame(IP=0,
+                                 local_partition_sizes=[default_size] * 4,
+                                 temp_partition_sizes=[default_size] * 4)
+        else:
+            self.next_frame = Frame(IP=0,
+                                    local_memory=self.address_block(LOCAL_ADDRESS_RANGE[0], LOCAL_ADDRESS_RANGE[1]),
+                                    temp_memory=self.address_block(TEMP_ADDRESS_RANGE[0], TEMP_ADDRESS_RANGE[1]))
+        self.execution_stack = [self.next_frame]
         self.next_frame: Frame = None
         self.next_exe_scope: ExeScope = None
 
         self.quad_list = quad_list
-        self.const_memory = dict(map(lambda c: (c[1].address, c[1]), const_table.items()))
+        self.output = output if output is not None else BufferedSink()
+        self.input_source = input_source if input_source is not None else PromptSource()
+        self.limit_counters = None
+        self.snapshot_map = None
+        self.const_pool = ConstantPool(const_table)
         self.fun_dir = fun_dir
+        self.memo_caches = {}
+        if memo_size is not None and dispatch_mode == DispatchMode.TABLE:
+            self.memo_caches = {name: MemoCache(fun, memo_size) for name, fun in fun_dir.items() if fun.pure}
+        self.memo_pending = []
+
+        self.segments = [self.global_memory.partitions, None, self.const_pool.partitions, None, None]
+        self.segments[POINTER_SEGMENT] = [PointerPartition(slots, self.segments)
+                                          for slots in self.pointer_memory.partitions]
+        self.bind_frame(self.get_current_frame())
+
+        self.dispatch_mode = dispatch_mode
+        self.program = self.decode_program()
+        self.program_origin = list(range(len(self.program)))
+        self.fun_start = {name: fun.start_addr for name, fun in fun_dir.items()}
+        self.fusion_stats = {superinstruction: 0 for superinstruction in Superinstruction}
+        if superinstructions and dispatch_mode == DispatchMode.TABLE:
+            self.program, self.program_origin, self.fusion_stats, index_map = fuse_superinstructions(
+                quad_list, self.program, fun_dir, SUPER_OPCODES,
+                {OPCODES[Operator.GOTO], OPCODES[Operator.GOTOF], OPCODES[Operator.GOTOT],
+                 OPCODES[Operator.VECTOR], OPCODES[Operator.MATMUL], OPCODES[Operator.FILL],
+                 OPCODES[Operator.COPYBLOCK]})
+            self.fun_start = {name: index_map[start] if start is not None else None
+                              for name, start in self.fun_start.items()}
+        self.frame_layouts = {}
+        if self.call_stack is not None:
+            self.frame_layouts = {name: FrameLayout(fun.local_partition_sizes, fun.temp_partition_sizes)
+                                  for name, fun in fun_dir.items() if fun.local_partition_sizes is not None}
+        self.dispatch_table = self.build_dispatch_table()
+
+    def decode_program(self):
+        """
+        Decodifica la lista de cuadruplos una sola vez al cargar el programa. Cada cuadruplo se convierte en una
+        tupla (opcode, A, B, C) y cada operando que es una dirección se traduce a (segmento, partición, indice).
+
+        :return: Lista con los cuadruplos decodificados, en el mismo orden que quad_list.
+        """
+        return [self.decode_quad(quad) for quad in self.quad_list]
+
+    def decode_quad(self, quad):
+        """
+        Decodifica un cuadruplo como una tupla (opcode, A, B, C). El operando A de VECTOR (un VectorLoop) se
+        decodifica como una tupla (control, final, limites, cuerpo) con los cuadruplos del cuerpo decodificados, y
+        el de MATMUL (un MatMulNest) como la tupla que recibe build_matmul_runner. El de FILL y COPYBLOCK (un
+        BulkStore) se decodifica como la tupla que reciben las funciones de build_bulk_runners.
+
+        :param quad: El cuadruplo a decodificar.
+        :return: La instrucción decodificada.
+        """
+        operands = [quad.left_operand, quad.right_operand, quad.result]
+        for i, is_address in enumerate(ADDRESS_OPERANDS[quad.operator]):
+            if is_address:
+                operands[i] = decode_address(operands[i])
+        if quad.operator in BINARY_OPERATIONS or quad.operator in (Operator.ASSIGN, Operator.LOADIDX,
+                                                                   Operator.STOREIDX):
+            if operands[2][0] == CONST_SEGMENT:
+                raise MemoryError('Cannot to write to read-only memory')
+        if quad.operator == Operator.VECTOR:
+            loop = quad.left_operand
+            operands[0] = (decode_address(loop.control), decode_address(loop.final), loop.bounds,
+                           tuple(self.decode_quad(body_quad) for body_quad in loop.body))
+        elif quad.operator == Operator.MATMUL:
+            nest = quad.left_operand
+            addresses = (nest.i, nest.i_final, nest.j, nest.j_start, nest.j_final, nest.k, nest.k_start, nest.k_final)
+            matrices = (nest.product, nest.left, nest.right)
+            operands[0] = (*(decode_address(addr) for addr in addresses),
+                           *((decode_address(base), columns) for base, columns in matrices),
+                           tuple((decode_address(control), low, high) for control, low, high in nest.bounds))
+        elif quad.operator in (Operator.FILL, Operator.COPYBLOCK):
+            store = quad.left_operand
+            j_operands = (store.j, store.j_start, store.j_final) if store.j is not None else (None, None, None)
+            source = decode_address(store.source) if quad.operator == Operator.FILL else \
+                (decode_address(store.source[0]), store.source[1])
+            operands[0] = (decode_address(store.i), decode_address(store.i_final),
+                           *(addr if addr is None else decode_address(addr) for addr in j_operands),
+                           (decode_address(store.target[0]), store.target[1]), source,
+                           tuple((decode_address(control), low, high) for control, low, high in store.bounds))
+        return (OPCODES[quad.operator], *operands)
+
+    def state_restored(self):
+        """
+        Se llama despues de restaurar un snapshot, cuando la memoria y los frames de la VM fueron reemplazados.
+        Las subclases que guardan referencias a la memoria la deben actualizar aquí.
+        Las llamadas memoizadas pendientes pertenecian a los frames anteriores, así que se descartan.
+        """
+        self.memo_pending = []
+
+    def dispatches_saved(self):
+        """
+        Calcula cuantas instrucciones se eliminaron del programa al fusionarlas en superinstrucciones, es decir,
+        cuantos despachos se ahorran cada vez que se ejecuta una vez cada superinstrucción.
+
+        :return: Diccionario que asocia cada Superinstruction con el número de despachos ahorrados.
+        """
+        lengths = {
+            Superinstruction.COMPARE_GOTOF: 2,
+            Superinstruction.BINARY_ASSIGN: 2,
+            Superinstruction.INDEX_1D: 2,
+            Superinstruction.INDEX_2D: 4,
+        }
+        return {superinstruction: count * (lengths[superinstruction] - 1)
+                for superinstruction, count in self.fusion_stats.items()}
+
+    def bind_frame(self, frame):
+        """
+        Apunta los segmentos local y temporal a la memoria del frame que se va a ejecutar.
+
+        :param frame: Frame que se vuelve el contexto actual de ejecucion.
+        """
+        if self.call_stack is None:
+            self.segments[LOCAL_SEGMENT] = frame.local_memory.partitions
+            self.segments[TEMP_SEGMENT] = frame.temp_memory.partitions
+        else:
+            if frame.local_partitions is None:
+                self.open_window(frame)
+            self.segments[LOCAL_SEGMENT] = frame.local_partitions
+            self.segments[TEMP_SEGMENT] = frame.temp_partitions
+
+    def open_window(self, frame, clear=False):
+        """
+        Crea las ventanas de un WindowFrame sobre los buffers del CallStack.
+
+        :param frame: Frame cuya memoria se va a acceder.
+        :param clear: Si es verdadero, inicializa la memoria del frame en 0 (solo al crear el frame).
+        """
+        frame.local_partitions, frame.temp_partitions = self.call_stack.views(
+            frame.bases, frame.layout, frame.local_chars, frame.temp_chars, clear)
+
+    def close_window(self, frame):
+        """
+        Descarta las ventanas de un WindowFrame; las memoryviews se liberan al dejar de tener referencias.
+        Sus valores se conservan en los buffers del CallStack.
+
+        :param frame: Frame que deja de ejecutarse.
+        """
+        frame.local_partitions = None
+        frame.temp_partitions = None
+
+    def grow_call_stack(self, sizes):
+        """
+        Crece los buffers del CallStack para que quepa un frame con los tamaños "sizes". Las ventanas abiertas
+        se liberan antes de crecer y se vuelven a crear sobre los nuevos buffers.
+
+        :param sizes: Tamaños de las 4 particiones (local más temporal) del frame.
+        """
+        frames = [frame for frame in self.execution_stack[-OPEN_WINDOWS:] + [self.next_frame]
+                  if frame is not None and frame.local_partitions is not None]
+        for frame in frames:
+            CallStack.release(frame.local_partitions)
+            CallStack.release(frame.temp_partitions)
+            self.close_window(frame)
+        self.call_stack.grow(sizes)
+        for frame in frames:
+            self.open_window(frame)
+        if self.execution_stack:
+            self.bind_frame(self.get_current_frame())
 
     def get_current_frame(self):
         """
@@ -72,17 +409,21 @@ class VM:
         """
         Genera un nuevo frame y lo guarda temporalmente en self.next_frame para preparar a la MV
         para el cambio de contexto.
+        Con MemoryBackend.WINDOW el frame solo reserva espacio en el tope del CallStack.
         """
+        if self.call_stack is not None:
+            self.start_window_frame(IP, FrameLayout(local_partition_sizes, temp_partition_sizes))
+            return
         self.next_frame = Frame(
             IP=IP,
-            local_memory=AddressBlock(
+            local_memory=self.address_block(
                 LOCAL_ADDRESS_RANGE[0],
                 LOCAL_ADDRESS_RANGE[1],
                 local_partition_sizes[0],
                 local_partition_sizes[1],
                 local_partition_sizes[2],
                 local_partition_sizes[3]),
-            temp_memory=AddressBlock(
+            temp_memory=self.address_block(
                 TEMP_ADDRESS_RANGE[0],
                 TEMP_ADDRESS_RANGE[1],
                 temp_partition_sizes[0],
@@ -90,19 +431,84 @@ class VM:
                 temp_partition_sizes[2],
                 temp_partition_sizes[3]))
 
+    def start_window_frame(self, IP, layout):
+        """
+        Genera un nuevo WindowFrame reservando su espacio en el tope del CallStack y lo guarda en self.next_frame.
+
+        :param IP: Indice de la primera instrucción de la función.
+        :param layout: FrameLayout de la función.
+        """
+        if not self.call_stack.fits(layout.sizes):
+            self.grow_call_stack(layout.sizes)
+        self.next_frame = WindowFrame(IP, self.call_stack.push(layout.sizes), layout)
+        self.open_window(self.next_frame, clear=True)
+
     def switch_to_new_frame(self):
         """
         Anade el nuevo contexto al execution stack para completar el cambio de contexto una vez que la MV
         esta lista, y deja self.next_frame vacia.
         """
         self.execution_stack.append(self.next_frame)
+        if self.call_stack is not None and len(self.execution_stack) > OPEN_WINDOWS:
+            # Solo los frames más cercanos al tope mantienen sus ventanas, así regresar a ellos no crea ventanas
+            # nuevas y la memoria de las ventanas no crece con la profundidad de la recursión.
+            self.close_window(self.execution_stack[-OPEN_WINDOWS - 1])
+        self.next_frame = None
+
+    def discard_next_frame(self):
+        """
+        Descarta el frame preparado por ERA sin ejecutarlo (llamada memoizada cuyo resultado ya se conoce).
+        """
+        frame = self.next_frame
         self.next_frame = None
+        if self.call_stack is not None:
+            self.close_window(frame)
+            self.call_stack.pop(frame.bases)
+
+    def call_memoized(self, cache):
+        """
+        Se ejecuta en el GOSUB de una función memoizada, con los argumentos ya escritos en self.next_frame.
+        Si el resultado de los argumentos esta en la cache, lo escribe en la variable de regreso y descarta el
+        frame; si no, registra la llamada para guardar su resultado al terminar.
+
+        :param cache: MemoCache de la función.
+        :return: Verdadero si la llamada ya no se tiene que ejecutar.
+        """
+        key = cache.key(self.next_frame)
+        value = cache.get(key)
+        if value is MISSING:
+            self.memo_pending.append((len(self.execution_stack) + 1, cache, key))
+            return False
+        self.discard_next_frame()
+        segment, partition, index = cache.return_operand
+        self.segments[segment][partition][index] = value
+        return True
+
+    def return_memoized(self):
+        """
+        Se ejecuta en cada ENDFUN cuando hay llamadas memoizadas pendientes: si el frame que termina es el de la
+        última llamada memoizada, guarda su valor de regreso en la cache.
+        """
+        depth, cache, key = self.memo_pending[-1]
+        if depth == len(self.execution_stack):
+            self.memo_pending.pop()
+            segment, partition, index = cache.return_operand
+            cache.put(key, self.segments[segment][partition][index])
+
+    def memo_stats(self):
+        """
+        :return: Diccionario que asocia cada función memoizada con sus aciertos, fallos y resultados guardados.
+        """
+        return {name: cache.stats() for name, cache in self.memo_caches.items()}
 
     def restore_past_frame(self):
         """
         Elimina el frame actual cuando la funcion que lo necesitaba termina su ejecucion
         """
-        self.execution_stack.pop()
+        frame = self.execution_stack.pop()
+        if self.call_stack is not None:
+            self.close_window(frame)
+            self.call_stack.pop(frame.bases)
 
     def write(self, addr, value):
         """
@@ -139,13 +545,8 @@ class VM:
         elif LOCAL_ADDRESS_RANGE[0] <= addr < LOCAL_ADDRESS_RANGE[1]:
             return self.get_current_memory().read(addr)
         elif CONST_ADDRESS_RANGE[0] <= addr < CONST_ADDRESS_RANGE[1]:
-            const = self.const_memory[addr]
-            if const.type == VarType.INT:
-                return int(const.name)
-            elif const.type == VarType.FLOAT:
-                return float(const.name)
-            else:
-                return const.name
+            _, partition, index = decode_address(addr)
+            return self.const_pool.partitions[partition][index]
         elif TEMP_ADDRESS_RANGE[0] <= addr < TEMP_ADDRESS_RANGE[1]:
             return self.get_current_frame().temp_memory.read(addr)
         elif POINTER_ADDRESS_RANGE[0] <= addr < POINTER_ADDRESS_RANGE[1]:
@@ -177,6 +578,196 @@ class VM:
         else:
             raise MemoryError('Address out of bounds')
 
+    def read_input(self, var_type):
+        """
+        Lee el siguiente valor de la fuente de entrada y lo convierte al tipo de la variable donde se guardara.
+
+        :param var_type: Tipo de dato de la partición destino, instancia de VarType.
+        :return: El valor leido convertido al tipo de dato de la variable.
+        """
+        # La salida pendiente se escribe antes de pedir el valor, para que el usuario vea lo que se le pregunta.
+        self.output.flush()
+        return parse_input(self.input_source.read(var_type), var_type)
+
+    def write_output(self, value):
+        """
+        Escribe un valor leido de memoria en el canal de salida.
+
+        :param value: Valor a escribir.
+        """
+        self.output.write(value)
+
+    def build_dispatch_table(self):
+        """
+        Construye la tabla de despacho: una lista indexada por el opcode entero (OPCODES) de cada operador,
+        donde cada elemento es un handler con la firma handler(A, B, C, IP) que ejecuta la instrucción y
+        regresa el indice de la siguiente instrucción a ejecutar.
+        Los handlers reciben los operandos ya decodificados, por lo que cada lectura o escritura es un acceso
+        directo segments[segmento][partición][indice].
+
+        :return: La lista de handlers.
+        """
+        segments = self.segments
+        table = [None] * (len(OPCODES) + len(SUPER_OPCODES))
+
+        def binary(operation):
+            def handler(A, B, C, IP):
+                segments[C[0]][C[1]][C[2]] = operation(segments[A[0]][A[1]][A[2]], segments[B[0]][B[1]][B[2]])
+                return IP + 1
+            return handler
+
+        for operator, operation in BINARY_OPERATIONS.items():
+            table[OPCODES[operator]] = binary(operation)
+
+        def assign(A, B, C, IP):
+            value = segments[A[0]][A[1]][A[2]]
+            segment, partition, index = C
+            # Las particiones int y float convierten el valor al tipo de la variable destino.
+            if partition == INT_PARTITION:
+                value = int(value)
+            elif partition == FLOAT_PARTITION:
+                value = float(value)
+            segments[segment][partition][index] = value
+            return IP + 1
+
+        def read_input(A, B, C, IP):
+            segments[C[0]][C[1]][C[2]] = self.read_input(PARTITION_TYPES[C[1]])
+            return IP + 1
+
+        output = self.output.write
+
+        def write_output(A, B, C, IP):
+            output(segments[C[0]][C[1]][C[2]])
+            return IP + 1
+
+        def goto(A, B, C, IP):
+            return C
+
+        def gotof(A, B, C, IP):
+            return IP + 1 if segments[A[0]][A[1]][A[2]] else C
+
+        def gotot(A, B, C, IP):
+            return C if segments[A[0]][A[1]][A[2]] else IP + 1
+
+        def gosub(A, B, C, IP):
+            self.get_current_frame().IP = IP + 1
+            self.switch_to_new_frame()
+            frame = self.get_current_frame()
+            self.bind_frame(frame)
+            return frame.IP
+
+        def parameter(A, B, C, IP):
+            self.next_frame.local_partitions[C[1]][C[2]] = segments[A[0]][A[1]][A[2]]
+            return IP + 1
+
+        def endfun(A, B, C, IP):
+            self.restore_past_frame()
+            frame = self.get_current_frame()
+            self.bind_frame(frame)
+            return frame.IP
+
+        caches = self.memo_caches
+
+        def gosub_memoized(A, B, C, IP):
+            cache = caches.get(A)
+            if cache is not None and self.call_memoized(cache):
+                return IP + 1
+            return gosub(A, B, C, IP)
+
+        def endfun_memoized(A, B, C, IP):
+            if self.memo_pending:
+                self.return_memoized()
+            return endfun(A, B, C, IP)
+
+        def era(A, B, C, IP):
+            fun = self.fun_dir[C]
+            self.start_new_frame(
+                IP=self.fun_start[C],
+                local_partition_sizes=fun.local_partition_sizes,
+                temp_partition_sizes=fun.temp_partition_sizes
+            )
+            return IP + 1
+
+        def era_window(A, B, C, IP):
+            self.start_window_frame(self.fun_start[C], self.frame_layouts[C])
+            return IP + 1
+
+        def verify(A, B, C, IP):
+            try:
+                index = int(segments[A[0]][A[1]][A[2]])
+            except:
+                raise TypeError("Index is not an integer")
+            if not segments[B[0]][B[1]][B[2]] <= index < segments[C[0]][C[1]][C[2]]:
+                raise Exception("Index out of bounds")
+            return IP + 1
+
+        def assign_ptr(A, B, C, IP):
+            # Se escribe la dirección directamente en la memoria de apuntadores, sin desreferenciar.
+            self.pointer_memory.partitions[C[1]][C[2]] = int(segments[A[0]][A[1]][A[2]])
+            return IP + 1
+
+        def load_indexed(A, B, C, IP):
+            segments[C[0]][C[1]][C[2]] = segments[A[0]][A[1]][A[2] + segments[B[0]][B[1]][B[2]]]
+            return IP + 1
+
+        def store_indexed(A, B, C, IP):
+            value = segments[A[0]][A[1]][A[2]]
+            segment, partition, index = C
+            if partition == INT_PARTITION:
+                value = int(value)
+            elif partition == FLOAT_PARTITION:
+                value = float(value)
+            segments[segment][partition][index + segments[B[0]][B[1]][B[2]]] = value
+            return IP + 1
+
+        run_vector = build_vector_runner(segments, OPCODES) if self.vectorize else None
+
+        def vector(A, B, C, IP):
+            return C if run_vector(A) else IP + 1
+
+        run_matmul = build_matmul_runner(segments, self.vectorize)
+
+        def matmul(A, B, C, IP):
+            return C if run_matmul(A) else IP + 1
+
+        run_fill, run_copy = build_bulk_runners(segments)
+
+        def fill(A, B, C, IP):
+            return C if run_fill(A) else IP + 1
+
+        def copy_block(A, B, C, IP):
+            return C if run_copy(A) else IP + 1
+
+        def skip(A, B, C, IP):
+            return IP + 1
+
+        table[OPCODES[Operator.ASSIGN]] = assign
+        table[OPCODES[Operator.READ]] = read_input
+        table[OPCODES[Operator.WRITE]] = write_output
+        table[OPCODES[Operator.GOTO]] = goto
+        table[OPCODES[Operator.GOTOF]] = gotof
+        table[OPCODES[Operator.GOTOT]] = gotot
+        table[OPCODES[Operator.GOSUB]] = gosub_memoized if caches else gosub
+        table[OPCODES[Operator.PARAMETER]] = parameter
+        table[OPCODES[Operator.ENDFUN]] = endfun_memoized if caches else endfun
+        table[OPCODES[Operator.ERA]] = era if self.call_stack is None else era_window
+        table[OPCODES[Operator.VERIFY]] = verify
+        table[OPCODES[Operator.ASSIGNPTR]] = assign_ptr
+        table[OPCODES[Operator.LOADIDX]] = load_indexed
+        table[OPCODES[Operator.STOREIDX]] = store_indexed
+        table[OPCODES[Operator.VECTOR]] = vector if self.vectorize else skip
+        table[OPCODES[Operator.MATMUL]] = matmul
+        table[OPCODES[Operator.FILL]] = fill
+        table[OPCODES[Operator.COPYBLOCK]] = copy_block
+
+        operations = [None] * len(OPCODES)
+        for operator, operation in BINARY_OPERATIONS.items():
+            operations[OPCODES[operator]] = operation
+        handlers = build_superinstruction_handlers(segments, operations)
+        for superinstruction, handler in handlers.items():
+            table[SUPER_OPCODES[superinstruction]] = handler
+        return table
+
     def next_instruction(self):
         """
         Se extrae el siguiente cuadruplo a ejecutar y se extrae su operador asi como los operandos involucrados.
@@ -191,9 +782,6 @@ class VM:
         B = current_quad.right_operand
         C = current_quad.result
 
-        if DEBUG_VM:
-            print(f'{frame.IP}.\t{instruction}\tA:{A}\tB:{B}\tC:{C}')
-
         if instruction == Operator.PLUS:
             self.write(C, self.read(A) + self.read(B))
         elif instruction == Operator.MINUS:
@@ -225,37 +813,12 @@ class VM:
             READ se encarga de leer el input del usuario, Este input se recoge y se intenta hacer un cast al tipo
             de la variable donde se guardara el input.
             """
-            var_type = frame.local_memory.get_partition(C)
-            user_input = input(f'READ {var_type.value}: ')
-            if var_type == VarType.INT:
-                try:
-                    user_input = int(user_input)
-                except:
-                    raise TypeError("Can not cast input to int")
-            elif var_type == VarType.FLOAT:
-                try:
-                    user_input = float(user_input)
-                except:
-                    raise TypeError("Can not cast input to float")
-            elif var_type == VarType.CHAR:
-                try:
-                    user_input = str(user_input)
-                except:
-                    raise TypeError("Can not cast input to char")
-            elif var_type == VarType.BOOL:
-                try:
-                    user_input = bool(user_input)
-                except:
-                    raise TypeError("Can not cast input to bool")
-            self.write(C, user_input)
+            self.write(C, self.read_input(frame.local_memory.get_partition(C)))
         elif instruction == Operator.WRITE:
             """
             WRITE escribe en pantalla el valor que se recoge de la variable que se intenta escribir.
             """
-            value = self.read(C)
-            if type(value) == str:
-                value = value.replace('\\n', '\n')
-            print(value, end='')
+            self.write_output(self.read(C))
         elif instruction == Operator.GOTO:
             """
             GOTO actualiza el valor del instruction pointer hacia la direccion del salto
@@ -324,17 +887,360 @@ class VM:
                 raise Exception("Index out of bounds")
         elif instruction == Operator.ASSIGNPTR:
             """
-            VERIFY se asegura de que el indice A este entre los limites B y C, que corresponden a los limites de la
-            dimension correspondiente de un arreglo
+            ASSIGNPTR guarda en el apuntador C la dirección calculada en A, sin desreferenciar el apuntador.
             """
             self.pointer_memory.write(C, self.read(A))
+        elif instruction == Operator.LOADIDX:
+            """
+            LOADIDX copia a C el elemento del arreglo con dirección base A que esta desplazado B posiciones.
+            """
+            # El elemento se copia tal cual a la temporal C, sin convertirlo al tipo de su partición (como
+            # load_indexed en la tabla de despacho): un elemento sin asignar se copia como None.
+            _, partition, index = decode_address(C)
+            self.get_current_frame().temp_memory.partitions[partition][index] = self.read(A + self.read(B))
+        elif instruction == Operator.STOREIDX:
+            """
+            STOREIDX escribe el valor de A en el elemento del arreglo con dirección base C que esta desplazado B
+            posiciones.
+            """
+            self.write(C + self.read(B), self.read(A))
+        elif instruction == Operator.VECTOR:
+            """
+            VECTOR no se vectoriza con la cadena de if/elif: se continua con el ciclo escalar que le sigue.
+            """
+            pass
+        elif instruction == Operator.MATMUL:
+            """
+            MATMUL tampoco se ejecuta con la cadena de if/elif: se continua con los ciclos que le siguen.
+            """
+            pass
+        elif instruction == Operator.FILL or instruction == Operator.COPYBLOCK:
+            """
+            FILL y COPYBLOCK tampoco: los ciclos que les siguen escriben cada elemento.
+            """
+            pass
         frame.IP += 1
 
-    def run(self):
+    def run(self, profiler=None, limits=None, trace=None):
         """
         Ejecuta todas las intrucciones de la quad_list
+
+        :param profiler: Instancia opcional de Profiler o de CallProfiler. Si se da, la ejecución cuenta y mide
+                         cada instrucción (Profiler) o cada llamada a función (CallProfiler) con una tabla de
+                         despacho instrumentada (ver run_observed), por lo que el ciclo normal no tiene ningún costo
+                         extra.
+        :param limits: Instancia opcional de ExecutionLimits. Si se da, la ejecución lanza LimitExceeded al
+                       superar alguno de los limites; solo los saltos, llamadas y regresos tienen un costo extra.
+                       Con la tabla de despacho se cuentan las instrucciones del programa decodificado (una
+                       superinstrucción cuenta como una instrucción).
+        :param trace: Instancia opcional de TraceBuffer. Si se da, la ejecución guarda las últimas instrucciones
+                      ejecutadas y las escribe si termina con un error. Con DEBUG_VM se utiliza un TraceBuffer de
+                      VM_TRACE_SIZE registros, que se escribe tambien al terminar. Con trace no se utiliza el
+                      perfilador.
+        """
+        counters = None if limits is None else LimitCounters(limits, self.get_current_frame().IP)
+        self.limit_counters = counters
+        try:
+            if DEBUG_VM or trace is not None or profiler is not None:
+                self.run_observed(profiler, counters, trace)
+            elif self.dispatch_mode == DispatchMode.IF_CHAIN:
+                step = self.next_instruction if counters is None else partial(self.next_instruction_limited, counters)
+                while self.get_current_frame().IP < len(self.quad_list):
+                    step()
+            else:
+                self.run_table(None if counters is None else self.build_limited_table(counters))
+                if counters is not None:
+                    counters.end_segment(len(self.program) - 1, len(self.program))
+        finally:
+            self.output.flush()
+            self.input_source.close()
+
+    def run_observed(self, profiler, counters, trace):
+        """
+        Ejecuta el programa con un perfilador o un trace. Los dos modos de despacho comparten el ciclo de run_table
+        con una tabla instrumentada: con IF_CHAIN el programa son los cuadruplos sin decodificar y la tabla base
+        ejecuta cada uno con next_instruction (ver build_chain_table).
+
+        :param profiler: Instancia de Profiler o de CallProfiler, o None.
+        :param counters: Instancia opcional de LimitCounters si la ejecución tiene limites.
+        :param trace: Instancia de TraceBuffer, o None (con DEBUG_VM se crea uno).
+        """
+        if self.dispatch_mode == DispatchMode.IF_CHAIN:
+            program = [(OPCODES[quad.operator], quad.left_operand, quad.right_operand, quad.result)
+                       for quad in self.quad_list]
+            table = self.build_chain_table(counters)
+        else:
+            program = self.program
+            table = self.dispatch_table if counters is None else self.build_limited_table(counters)
+        debug_trace = False
+        finish = None
+        if DEBUG_VM or trace is not None:
+            debug_trace = trace is None
+            if debug_trace:
+                trace = TraceBuffer(VM_TRACE_SIZE, VM_TRACE_SAMPLE)
+            table = self.build_traced_table(table, trace)
+        elif isinstance(profiler, CallProfiler):
+            table, finish = self.build_call_profiled_table(table, profiler)
+        else:
+            table = self.build_profiled_table(table, profiler)
+        try:
+            self.run_table(table, program)
+            if counters is not None and self.dispatch_mode == DispatchMode.TABLE:
+                counters.end_segment(len(program) - 1, len(program))
+        finally:
+            if finish is not None:
+                finish()
+        if debug_trace:
+            self.output.flush()
+            trace.dump()
+
+    def next_instruction_limited(self, counters):
+        """
+        Ejecuta el siguiente cuadruplo con la cadena de if/elif, contandolo y verificando los limites de ejecución
+        en los saltos hacia atras y en las llamadas.
+
+        :param counters: Instancia de LimitCounters de la ejecución.
+        """
+        IP = self.get_current_frame().IP
+        quad = self.quad_list[IP]
+        self.next_instruction()
+        counters.instructions += 1
+        if quad.operator == Operator.GOSUB or (quad.operator in (Operator.GOTO, Operator.GOTOF, Operator.GOTOT)
+                                               and self.get_current_frame().IP <= IP):
+            counters.check(IP, len(self.execution_stack), self.get_current_frame().IP)
+
+    def build_chain_table(self, counters):
+        """
+        Construye una tabla de despacho para ejecutar con run_table el programa de cuadruplos sin decodificar: el
+        handler de cada opcode ejecuta el cuadruplo del frame actual con la cadena de if/elif y regresa el IP del
+        frame, que puede ser el de otra función despues de un GOSUB o un ENDFUN.
+
+        :param counters: Instancia opcional de LimitCounters si la ejecución tiene limites.
+        :return: La tabla de despacho.
+        """
+        step = self.next_instruction if counters is None else partial(self.next_instruction_limited, counters)
+
+        def execute(A, B, C, IP):
+            step()
+            return self.get_current_frame().IP
+        return [execute] * len(self.dispatch_table)
+
+    def build_limited_table(self, counters):
+        """
+        Construye una copia de la tabla de despacho donde los saltos, GOSUB y ENDFUN actualizan los contadores de
+        la ejecución. Los limites se verifican en los saltos hacia atras y en cada GOSUB, así que el resto de las
+        instrucciones se ejecutan con los mismos handlers que sin limites.
+
+        :param counters: Instancia de LimitCounters de la ejecución.
+        :return: La tabla de despacho con limites.
+        """
+        table = list(self.dispatch_table)
+        origin = self.program_origin
+        stack = self.execution_stack
+
+        def transfer(handler):
+            def limited(A, B, C, IP):
+                next_IP = handler(A, B, C, IP)
+                if next_IP != IP + 1:
+                    counters.end_segment(IP, next_IP)
+                    if next_IP <= IP:
+                        counters.check(origin[IP], len(stack), next_IP)
+                return next_IP
+            return limited
+
+        def call(handler):
+            def limited(A, B, C, IP):
+                next_IP = handler(A, B, C, IP)
+                counters.end_segment(IP, next_IP)
+                counters.check(origin[IP], len(stack), next_IP)
+                return next_IP
+            return limited
+
+        for opcode in (OPCODES[Operator.GOTO], OPCODES[Operator.GOTOF], OPCODES[Operator.GOTOT],
+                       OPCODES[Operator.ENDFUN], SUPER_OPCODES[Superinstruction.COMPARE_GOTOF]):
+            table[opcode] = transfer(table[opcode])
+        table[OPCODES[Operator.GOSUB]] = call(table[OPCODES[Operator.GOSUB]])
+        # Los ciclos vectorizados, las multiplicaciones de matrices y las escrituras de bloques no se cuentan por
+        # instrucción, así que con limites se ejecutan los ciclos escalares.
+        for operator in (Operator.VECTOR, Operator.MATMUL, Operator.FILL, Operator.COPYBLOCK):
+            table[OPCODES[operator]] = lambda A, B, C, IP: IP + 1
+        return table
+
+    def build_profiled_table(self, table, profiler):
+        """
+        Construye una copia de la tabla de despacho que cuenta las ejecuciones de cada instrucción y mide el tiempo
+        de una de cada profiler.sample_every instrucciones.
+
+        :param table: Tabla de despacho que se instrumenta (ver run_observed).
+        :param profiler: Instancia de Profiler donde se acumulan los resultados.
+        :return: La tabla de despacho instrumentada.
+        """
+        counts, times, samples = profiler.start(len(self.program))
+        sample_every = profiler.sample_every
+        clock = perf_counter
+        countdown = sample_every
+
+        def profiled(handler):
+            def measured(A, B, C, IP):
+                nonlocal countdown
+                counts[IP] += 1
+                countdown -= 1
+                if countdown:
+                    return handler(A, B, C, IP)
+                countdown = sample_every
+                start = clock()
+                next_IP = handler(A, B, C, IP)
+                times[IP] += clock() - start
+                samples[IP] += 1
+                return next_IP
+            return measured
+
+        return [profiled(handler) for handler in table]
+
+    def build_call_profiled_table(self, table, profiler):
+        """
+        Construye una copia de la tabla de despacho que cuenta las instrucciones ejecutadas y le avisa al
+        perfilador de llamadas cada GOSUB y cada ENDFUN. Las llamadas que siguen en ejecución al terminar (la
+        función principal, o todas si la ejecución se detiene por un error) se terminan al llamar la función
+        finish que se regresa junto con la tabla.
+
+        :param table: Tabla de despacho que se instrumenta (ver run_observed).
+        :param profiler: Instancia de CallProfiler donde se acumulan los resultados.
+        :return: Tupla (tabla de despacho instrumentada, finish).
+        """
+        clock = perf_counter
+        stack = self.execution_stack
+        executed = 0
+        profiler.start('main', executed, clock())
+
+        def counted(handler):
+            def measured(A, B, C, IP):
+                nonlocal executed
+                executed += 1
+                return handler(A, B, C, IP)
+            return measured
+
+        def call(handler):
+            def measured(A, B, C, IP):
+                nonlocal executed
+                executed += 1
+                depth = len(stack)
+                start = clock()
+                next_IP = handler(A, B, C, IP)
+                if len(stack) > depth:
+                    profiler.enter(A, executed, start)
+                else:
+                    profiler.memoized(A, executed, start, clock())
+                return next_IP
+            return measured
+
+        def ret(handler):
+            def measured(A, B, C, IP):
+                nonlocal executed
+                executed += 1
+                next_IP = handler(A, B, C, IP)
+                profiler.leave(executed, clock())
+                return next_IP
+            return measured
+
+        def finish():
+            profiler.finish(executed, clock())
+
+        wrappers = {OPCODES[Operator.GOSUB]: call, OPCODES[Operator.ENDFUN]: ret}
+        return [wrappers.get(opcode, counted)(handler) for opcode, handler in enumerate(table)], finish
+
+    def build_traced_table(self, table, trace):
+        """
+        Construye una copia de la tabla de despacho que guarda una de cada trace.sample_every instrucciones en el
+        trace, con los valores de sus operandos. Si una instrucción termina con un error (o al superar un limite),
+        registra la instrucción que fallo y escribe el trace antes de lanzar el error.
+
+        :param table: Tabla de despacho que se instrumenta (ver run_observed).
+        :param trace: Instancia de TraceBuffer.
+        :return: La tabla de despacho instrumentada.
+        """
+        # Operandos que se leen antes de ejecutar cada opcode. El resto se guardan como en el cuadruplo original,
+        # excepto los de las superinstrucciones, que se guardan decodificados. El operando C de PARAMETER pertenece
+        # al frame de la función llamada.
+        operand_flags = [ADDRESS_OPERANDS[operator] for operator in Operator] + \
+            [(False, False, False)] * len(Superinstruction)
+        operand_flags[OPCODES[Operator.PARAMETER]] = (True, False, False)
+        result_opcodes = {OPCODES[operator] for operator in (*BINARY_OPERATIONS, Operator.ASSIGN, Operator.READ,
+                                                             Operator.LOADIDX)}
+        sample_every = trace.sample_every
+        countdown = sample_every
+        origin = self.program_origin
+        quads = self.quad_list
+
+        if self.dispatch_mode == DispatchMode.IF_CHAIN:
+            def read(operand):
+                try:
+                    return self.read(operand)
+                except Exception:
+                    return UNREADABLE
+        else:
+            segments = self.segments
+
+            def read(operand):
+                try:
+                    return segments[operand[0]][operand[1]][operand[2]]
+                except Exception:
+                    return UNREADABLE
+
+        def values(opcode, A, B, C, IP):
+            if opcode >= len(OPCODES):
+                raw = (A, B, C)
+            else:
+                quad = quads[origin[IP]]
+                raw = (quad.left_operand, quad.right_operand, quad.result)
+            return tuple(read(operand) if flag else raw_operand
+                         for operand, raw_operand, flag in zip((A, B, C), raw, operand_flags[opcode]))
+
+        def traced(opcode, handler):
+            def recorded(A, B, C, IP):
+                nonlocal countdown
+                try:
+                    countdown -= 1
+                    if countdown:
+                        return handler(A, B, C, IP)
+                    countdown = sample_every
+                    a, b, c = values(opcode, A, B, C, IP)
+                    next_IP = handler(A, B, C, IP)
+                    if opcode in result_opcodes:
+                        c = read(C)
+                    trace.record(origin[IP], opcode, (a, b, c))
+                    return next_IP
+                except BaseException as error:
+                    trace.record(origin[IP], opcode, values(opcode, A, B, C, IP))
+                    trace.error = f'{type(error).__name__}: {error}'
+                    self.output.flush()
+                    trace.dump()
+                    raise
+            return recorded
+
+        return [traced(opcode, handler) for opcode, handler in enumerate(table)]
+
+    def run_table(self, table=None, program=None):
+        """
+        Ejecuta todas las instrucciones decodificadas despachando cada opcode a su handler a traves de la tabla
+        de despacho.
+        El IP del frame actual se mantiene en una variable local y se guarda en el frame al cambiar de contexto
+        o al terminar la ejecución.
+
+        :param table: Tabla de despacho a utilizar, por default self.dispatch_table.
+        :param program: Programa a ejecutar como tuplas (opcode, A, B, C), por default self.program.
         """
-        if DEBUG_VM:
-            print("\nInicio ejecución:")
-        while self.get_current_frame().IP < len(self.quad_list):
-            self.next_instruction()
+        table = table or self.dispatch_table
+        program = program or self.program
+        end = len(program)
+        IP = self.get_current_frame().IP
+        try:
+            while IP < end:
+                opcode, A, B, C = program[IP]
+                IP = table[opcode](A, B, C, IP)
+        except LimitExceeded as error:
+            # El handler ya ejecuto la instrucción, la ejecución puede continuar en la siguiente.
+            IP = error.resume_IP
+            raise
+        finally:
+            self.get_current_frame().IP = IP